@@ -0,0 +1,167 @@
+# =============================================================================
+# BIBLIOTECAS E MÓDULOS
+# =============================================================================
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+import requests
+
+from scraping_wto.extrator_zip import diretorio_central_da_cauda
+from scraping_wto.gerenciador_downloads import CONTEUDO_PARCIAL
+from scraping_wto.limitador import LIMITADOR
+from scraping_wto.log import LOGGER
+from scraping_wto.schemas import AssinaturaConsulta, Consulta
+from scraping_wto.utils import get_path_projeto
+
+# =============================================================================
+# CONSTANTES
+# =============================================================================
+
+path_projeto = get_path_projeto()
+assert isinstance(path_projeto, Path)
+
+PATH_ASSINATURAS = path_projeto / "log/assinaturas_consultas.json"
+
+# Bytes pedidos do fim do zip <- o diretório central dos relatórios TL (três
+# membros) tem poucas centenas de bytes
+TAMANHO_CAUDA = 64 * 1024
+TIMEOUT_CAUDA = (10, 30)
+
+# =============================================================================
+# CLASSES E SCHEMAS
+# =============================================================================
+
+
+class RegistroAssinaturas:
+    """Assinatura do último download validado de cada país. Serve para não
+    pôr na fila uma consulta cujos metadados não mudaram e para não baixar
+    de novo um zip igual ao que já foi extraído."""
+
+    def __init__(self, path_arquivo: Path = PATH_ASSINATURAS) -> None:
+        self.path_arquivo = Path(path_arquivo)
+        self._lock = threading.Lock()
+        self._assinaturas: dict[str, AssinaturaConsulta] = {}
+        if self.path_arquivo.exists():
+            with open(self.path_arquivo, "r", encoding="utf-8") as json_f:
+                self._assinaturas = {
+                    pais: AssinaturaConsulta(**assinatura)
+                    for pais, assinatura in json.load(json_f).items()
+                }
+        return None
+
+    def get(self, pais: str) -> Optional[AssinaturaConsulta]:
+        with self._lock:
+            return self._assinaturas.get(pais)
+
+    def metadados_mudaram(self, consulta: Consulta) -> bool:
+        assinatura = self.get(consulta.COUNTRY)
+        return assinatura is None or assinatura.hash_consulta != hash_consulta(
+            consulta
+        )
+
+    def mesmo_zip(
+        self, pais: str, tamanho_zip: int, crcs: dict[str, int]
+    ) -> bool:
+        assinatura = self.get(pais)
+        return (
+            assinatura is not None
+            and bool(assinatura.crcs)
+            and (assinatura.tamanho_zip, assinatura.crcs)
+            == (tamanho_zip, crcs)
+        )
+
+    def registra(
+        self,
+        consulta: Consulta,
+        tamanho_zip: int,
+        crcs: dict[str, int],
+        sha256_zip: str,
+    ) -> None:
+        with self._lock:
+            self._assinaturas[consulta.COUNTRY] = AssinaturaConsulta(
+                pais=consulta.COUNTRY,
+                hash_consulta=hash_consulta(consulta),
+                tamanho_zip=tamanho_zip,
+                crcs=crcs,
+                sha256_zip=sha256_zip,
+            )
+            self._salva()
+        return None
+
+    def _salva(self) -> None:
+        # Escreve num arquivo temporário e troca <- nunca deixa o JSON pela metade
+        self.path_arquivo.parent.mkdir(exist_ok=True, parents=True)
+        path_temp = self.path_arquivo.with_suffix(".tmp")
+        with open(path_temp, "w", encoding="utf-8") as json_f:
+            json.dump(
+                {
+                    pais: assinatura.model_dump()
+                    for pais, assinatura in self._assinaturas.items()
+                },
+                json_f,
+                indent=2,
+                sort_keys=True,
+            )
+        os.replace(path_temp, self.path_arquivo)
+        return None
+
+
+# =============================================================================
+# FUNÇÕES
+# =============================================================================
+
+
+def hash_consulta(consulta: Consulta) -> str:
+    metadados = "|".join((
+        consulta.YEAR,
+        consulta.IMPORTS,
+        consulta.NOMENCLATURE,
+    ))
+    return hashlib.sha256(metadados.encode("utf-8")).hexdigest()
+
+
+# -----------------------------------------------------------------------------
+# Tamanho e crc32 dos membros de um zip remoto, baixando só o fim dele
+# (Range: bytes=-N). None = o servidor não mandou a cauda.
+# -----------------------------------------------------------------------------
+
+
+def diretorio_central_remoto(
+    url: str, sessao: requests.Session, tamanho_cauda: int = TAMANHO_CAUDA
+) -> Optional[tuple[int, dict[str, int]]]:
+    try:
+        with (
+            LIMITADOR.acao(),
+            sessao.get(
+                url,
+                headers={"Range": f"bytes=-{tamanho_cauda}"},
+                timeout=TIMEOUT_CAUDA,
+                stream=True,
+            ) as resposta,
+        ):
+            # Sem 206, o corpo é o zip inteiro <- fecha sem ler
+            if resposta.status_code != CONTEUDO_PARCIAL:
+                return None
+            _, _, tamanho_total = resposta.headers.get(
+                "Content-Range", ""
+            ).partition("/")
+            if not tamanho_total.isdigit():
+                return None
+            cauda = resposta.content
+    except requests.RequestException as e:
+        LOGGER.debug(
+            f"diretorio_central_remoto: Não foi possível ler o fim do zip: {e}"
+        )
+        return None
+
+    diretorio = diretorio_central_da_cauda(cauda)
+    if diretorio is None:
+        return None
+    return int(tamanho_total), {
+        nome: crc for nome, (crc, _) in diretorio.items()
+    }
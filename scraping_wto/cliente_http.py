@@ -0,0 +1,514 @@
+# =============================================================================
+# BIBLIOTECAS E MÓDULOS
+# =============================================================================
+
+import os
+import re
+from html.parser import HTMLParser
+from time import sleep, time
+from typing import Optional
+from urllib.parse import urljoin
+
+import requests
+from dotenv import find_dotenv, load_dotenv
+
+from scraping_wto import website_scraping
+from scraping_wto.limitador import (
+    LIMITADOR,
+    LimitadorTaxa,
+    resposta_sobrecarga,
+)
+from scraping_wto.log import LOGGER
+from scraping_wto.modelo_exportacao import intervalos_backoff, prazo_exportacao
+from scraping_wto.schemas import Consulta, Etapa
+from scraping_wto.selenium_utils import cria_sessao_http
+from scraping_wto.utils import normaliza_nomes, relatorio_do_pais
+
+# =============================================================================
+# CONSTANTES
+# =============================================================================
+
+# (conexão, leitura) em segundos
+TIMEOUT_HTTP = (10, 60)
+
+# Aceita tanto __doPostBack('alvo','arg') quanto a versão com aspas escapadas
+# que o ASP.NET gera dentro de setTimeout(...)
+REGEX_POSTBACK = re.compile(
+    r"__doPostBack\(\\?'([^'\\]*)\\?',\s*\\?'([^'\\]*)\\?'\)"
+)
+
+CLASSES_LINHAS_PAISES = ("GridItem", "GridAlternatingItem")
+CLASSES_LINHAS_RELATORIOS = ("table2", "table3")
+
+ID_LINK_NOVA_QUERY = "ctl00_qsl_lbChangeQuery"
+ID_TABELA_PAISES = "ctl00_qsl_qs_pop_ctl00_dgCountry"
+ID_TABELA_ANOS = "ctl00_qsl_qs_pop_ctl00_dgYear"
+ID_BOTAO_CONTINUAR = "ctl00_qsl_qs_pop_ctl00_bContinue"
+ID_DROPDOWN_RELATORIO = "ctl00_c_drpReport"
+ID_DROPDOWN_FORMATO = "ctl00_c_pickFile_ddFormat"
+ID_NOME_ARQUIVO = "ctl00_c_pickFile_txtFileName"
+ID_BOTAO_EXPORTAR = "ctl00_c_pickFile_btnExport"
+ID_TABELA_RELATORIOS = "ctl00_c_viewFile_dgExportFile"
+
+# =============================================================================
+# CLASSES E SCHEMAS
+# =============================================================================
+
+
+class PaginaWebForms(HTMLParser):
+    """Estado de uma página ASP.NET WebForms: os campos que o navegador
+    enviaria no próximo postback (__VIEWSTATE, __EVENTVALIDATION, inputs,
+    selects), os elementos com id e as linhas das tabelas com id"""
+
+    def __init__(self, html: str, url: str) -> None:
+        super().__init__(convert_charrefs=True)
+        self.url = url
+        self.action = url
+        self.campos: dict[str, str] = {}
+        self.elementos: dict[str, dict] = {}
+        self.tabelas: dict[str, list[dict]] = {}
+        self._pilha_tabelas: list[dict] = []
+        self._select: Optional[dict] = None
+        self.feed(html)
+        self.close()
+        return None
+
+    def _linha_atual(self) -> Optional[dict]:
+        for tabela in reversed(self._pilha_tabelas):
+            if tabela["linha"] is not None:
+                return tabela["linha"]
+        return None
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        atributos = {nome: valor or "" for nome, valor in attrs}
+        atributos["tag"] = tag
+        if "id" in atributos:
+            self.elementos[atributos["id"]] = atributos
+        linha = self._linha_atual()
+
+        if tag == "form" and atributos.get("action"):
+            self.action = urljoin(self.url, atributos["action"])
+
+        elif tag == "input":
+            self._registra_input(atributos)
+            if linha is not None:
+                linha["inputs"].append(atributos)
+
+        elif tag == "select":
+            atributos["opcoes"] = []
+            self._select = atributos
+
+        elif tag == "option" and self._select is not None:
+            self._select["opcoes"].append(atributos.get("value", ""))
+            if "selected" in atributos:
+                self._select["selecionada"] = atributos.get("value", "")
+
+        elif tag == "a" and linha is not None and atributos.get("href"):
+            linha["links"].append(urljoin(self.url, atributos["href"]))
+
+        else:
+            self._registra_tabela(tag, atributos, linha)
+
+        return None
+
+    def _registra_tabela(
+        self, tag: str, atributos: dict, linha: Optional[dict]
+    ) -> None:
+        if tag == "table":
+            id_tabela = atributos.get("id")
+            if id_tabela:
+                self.tabelas[id_tabela] = []
+            self._pilha_tabelas.append({"id": id_tabela, "linha": None})
+
+        elif tag == "tr" and self._pilha_tabelas:
+            tabela = self._pilha_tabelas[-1]
+            if tabela["id"]:
+                tabela["linha"] = {
+                    "classe": atributos.get("class", ""),
+                    "texto": "",
+                    "celulas": [],
+                    "inputs": [],
+                    "links": [],
+                }
+                self.tabelas[tabela["id"]].append(tabela["linha"])
+
+        elif tag == "td" and linha is not None:
+            linha["celulas"].append("")
+
+        return None
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "select" and self._select is not None:
+            if self._select.get("name"):
+                opcoes = self._select["opcoes"]
+                self.campos[self._select["name"]] = self._select.get(
+                    "selecionada", opcoes[0] if opcoes else ""
+                )
+            self._select = None
+        elif tag == "table" and self._pilha_tabelas:
+            self._pilha_tabelas.pop()
+        elif tag == "tr" and self._pilha_tabelas:
+            self._pilha_tabelas[-1]["linha"] = None
+        return None
+
+    def handle_data(self, data: str) -> None:
+        linha = self._linha_atual()
+        if linha is not None:
+            linha["texto"] += data
+            if linha["celulas"]:
+                linha["celulas"][-1] += data
+        return None
+
+    def _registra_input(self, atributos: dict) -> None:
+        nome = atributos.get("name")
+        tipo = atributos.get("type", "text").lower()
+        if not nome:
+            return None
+        if tipo in {"hidden", "text", "password"}:
+            self.campos[nome] = atributos.get("value", "")
+        elif tipo in {"checkbox", "radio"} and "checked" in atributos:
+            self.campos[nome] = atributos.get("value", "on")
+        return None
+
+    def linhas(self, id_tabela: str, classes: tuple[str, ...]) -> list[dict]:
+        return [
+            linha
+            for linha in self.tabelas.get(id_tabela, [])
+            if linha["classe"] in classes
+        ]
+
+
+class ClienteTAO:
+    """Mesmo fluxo do 'website_scraping', mas sem navegador: replays dos
+    postbacks do WebForms numa sessão HTTP com pool de conexões"""
+
+    def __init__(
+        self,
+        url_base: str = website_scraping.URL_BASE_TAO,
+        sessao: Optional[requests.Session] = None,
+        limitador: LimitadorTaxa = LIMITADOR,
+    ) -> None:
+        self.url_base = url_base.rstrip("/")
+        self.sessao = cria_sessao_http() if sessao is None else sessao
+        self.limitador = limitador
+        self.pagina: Optional[PaginaWebForms] = None
+        return None
+
+    def __enter__(self) -> "ClienteTAO":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.sessao.close()
+        return None
+
+    # -------------------------------------------------------------------------
+    # HTTP
+    # -------------------------------------------------------------------------
+
+    def _atualiza_pagina(self, resposta: requests.Response) -> PaginaWebForms:
+        resposta.raise_for_status()
+        self.pagina = PaginaWebForms(resposta.text, resposta.url)
+        return self.pagina
+
+    def _requisicao(
+        self, metodo: str, url: str, **kwargs
+    ) -> requests.Response:
+        """Toda requisição ao site passa pelo limitador (compartilhado)"""
+
+        self.limitador.espera()
+        t_inicio = time()
+        try:
+            resposta = self.sessao.request(
+                metodo, url, timeout=TIMEOUT_HTTP, **kwargs
+            )
+        except requests.RequestException:
+            self.limitador.registra(time() - t_inicio, erro=True)
+            raise
+        self.limitador.registra(
+            time() - t_inicio,
+            erro=resposta_sobrecarga(resposta.status_code),
+        )
+        return resposta
+
+    def get(self, caminho: str) -> PaginaWebForms:
+        resposta = self._requisicao("GET", f"{self.url_base}/{caminho}")
+        return self._atualiza_pagina(resposta)
+
+    def postback(
+        self,
+        alvo: str = "",
+        argumento: str = "",
+        botao: Optional[dict] = None,
+        campos: Optional[dict] = None,
+    ) -> PaginaWebForms:
+        assert self.pagina is not None, "postback: nenhuma página aberta"
+
+        dados = dict(self.pagina.campos)
+        dados.update({"__EVENTTARGET": alvo, "__EVENTARGUMENT": argumento})
+        if campos is not None:
+            dados.update(campos)
+        if botao is not None:
+            if botao.get("type", "").lower() == "image":
+                dados.update({
+                    f"{botao['name']}.x": "1",
+                    f"{botao['name']}.y": "1",
+                })
+            else:
+                dados[botao["name"]] = botao.get("value", "")
+
+        resposta = self._requisicao("POST", self.pagina.action, data=dados)
+        return self._atualiza_pagina(resposta)
+
+    def clica(
+        self, elemento: dict, campos: Optional[dict] = None
+    ) -> PaginaWebForms:
+        """Faz o que o clique no navegador faria: __doPostBack do onclick/href,
+        ou o submit do próprio botão"""
+
+        campos = {} if campos is None else dict(campos)
+        tipo = elemento.get("type", "").lower()
+        if tipo in {"radio", "checkbox"}:
+            campos[elemento["name"]] = elemento.get("value", "on")
+
+        javascript = elemento.get("onclick", "") + elemento.get("onchange", "")
+        javascript += elemento.get("href", "")
+        postback = REGEX_POSTBACK.search(javascript)
+
+        if postback is not None:
+            return self.postback(*postback.groups(), campos=campos)
+        if tipo in {"submit", "image"}:
+            return self.postback(botao=elemento, campos=campos)
+        return self.postback(alvo=elemento.get("name", ""), campos=campos)
+
+    def sessao_expirada(self) -> bool:
+        return self.pagina is None or "welcome.aspx" in self.pagina.url.lower()
+
+    # -------------------------------------------------------------------------
+    # Login
+    # -------------------------------------------------------------------------
+
+    def login(
+        self, usuario: Optional[str] = None, senha: Optional[str] = None
+    ) -> None:
+        load_dotenv(find_dotenv())
+        usuario = os.getenv("USUARIO_WTO") if usuario is None else usuario
+        assert usuario is not None, "usuario is None"
+        senha = os.getenv("SENHA_WTO") if senha is None else senha
+        assert senha is not None, "senha is None"
+
+        pagina = self.get("welcome.aspx?ReturnUrl=%2fdefault.aspx")
+        self.clica(
+            pagina.elementos["ctl00_c_ctrLogin_LoginButton"],
+            campos={
+                pagina.elementos["ctl00_c_ctrLogin_UserName"]["name"]: usuario,
+                pagina.elementos["ctl00_c_ctrLogin_Password"]["name"]: senha,
+                pagina.elementos["ctl00_c_ctrLogin_RememberMe"]["name"]: "on",
+            },
+        )
+
+        if self.sessao_expirada():
+            raise Exception("ClienteTAO.login: 💀 Login não foi aceito!")
+
+        LOGGER.debug("ClienteTAO.login: LOGIN REALIZADO!")
+        return None
+
+    # -------------------------------------------------------------------------
+    # Janela de consulta
+    # -------------------------------------------------------------------------
+
+    def abre_popup_query(self) -> PaginaWebForms:
+        if self.pagina is None or self.sessao_expirada():
+            self.get("default.aspx")
+            if self.sessao_expirada():
+                self.login()
+        assert self.pagina is not None
+
+        if ID_TABELA_PAISES not in self.pagina.tabelas:
+            self.clica(self.pagina.elementos[ID_LINK_NOVA_QUERY])
+        return self.pagina
+
+    def get_lista_paises(self) -> list[str]:
+        pagina = self.abre_popup_query()
+        linhas = pagina.linhas(ID_TABELA_PAISES, CLASSES_LINHAS_PAISES)
+        return [" ".join(linha["texto"].split()) for linha in linhas]
+
+    def clica_consulta_pais(self, pais: str) -> None:
+        pagina = self.abre_popup_query()
+        linhas = pagina.linhas(ID_TABELA_PAISES, CLASSES_LINHAS_PAISES)
+        for linha in linhas:
+            if " ".join(linha["texto"].split()) == pais and linha["inputs"]:
+                self.clica(linha["inputs"][0])
+                return None
+        raise Exception(
+            f"ClienteTAO.clica_consulta_pais: Não achou o país '{pais}'"
+        )
+
+    def get_info_ultima_consulta_pais(self, pais: str) -> Optional[Consulta]:
+        self.clica_consulta_pais(pais)
+        assert self.pagina is not None
+
+        linhas = self.pagina.linhas(ID_TABELA_ANOS, ("GridItem",))
+        year, imports, nomenclature = (
+            [celula.strip() for celula in linhas[0]["celulas"][1:4]]
+            if linhas
+            else ["", "", ""]
+        )
+
+        return Consulta(
+            COUNTRY=pais, YEAR=year, IMPORTS=imports, NOMENCLATURE=nomenclature
+        )
+
+    # -------------------------------------------------------------------------
+    # Página de relatórios
+    # -------------------------------------------------------------------------
+
+    def linhas_relatorios(self) -> list[dict]:
+        assert self.pagina is not None
+        return self.pagina.linhas(
+            ID_TABELA_RELATORIOS, CLASSES_LINHAS_RELATORIOS
+        )
+
+    @staticmethod
+    def _botao_linha(linha: dict, nome_botao: str) -> Optional[dict]:
+        for elemento in linha["inputs"]:
+            if nome_botao in elemento.get("id", ""):
+                return elemento
+        return None
+
+    def deleta_relatorios(self, pais: Optional[str] = None) -> None:
+        """Sem país, deleta TODOS os relatórios da conta"""
+
+        while True:
+            linhas = (
+                self.linhas_relatorios()
+                if pais is None
+                else [self.linha_relatorio(pais)]
+            )
+            botoes = [
+                self._botao_linha(linha, "bDelete")
+                for linha in linhas
+                if linha is not None
+            ]
+            botoes = [botao for botao in botoes if botao is not None]
+            if not botoes:
+                return None
+            self.clica(botoes[0])
+
+    def exporta_relatorio(self, consulta: Consulta) -> float:
+        """Retorna o instante (time()) em que a exportação foi pedida"""
+
+        self.clica_consulta_pais(consulta.COUNTRY)
+        assert self.pagina is not None
+        self.clica(self.pagina.elementos[ID_BOTAO_CONTINUAR])
+
+        dropdown = self.pagina.elementos[ID_DROPDOWN_RELATORIO]
+        opcoes_tl = [opcao for opcao in dropdown["opcoes"] if "TL" in opcao]
+        if not opcoes_tl:
+            raise Exception(
+                "ClienteTAO.exporta_relatorio: NÃO EXISTE TL PARA ESTE PAÍS!"
+            )
+        self.clica(dropdown, campos={dropdown["name"]: opcoes_tl[0]})
+
+        elementos = self.pagina.elementos
+        self.clica(
+            elementos[ID_BOTAO_EXPORTAR],
+            campos={
+                elementos[ID_DROPDOWN_FORMATO]["name"]: "txt",
+                elementos[ID_NOME_ARQUIVO]["name"]: normaliza_nomes(
+                    consulta.COUNTRY
+                ),
+            },
+        )
+        return time()
+
+    def linha_relatorio(self, pais: str) -> Optional[dict]:
+        # Nome exato do arquivo, no link ou na célula (evita 'niger' x 'nigeria')
+        nome_arquivo = normaliza_nomes(pais)
+        for linha in self.linhas_relatorios():
+            if relatorio_do_pais(
+                nome_arquivo, linha["celulas"], linha["links"]
+            ):
+                return linha
+        return None
+
+    def espera_link_download(self, pais: str, t_inicio: float) -> str:
+        tempo_esperado = website_scraping.MODELO_EXPORTACAO.tempo_esperado(
+            pais
+        )
+        prazo = prazo_exportacao(tempo_esperado)
+        intervalos = intervalos_backoff(tempo_esperado)
+
+        while True:
+            linha = self.linha_relatorio(pais)
+            if linha is None:
+                raise Exception(
+                    f"ClienteTAO.espera_link_download: 💀 Relatório de '{pais}' não está na tabela!"
+                )
+
+            botao_reload = self._botao_linha(linha, "bReload")
+            if botao_reload is None and linha["links"]:
+                website_scraping.MODELO_EXPORTACAO.registra(
+                    pais, time() - t_inicio
+                )
+                return linha["links"][0]
+
+            if time() - t_inicio > prazo:
+                raise Exception(
+                    f"ClienteTAO.espera_link_download: 💀 '{pais}' não ficou pronto em {prazo:.0f} s!"
+                )
+
+            LOGGER.debug(
+                "ClienteTAO.espera_link_download: 🕙 Arquivo ainda não está pronto . . ."
+            )
+            sleep(next(intervalos))
+            if botao_reload is not None:
+                self.clica(botao_reload)
+            else:
+                self.get("ExportReport.aspx")
+
+    def download_consulta(
+        self, consulta: Consulta, exclusivo: bool = True
+    ) -> None:
+        """Se a consulta deu erro antes, continua da última etapa concluída"""
+
+        retomada = website_scraping.REGISTRO_ETAPAS.retomada(consulta)
+        if retomada is not None and retomada.etapa.passou(Etapa.VALIDADO):
+            website_scraping.finaliza_consulta(consulta)
+            return None
+
+        self.get("ExportReport.aspx")
+        if self.sessao_expirada():
+            self.login()
+            self.get("ExportReport.aspx")
+
+        if retomada is None:
+            self.deleta_relatorios(None if exclusivo else consulta.COUNTRY)
+            website_scraping.REGISTRO_ETAPAS.descarta_exportacoes(
+                None if exclusivo else [consulta]
+            )
+            t_inicio = self.exporta_relatorio(consulta)
+            website_scraping.REGISTRO_ETAPAS.marca(
+                consulta, Etapa.EXPORTADO, t_inicio_exportacao=t_inicio
+            )
+            retomada = website_scraping.REGISTRO_ETAPAS.get(consulta)
+        assert retomada is not None, (
+            "ClienteTAO.download_consulta: etapa não registrada"
+        )
+
+        try:
+            link_download = retomada.link_download
+            if not retomada.etapa.passou(Etapa.PRONTO):
+                link_download = self.espera_link_download(
+                    consulta.COUNTRY, retomada.t_inicio_exportacao
+                )
+                website_scraping.REGISTRO_ETAPAS.marca(
+                    consulta, Etapa.PRONTO, link_download=link_download
+                )
+            website_scraping.processa_download(
+                consulta, link_download, self.sessao
+            )
+        except Exception:
+            website_scraping.REGISTRO_ETAPAS.falhou(consulta)
+            raise
+
+        return None
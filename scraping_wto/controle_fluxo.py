@@ -2,13 +2,14 @@
 # BIBLIOTECAS E MÓDULOS
 # =============================================================================
 
-import pickle
 from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
-import pandas as pd
-
+from scraping_wto.diario import DiarioCSV
+from scraping_wto.fila import FilaConsultas
+from scraping_wto.metricas import METRICAS
+from scraping_wto.registro_consultas import RegistroConsultasFeitas
 from scraping_wto.schemas import Consulta
 from scraping_wto.utils import get_path_projeto
 
@@ -21,10 +22,19 @@ assert isinstance(path_projeto, Path)
 
 
 FORMATO_DATA = "%Y-%m-%d"
-PATH_LOG_CONSULTAS_FEITAS = path_projeto / "log/consultas_feitas.csv"
 PATH_LOG_ERRO_CONSULTA = path_projeto / "log/consultas_erros.csv"
+# Fila antiga (pickle) <- só é lida para ser importada para a FILA
 PATH_CONSULTAS_A_SEREM_FEITAS = path_projeto / "temp/consultas_a_fazer.pkl"
 
+# Fila de consultas a serem feitas (SQLite) <- tem as próprias transações
+FILA = FilaConsultas()
+
+# Log de consultas feitas (país -> última consulta), em memória
+REGISTRO_CONSULTAS = RegistroConsultasFeitas()
+
+# Log de erros (país -> data do último erro) <- diário append-only + CSV
+DIARIO_ERROS = DiarioCSV(PATH_LOG_ERRO_CONSULTA, ["COUNTRY", "DATA_CONSULTA"])
+
 # =============================================================================
 # FUNÇÕES
 # =============================================================================
@@ -35,31 +45,9 @@ PATH_CONSULTAS_A_SEREM_FEITAS = path_projeto / "temp/consultas_a_fazer.pkl"
 # -----------------------------------------------------------------------------
 
 
+@METRICAS.cronometra("consulta_ja_feita")
 def consulta_ja_feita(consulta: Consulta) -> bool:
-    df_log = (
-        pd.read_csv(PATH_LOG_CONSULTAS_FEITAS, sep=";").drop(columns=["DATA_CONSULTA"])
-        if Path(PATH_LOG_CONSULTAS_FEITAS).exists()
-        else pd.DataFrame(
-            columns=[
-                "COUNTRY",
-                "YEAR",
-                "IMPORTS",
-                "NOMENCLATURE",
-                "DATA_CONSULTA",
-            ]
-        )
-    )
-
-    consultas_feitas = (
-        Consulta(**consulta_feita.to_dict()) for _, consulta_feita in df_log.iterrows()
-    )
-
-    if consulta in consultas_feitas:
-        data_consulta_log = df_log[df_log["COUNTRY"] == consulta.COUNTRY].iloc[0, 1]
-        if data_consulta_log < consulta.YEAR:
-            return False
-        return True
-    return False
+    return REGISTRO_CONSULTAS.ja_feita(consulta)
 
 
 # -----------------------------------------------------------------------------
@@ -67,21 +55,10 @@ def consulta_ja_feita(consulta: Consulta) -> bool:
 # -----------------------------------------------------------------------------
 
 
+@METRICAS.cronometra("log_erro")
 def erro_consulta(pais: str) -> None:
-    Path(PATH_LOG_ERRO_CONSULTA).parent.mkdir(exist_ok=True, parents=True)
-
     data_consulta = datetime.now().strftime(format=FORMATO_DATA)
-
-    df_log = (
-        pd.read_csv(PATH_LOG_ERRO_CONSULTA, sep=";").drop(columns=["DATA_CONSULTA"])
-        if Path(PATH_LOG_ERRO_CONSULTA).exists()
-        else pd.DataFrame(
-            data=[[pais, data_consulta]], columns=["COUNTRY", "DATA_CONSULTA"]
-        )
-    )
-
-    df_log.to_csv(PATH_LOG_ERRO_CONSULTA, sep=";", index=False)
-
+    DIARIO_ERROS.anota({"COUNTRY": pais, "DATA_CONSULTA": data_consulta})
     return None
 
 
@@ -91,10 +68,29 @@ def erro_consulta(pais: str) -> None:
 
 
 def get_fila() -> Optional[list[Consulta]]:
-    if Path(PATH_CONSULTAS_A_SEREM_FEITAS).exists():
-        with open(PATH_CONSULTAS_A_SEREM_FEITAS, "rb") as pkl_f:
-            consultas = pickle.load(file=pkl_f)
-        return consultas
+    if not FILA.existe():
+        return None
+    return FILA.consultas()
+
+
+def tamanho_fila() -> int:
+    return FILA.numero_pendentes() if FILA.existe() else 0
+
+
+def fila_vazia() -> bool:
+    return tamanho_fila() == 0
+
+
+# -----------------------------------------------------------------------------
+# Início da execução: importa a fila antiga (pickle), se existir, e devolve as
+# tentativas das consultas que esgotaram na execução anterior
+# -----------------------------------------------------------------------------
+
+
+def prepara_fila() -> None:
+    FILA.importa_pickle(PATH_CONSULTAS_A_SEREM_FEITAS)
+    if FILA.existe():
+        FILA.reinicia_tentativas()
     return None
 
 
@@ -103,17 +99,28 @@ def get_fila() -> Optional[list[Consulta]]:
 # -----------------------------------------------------------------------------
 
 
+@METRICAS.cronometra("fila")
 def add_na_fila(consulta: Consulta) -> None:
-    Path(PATH_CONSULTAS_A_SEREM_FEITAS).parent.mkdir(exist_ok=True, parents=True)
+    FILA.adiciona(consulta)
+    return None
+
+
+# -----------------------------------------------------------------------------
+# Reserva consultas para um worker <- somem da fila para os outros até serem
+# confirmadas (remove_da_fila) ou devolvidas (devolve_para_fila)
+# -----------------------------------------------------------------------------
 
-    consultas = [] if get_fila() is None else get_fila()
-    assert consultas is not None, "consultas is None"
 
-    if consulta not in consultas:
-        consultas.append(consulta)
-        with open(PATH_CONSULTAS_A_SEREM_FEITAS, "wb") as pkl_f:
-            pickle.dump(file=pkl_f, obj=consultas)
+@METRICAS.cronometra("fila")
+def reserva_da_fila(
+    quantidade: int = 1, faixa: Optional[int] = None
+) -> list[Consulta]:
+    return FILA.reserva(quantidade, faixa=faixa)
 
+
+@METRICAS.cronometra("fila")
+def devolve_para_fila(consulta: Consulta) -> None:
+    FILA.devolve(consulta)
     return None
 
 
@@ -122,17 +129,9 @@ def add_na_fila(consulta: Consulta) -> None:
 # -----------------------------------------------------------------------------
 
 
+@METRICAS.cronometra("fila")
 def remove_da_fila(consulta: Consulta) -> None:
-    consultas = get_fila()
-
-    if consultas is None:
-        return None
-
-    consultas.remove(consulta)
-
-    with open(PATH_CONSULTAS_A_SEREM_FEITAS, "wb") as pkl_f:
-        pickle.dump(file=pkl_f, obj=consultas)
-
+    FILA.confirma(consulta)
     return None
 
 
@@ -141,34 +140,18 @@ def remove_da_fila(consulta: Consulta) -> None:
 # -----------------------------------------------------------------------------
 
 
+@METRICAS.cronometra("log_sucesso")
 def log_consulta_realizada_sucesso(consulta: Consulta) -> None:
-    Path(PATH_LOG_CONSULTAS_FEITAS).parent.mkdir(exist_ok=True, parents=True)
-
-    data_consulta = datetime.now().strftime(format=FORMATO_DATA)
-
-    consulta_dict = consulta.model_dump()
-    consulta_dict.update({"DATA_CONSULTA": data_consulta})
-    linha_consulta = [consulta_dict]
-
-    df_log = (
-        pd.read_csv(PATH_LOG_CONSULTAS_FEITAS, sep=";")
-        if Path(PATH_LOG_CONSULTAS_FEITAS).exists()
-        else pd.DataFrame(
-            columns=[
-                "COUNTRY",
-                "YEAR",
-                "IMPORTS",
-                "NOMENCLATURE",
-                "DATA_CONSULTA",
-            ]
-        )
-    )
+    REGISTRO_CONSULTAS.registra(consulta)
+    return None
 
-    if consulta.COUNTRY in df_log["COUNTRY"].values:
-        df_log = df_log[df_log["COUNTRY"] != consulta.COUNTRY].reset_index(drop=True)
 
-    df_log = df_log._append(linha_consulta, ignore_index=True).sort_values(by="COUNTRY")
+# -----------------------------------------------------------------------------
+# Compacta os diários nos CSVs <- fim da execução
+# -----------------------------------------------------------------------------
 
-    df_log.to_csv(PATH_LOG_CONSULTAS_FEITAS, sep=";", index=False)
 
+def salva_log_consultas() -> None:
+    REGISTRO_CONSULTAS.salva()
+    DIARIO_ERROS.compacta()
     return None
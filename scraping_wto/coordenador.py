@@ -0,0 +1,443 @@
+# =============================================================================
+# BIBLIOTECAS E MÓDULOS
+# =============================================================================
+
+import json
+import os
+import threading
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Optional
+
+import requests
+
+from scraping_wto.controle_fluxo import get_fila, remove_da_fila
+from scraping_wto.escalonador import MODO_FILA, prioriza_fila
+from scraping_wto.etapas import chave_consulta
+from scraping_wto.fila import FilaConsultas, nome_dono
+from scraping_wto.log import LOGGER
+from scraping_wto.registro_consultas import (
+    PATH_LOG_CONSULTAS_FEITAS,
+    RegistroConsultasFeitas,
+)
+from scraping_wto.schemas import Consulta
+from scraping_wto.utils import get_path_projeto
+
+# =============================================================================
+# CONSTANTES
+# =============================================================================
+
+path_projeto = get_path_projeto()
+
+# Onde os workers de outras máquinas encontram o coordenador (None = sem
+# coordenador, cada máquina usa a própria fila)
+URL_COORDENADOR = os.getenv("URL_COORDENADOR_WTO")
+PORTA_COORDENADOR = int(os.getenv("PORTA_COORDENADOR_WTO", "8765"))
+# O serviço não tem autenticação <- só escuta a própria máquina; para os
+# workers de outras máquinas, HOST_COORDENADOR_WTO=0.0.0.0 (rede confiável)
+HOST_COORDENADOR = os.getenv("HOST_COORDENADOR_WTO", "127.0.0.1")
+
+# Fila própria, separada da fila local (controle_fluxo.FILA) <- na mesma
+# máquina, 'publica_fila' não apaga o que acabou de mandar
+PATH_FILA_COORDENADOR = path_projeto / "temp/coordenador_consultas.sqlite3"
+
+# Uma reserva sem heartbeat por esse tempo (s) volta para a fila <- o worker
+# manda um heartbeat a cada terço do lease
+DURACAO_LEASE = float(os.getenv("DURACAO_LEASE_WTO", "120"))
+
+# Consultas reservadas de uma vez por worker <- as que ele ainda não começou
+# podem ser roubadas por um worker ocioso
+PREFETCH = 2
+
+TIMEOUT_COORDENADOR = (5, 30)
+
+# =============================================================================
+# CLASSES E SCHEMAS
+# =============================================================================
+
+
+class Coordenador:
+    """Serviço HTTP (JSON) dono da fila e do registro de consultas feitas,
+    para workers de várias máquinas/contas dividirem o trabalho.
+
+    Cada reserva é um lease: some da fila para os outros enquanto o worker
+    mandar heartbeats. Quem fica sem trabalho rouba as reservas que os
+    outros ainda não começaram ('inicia')."""
+
+    def __init__(
+        self,
+        path_fila: Path = PATH_FILA_COORDENADOR,
+        path_log: Path = PATH_LOG_CONSULTAS_FEITAS,
+        duracao_lease: float = DURACAO_LEASE,
+        host: str = HOST_COORDENADOR,
+        porta: int = PORTA_COORDENADOR,
+    ) -> None:
+        self.duracao_lease = duracao_lease
+        self.modo_fila = MODO_FILA
+        self.fila = FilaConsultas(
+            path_fila, timeout_visibilidade=duracao_lease
+        )
+        self.registro = RegistroConsultasFeitas(path_log)
+        # Worker -> chaves das consultas que ele já começou (não podem ser roubadas)
+        self.em_andamento: dict[str, set[str]] = defaultdict(set)
+        self.numero_roubos = 0
+        self._lock = threading.Lock()
+        self._http = ThreadingHTTPServer((host, porta), self._cria_handler())
+        self._thread = threading.Thread(
+            target=self._http.serve_forever, daemon=True
+        )
+        return None
+
+    @property
+    def url(self) -> str:
+        host, porta = self._http.server_address[:2]
+        return f"http://{host}:{porta}"
+
+    def __enter__(self) -> "Coordenador":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.fecha()
+        return None
+
+    def fecha(self) -> None:
+        self._http.shutdown()
+        self._http.server_close()
+        self.registro.salva()
+        return None
+
+    # -------------------------------------------------------------------------
+    # Operações (uma por rota)
+    # -------------------------------------------------------------------------
+
+    def adiciona(self, consultas: list[Consulta]) -> int:
+        """Põe na fila as que ainda não foram feitas e reordena a fila pelo
+        custo esperado (escalonador). Retorna quantas entraram."""
+
+        with self._lock:
+            numero_adicionadas = sum(
+                self.fila.adiciona(consulta)
+                for consulta in consultas
+                if not self.registro.ja_feita(consulta)
+            )
+            # Sem faixas: os workers remotos pegam na ordem da fila e os
+            # ociosos roubam as reservas dos outros <- a carga se equilibra
+            if numero_adicionadas > 0:
+                prioriza_fila(
+                    self.modo_fila, fila=self.fila, registro=self.registro
+                )
+        return numero_adicionadas
+
+    def reserva(self, worker: str, quantidade: int = 1) -> list[Consulta]:
+        with self._lock:
+            consultas = self.fila.reserva(quantidade, dono=worker)
+            if not consultas:
+                protegidas = set().union(*self.em_andamento.values())
+                consultas = self.fila.rouba(worker, quantidade, protegidas)
+                self.numero_roubos += len(consultas)
+                if consultas:
+                    LOGGER.info(
+                        f"Coordenador: 🥷 '{worker}' roubou {len(consultas)} consulta(s)."
+                    )
+            # Lease vencido e reservado por outro <- o dono antigo perdeu a consulta
+            for consulta in consultas:
+                for chaves in self.em_andamento.values():
+                    chaves.discard(chave_consulta(consulta))
+        return consultas
+
+    def inicia(self, worker: str, consulta: Consulta) -> bool:
+        """False = a consulta não é mais do worker (roubada ou lease vencido)"""
+
+        with self._lock:
+            if self.fila.dono_de(consulta) != worker:
+                return False
+            self.em_andamento[worker].add(chave_consulta(consulta))
+        return True
+
+    def heartbeat(
+        self, worker: str, consultas: list[Consulta]
+    ) -> list[Consulta]:
+        return self.fila.renova(consultas, worker)
+
+    def conclui(self, worker: str, consulta: Consulta) -> bool:
+        """False = a consulta não é mais do worker <- quem pegou é que conclui"""
+
+        with self._lock:
+            self.em_andamento[worker].discard(chave_consulta(consulta))
+            if self.fila.dono_de(consulta) != worker:
+                return False
+            self.registro.registra(consulta)
+            self.fila.confirma(consulta)
+        return True
+
+    def falha(self, worker: str, consulta: Consulta) -> None:
+        with self._lock:
+            self.em_andamento[worker].discard(chave_consulta(consulta))
+            if self.fila.dono_de(consulta) == worker:
+                self.fila.devolve(consulta)
+        return None
+
+    def estado(self) -> dict:
+        with self._lock:
+            em_andamento = {
+                worker: len(chaves)
+                for worker, chaves in self.em_andamento.items()
+                if chaves
+            }
+        return {
+            "pendentes": self.fila.numero_pendentes(),
+            "em_andamento": em_andamento,
+            "roubos": self.numero_roubos,
+        }
+
+    # -------------------------------------------------------------------------
+    # Rotas: POST com JSON {"worker": ..., "consulta(s)": ...}
+    # -------------------------------------------------------------------------
+
+    def _executa(self, rota: str, dados: dict) -> dict:
+        worker = dados.get("worker", "")
+        consultas = [
+            Consulta(**consulta) for consulta in dados.get("consultas", [])
+        ]
+        consulta = (
+            Consulta(**dados["consulta"]) if "consulta" in dados else None
+        )
+
+        if rota == "/consultas":
+            return {"adicionadas": self.adiciona(consultas)}
+        if rota == "/reserva":
+            reservadas = self.reserva(worker, int(dados.get("quantidade", 1)))
+            return {
+                "consultas": [c.model_dump() for c in reservadas],
+                "duracao_lease": self.duracao_lease,
+            }
+        if rota == "/heartbeat":
+            renovadas = self.heartbeat(worker, consultas)
+            return {"consultas": [c.model_dump() for c in renovadas]}
+        if rota not in {"/inicia", "/conclui", "/falha"}:
+            raise LookupError(rota)
+        if consulta is None:
+            raise ValueError("Faltou a 'consulta'")
+        if rota == "/inicia":
+            return {"ok": self.inicia(worker, consulta)}
+        if rota == "/conclui":
+            return {"ok": self.conclui(worker, consulta)}
+        self.falha(worker, consulta)
+        return {"ok": True}
+
+    def _cria_handler(self) -> type:
+        coordenador = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args) -> None:  # noqa: PLR6301
+                return None
+
+            def do_GET(self) -> None:
+                if self.path != "/estado":
+                    self._responde(404, {"erro": self.path})
+                    return None
+                self._responde(200, coordenador.estado())
+                return None
+
+            def do_POST(self) -> None:
+                tamanho = int(self.headers.get("Content-Length", 0))
+                try:
+                    dados = json.loads(self.rfile.read(tamanho) or b"{}")
+                    self._responde(200, coordenador._executa(self.path, dados))
+                except LookupError as e:
+                    self._responde(404, {"erro": str(e)})
+                except (ValueError, TypeError) as e:
+                    self._responde(400, {"erro": str(e)})
+                finally:
+                    # Uma thread por requisição <- fecha a conexão SQLite dela
+                    coordenador.fila.fecha()
+                return None
+
+            def _responde(self, status: int, corpo: dict) -> None:
+                texto = json.dumps(corpo, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(texto)))
+                self.end_headers()
+                self.wfile.write(texto)
+                return None
+
+        return Handler
+
+
+class ClienteCoordenador:
+    """Lado do worker: as mesmas operações do 'Coordenador', via HTTP"""
+
+    def __init__(
+        self, url: str = URL_COORDENADOR or "", worker: Optional[str] = None
+    ) -> None:
+        self.url = url.rstrip("/")
+        self.worker = nome_dono() if worker is None else worker
+        self.duracao_lease = DURACAO_LEASE
+        self._sessao = requests.Session()
+        # A thread de heartbeat usa a mesma sessão
+        self._lock = threading.Lock()
+        return None
+
+    def __enter__(self) -> "ClienteCoordenador":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self._sessao.close()
+        return None
+
+    def _post(self, rota: str, **dados) -> dict:
+        with self._lock:
+            resposta = self._sessao.post(
+                self.url + rota,
+                json={"worker": self.worker, **dados},
+                timeout=TIMEOUT_COORDENADOR,
+            )
+        resposta.raise_for_status()
+        return resposta.json()
+
+    def adiciona(self, consultas: list[Consulta]) -> int:
+        resposta = self._post(
+            "/consultas", consultas=[c.model_dump() for c in consultas]
+        )
+        return resposta["adicionadas"]
+
+    def reserva(self, quantidade: int = 1) -> list[Consulta]:
+        resposta = self._post("/reserva", quantidade=quantidade)
+        self.duracao_lease = resposta["duracao_lease"]
+        return [Consulta(**consulta) for consulta in resposta["consultas"]]
+
+    def inicia(self, consulta: Consulta) -> bool:
+        return self._post("/inicia", consulta=consulta.model_dump())["ok"]
+
+    def heartbeat(self, consultas: list[Consulta]) -> list[Consulta]:
+        resposta = self._post(
+            "/heartbeat", consultas=[c.model_dump() for c in consultas]
+        )
+        return [Consulta(**consulta) for consulta in resposta["consultas"]]
+
+    def conclui(self, consulta: Consulta) -> bool:
+        return self._post("/conclui", consulta=consulta.model_dump())["ok"]
+
+    def falha(self, consulta: Consulta) -> None:
+        self._post("/falha", consulta=consulta.model_dump())
+        return None
+
+    def estado(self) -> dict:
+        resposta = self._sessao.get(
+            self.url + "/estado", timeout=TIMEOUT_COORDENADOR
+        )
+        resposta.raise_for_status()
+        return resposta.json()
+
+
+# =============================================================================
+# FUNÇÕES
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# Worker: reserva PREFETCH consultas, manda heartbeats enquanto estiver com
+# elas e avisa o coordenador quando cada uma termina. Para quando o
+# coordenador não tiver mais nada (nem para roubar). Retorna quantas fez.
+# -----------------------------------------------------------------------------
+
+
+def worker_remoto(
+    cliente: ClienteCoordenador,
+    processa: Callable[[Consulta], None],
+    prefetch: int = PREFETCH,
+) -> int:
+    reservadas: list[Consulta] = []
+    lock = threading.Lock()
+    parar = threading.Event()
+
+    def manda_heartbeats() -> None:
+        while not parar.wait(cliente.duracao_lease / 3):
+            with lock:
+                atuais = list(reservadas)
+            if not atuais:
+                continue
+            try:
+                mantidas = cliente.heartbeat(atuais)
+            except requests.RequestException as e:
+                LOGGER.warning(f"worker_remoto: Heartbeat falhou: {e}")
+                continue
+            with lock:
+                reservadas[:] = [
+                    c for c in reservadas if c not in atuais or c in mantidas
+                ]
+        return None
+
+    thread_heartbeat = threading.Thread(target=manda_heartbeats, daemon=True)
+    numero_feitas = 0
+    try:
+        while True:
+            with lock:
+                consulta = reservadas[0] if reservadas else None
+            if consulta is None:
+                novas = cliente.reserva(prefetch)
+                if not novas:
+                    break
+                with lock:
+                    reservadas.extend(novas)
+                if not thread_heartbeat.is_alive():
+                    thread_heartbeat.start()
+                continue
+
+            # Roubada por um worker ocioso antes de começar <- segue para a próxima
+            if not cliente.inicia(consulta):
+                LOGGER.debug(
+                    f"worker_remoto: '{consulta.COUNTRY}' foi para outro worker."
+                )
+            else:
+                try:
+                    processa(consulta)
+                    if cliente.conclui(consulta):
+                        numero_feitas += 1
+                    else:
+                        LOGGER.warning(
+                            f"worker_remoto: '{consulta.COUNTRY}' foi para outro worker antes de concluir."
+                        )
+                except Exception as e:
+                    cliente.falha(consulta)
+                    LOGGER.warning(
+                        f"worker_remoto: Erro consulta para país '{consulta.COUNTRY}': {e}"
+                    )
+            with lock:
+                if consulta in reservadas:
+                    reservadas.remove(consulta)
+    finally:
+        parar.set()
+
+    return numero_feitas
+
+
+# -----------------------------------------------------------------------------
+# Manda a fila local (varredura desta máquina) para o coordenador
+# -----------------------------------------------------------------------------
+
+
+def publica_fila(cliente: ClienteCoordenador) -> int:
+    consultas = get_fila() or []
+    if not consultas:
+        return 0
+    numero_adicionadas = cliente.adiciona(consultas)
+    # Só depois do coordenador responder <- as que ele já tinha também saem
+    for consulta in consultas:
+        remove_da_fila(consulta)
+    LOGGER.info(
+        f"publica_fila: 📤 {numero_adicionadas} de {len(consultas)} consultas enviadas ao coordenador."
+    )
+    return numero_adicionadas
+
+
+# =============================================================================
+# CÓDIGO
+# =============================================================================
+
+if __name__ == "__main__":
+    with Coordenador() as coordenador:
+        LOGGER.info(f"Coordenador: 🛰️ Servindo a fila em {coordenador.url}")
+        coordenador._thread.join()
@@ -0,0 +1,190 @@
+# =============================================================================
+# BIBLIOTECAS E MÓDULOS
+# =============================================================================
+
+import csv
+import fcntl
+import json
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+from scraping_wto.log import LOGGER
+
+# =============================================================================
+# CONSTANTES
+# =============================================================================
+
+SEPARADOR = ";"
+SUFIXO_DIARIO = ".diario.jsonl"
+SUFIXO_COMPACTANDO = ".compactando.jsonl"
+SUFIXO_LOCK = ".lock"
+
+# Linhas no diário a partir das quais vale a pena compactar
+MAXIMO_LINHAS_DIARIO = 500
+
+# =============================================================================
+# CLASSES E SCHEMAS
+# =============================================================================
+
+
+class DiarioCSV:
+    """Log em CSV (uma linha por chave, ex.: país) alimentado por um diário
+    append-only. Cada registro é uma linha JSON gravada com fsync, então
+    registrar não depende do tamanho do log e vários processos podem
+    escrever ao mesmo tempo. A leitura junta o CSV (snapshot) com o diário;
+    'compacta' reescreve o CSV e descarta o diário."""
+
+    def __init__(
+        self,
+        path_csv: Path,
+        colunas: list[str],
+        chave: str = "COUNTRY",
+        maximo_linhas: int = MAXIMO_LINHAS_DIARIO,
+    ) -> None:
+        self.path_csv = Path(path_csv)
+        self.path_diario = self.path_csv.with_suffix(SUFIXO_DIARIO)
+        self.path_compactando = self.path_csv.with_suffix(SUFIXO_COMPACTANDO)
+        self.path_lock = self.path_csv.with_suffix(SUFIXO_LOCK)
+        self.colunas = colunas
+        self.chave = chave
+        self.maximo_linhas = maximo_linhas
+        # O diário de uma execução anterior também conta para compactar
+        self.numero_linhas = conta_linhas(self.path_diario)
+        self._lock = threading.Lock()
+        return None
+
+    # -------------------------------------------------------------------------
+    # Lock entre processos (flock): quem registra usa o compartilhado, quem
+    # compacta o exclusivo <- nenhuma linha vai para um diário já renomeado
+    # -------------------------------------------------------------------------
+
+    @contextmanager
+    def _lock_processos(self, modo: int = fcntl.LOCK_EX) -> Iterator[None]:
+        self.path_lock.parent.mkdir(exist_ok=True, parents=True)
+        with open(self.path_lock, "a", encoding="utf-8") as lock_f:
+            fcntl.flock(lock_f, modo)
+            try:
+                yield None
+            finally:
+                fcntl.flock(lock_f, fcntl.LOCK_UN)
+
+    # -------------------------------------------------------------------------
+    # Registro: uma linha no fim do diário (O_APPEND + fsync)
+    # -------------------------------------------------------------------------
+
+    def anota(self, linha: dict) -> None:
+        texto = json.dumps(
+            {coluna: linha[coluna] for coluna in self.colunas},
+            ensure_ascii=False,
+        )
+        with self._lock, self._lock_processos(fcntl.LOCK_SH):
+            # Uma única escrita por linha <- não mistura com as de outros processos
+            descritor = os.open(
+                self.path_diario, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644
+            )
+            try:
+                os.write(descritor, (texto + "\n").encode("utf-8"))
+                os.fsync(descritor)
+            finally:
+                os.close(descritor)
+            self.numero_linhas += 1
+        return None
+
+    def precisa_compactar(self) -> bool:
+        return self.numero_linhas >= self.maximo_linhas
+
+    # -------------------------------------------------------------------------
+    # Leitura: snapshot + diário, a última linha de cada chave vale
+    # -------------------------------------------------------------------------
+
+    def le(self) -> dict[str, dict]:
+        linhas = le_csv(self.path_csv, self.chave)
+        for path_diario in (self.path_compactando, self.path_diario):
+            for linha in le_diario(path_diario):
+                linhas[linha[self.chave]] = linha
+        return linhas
+
+    # -------------------------------------------------------------------------
+    # Compactação: o diário é renomeado antes <- o que for registrado durante
+    # a compactação vai para um diário novo e não se perde
+    # -------------------------------------------------------------------------
+
+    def compacta(self) -> None:
+        # Nada para compactar <- nem cria o arquivo de lock
+        if not (self.path_diario.exists() or self.path_compactando.exists()):
+            return None
+
+        with self._lock, self._lock_processos():
+            if not self.path_compactando.exists():
+                if not self.path_diario.exists():
+                    return None
+                os.replace(self.path_diario, self.path_compactando)
+            self.numero_linhas = 0
+
+            linhas = le_csv(self.path_csv, self.chave)
+            for linha in le_diario(self.path_compactando):
+                linhas[linha[self.chave]] = linha
+
+            # Nome único <- um CSV temporário nunca é de outro processo
+            path_temp = self.path_csv.with_suffix(
+                f".{os.getpid()}.{uuid.uuid4().hex}.tmp"
+            )
+            with open(path_temp, "w", encoding="utf-8", newline="") as csv_f:
+                escritor = csv.DictWriter(
+                    csv_f,
+                    fieldnames=self.colunas,
+                    delimiter=SEPARADOR,
+                    lineterminator="\n",
+                    extrasaction="ignore",
+                )
+                escritor.writeheader()
+                escritor.writerows(linhas[chave] for chave in sorted(linhas))
+                csv_f.flush()
+                os.fsync(csv_f.fileno())
+            os.replace(path_temp, self.path_csv)
+            self.path_compactando.unlink(missing_ok=True)
+
+        LOGGER.debug(
+            f"DiarioCSV: '{self.path_csv.name}' compactado ({len(linhas)} linhas)."
+        )
+        return None
+
+
+# =============================================================================
+# FUNÇÕES
+# =============================================================================
+
+
+def le_csv(path_csv: Path, chave: str) -> dict[str, dict]:
+    if not Path(path_csv).exists():
+        return {}
+    with open(path_csv, "r", encoding="utf-8", newline="") as csv_f:
+        return {
+            linha[chave]: linha
+            for linha in csv.DictReader(csv_f, delimiter=SEPARADOR)
+        }
+
+
+def conta_linhas(path_diario: Path) -> int:
+    if not Path(path_diario).exists():
+        return 0
+    with open(path_diario, "rb") as diario_f:
+        return sum(1 for _ in diario_f)
+
+
+def le_diario(path_diario: Path) -> Iterator[dict]:
+    if not Path(path_diario).exists():
+        return
+    with open(path_diario, "r", encoding="utf-8") as diario_f:
+        for linha in diario_f:
+            try:
+                yield json.loads(linha)
+            except json.JSONDecodeError:
+                # Última linha cortada por um crash no meio da escrita
+                LOGGER.warning(
+                    f"le_diario: Linha inválida em '{Path(path_diario).name}' ignorada."
+                )
@@ -86,7 +86,9 @@ def normaliza_nome_coluna(input_str: str) -> str:
 
     # Normalizando o texto conforme a forma NFKD
     nfkd_form = unicodedata.normalize("NFKD", input_str)
-    output_str = "".join([c for c in nfkd_form if not unicodedata.combining(c)])
+    output_str = "".join([
+        c for c in nfkd_form if not unicodedata.combining(c)
+    ])
 
     # Removendo as possíveis tags de HTML
     regex_tags = r"</?.>"
@@ -143,7 +145,9 @@ def empilha_relatorios() -> None:
     )
     for i, relatorio in enumerate(RELATORIOS, 1):
         t_0 = time()
-        path_destino = DIR_DESTINO / f"{relatorio.nome.lower().replace(' ', '_')}.csv"
+        path_destino = (
+            DIR_DESTINO / f"{relatorio.nome.lower().replace(' ', '_')}.csv"
+        )
         if path_destino.exists():
             LOGGER.debug(
                 f"empilha_relatorios: ✅ ({i}/{len(RELATORIOS)}) Relatórios '{relatorio.nome}' já foram empilhados!"
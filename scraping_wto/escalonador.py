@@ -0,0 +1,273 @@
+# =============================================================================
+# BIBLIOTECAS E MÓDULOS
+# =============================================================================
+
+import heapq
+import json
+import os
+import statistics
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from scraping_wto import controle_fluxo, website_scraping
+from scraping_wto.assinaturas import RegistroAssinaturas
+from scraping_wto.etapas import chave_consulta
+from scraping_wto.fila import FilaConsultas
+from scraping_wto.log import LOGGER
+from scraping_wto.metricas import ETAPA_ESPERA_EXPORTACAO, METRICAS
+from scraping_wto.modelo_exportacao import ModeloTempoExportacao
+from scraping_wto.registro_consultas import RegistroConsultasFeitas
+
+# =============================================================================
+# CONSTANTES
+# =============================================================================
+
+# "sjf" (mais curta primeiro), "prazo" (menor folga até o prazo de
+# atualização primeiro) ou "fifo" (ordem em que entraram na fila)
+MODO_FILA = os.getenv("MODO_FILA_WTO", "sjf")
+MODOS_FILA = ("sjf", "prazo", "fifo")
+
+# sjf: o custo é dividido por (1 + idade / ESCALA_IDADE_DIAS) <- uma cópia
+# local velha passa na frente de uma recente de custo parecido
+ESCALA_IDADE_DIAS = 30.0
+# País que nunca foi baixado conta como uma cópia desta idade
+IDADE_SEM_COPIA_DIAS = 365.0
+# sjf: cada falha seguida multiplica o custo por (1 + PENALIDADE_FALHA)
+PENALIDADE_FALHA = 1.0
+
+# prazo: a cópia local deveria ser atualizada a cada PRAZO_ATUALIZACAO_DIAS;
+# cada falha seguida adia o prazo em ATRASO_FALHA (s)
+PRAZO_ATUALIZACAO_DIAS = 30.0
+ATRASO_FALHA = 3600.0
+
+# Spans de uma consulta que contam como falha quando dão erro
+ETAPAS_FALHA = (
+    "exportacao",
+    ETAPA_ESPERA_EXPORTACAO,
+    "link_download",
+    "download_extracao",
+    "validacao",
+)
+
+SEGUNDOS_DIA = 24 * 3600
+
+# =============================================================================
+# CLASSES E SCHEMAS
+# =============================================================================
+
+
+class ModeloCusto:
+    """Custo esperado (s) de uma consulta: exportação (média móvel do
+    'ModeloTempoExportacao') + download (mediana dos spans
+    'download_extracao' do país; sem histórico, tamanho do último zip /
+    vazão média). O que não se sabe vale a mediana dos outros países."""
+
+    def __init__(
+        self,
+        path_metricas: Path,
+        modelo_exportacao: ModeloTempoExportacao,
+        assinaturas: RegistroAssinaturas,
+    ) -> None:
+        self.modelo_exportacao = modelo_exportacao
+        self.assinaturas = assinaturas
+        self.duracoes_download: dict[str, list[float]] = defaultdict(list)
+        self.falhas_seguidas: dict[str, int] = defaultdict(int)
+        self.vazao_zip: Optional[float] = None
+
+        bytes_zip, duracao_zip = 0, 0.0
+        falhas_execucao: dict[str, set[str]] = defaultdict(set)
+        for span in le_spans(path_metricas):
+            pais, etapa = span.get("pais"), span.get("etapa")
+            if etapa == "download" and span.get("erro") is None:
+                bytes_zip += span.get("bytes", 0)
+                duracao_zip += span.get("duracao", 0.0)
+            if pais is None or etapa not in ETAPAS_FALHA:
+                continue
+            if span.get("erro") is not None:
+                falhas_execucao[pais].add(span.get("execucao", ""))
+            elif etapa == "download_extracao":
+                self.duracoes_download[pais].append(span["duracao"])
+            elif etapa == "validacao":
+                # Validou <- zera as falhas seguidas
+                falhas_execucao[pais].clear()
+            self.falhas_seguidas[pais] = len(falhas_execucao[pais])
+
+        if bytes_zip > 0 and duracao_zip > 0:
+            self.vazao_zip = bytes_zip / duracao_zip
+        return None
+
+    def tempo_download(self, pais: str) -> Optional[float]:
+        if self.duracoes_download.get(pais):
+            return statistics.median(self.duracoes_download[pais])
+        assinatura = self.assinaturas.get(pais)
+        if (
+            assinatura is not None
+            and assinatura.tamanho_zip
+            and self.vazao_zip
+        ):
+            return assinatura.tamanho_zip / self.vazao_zip
+        return None
+
+    def custos(self, paises: list[str]) -> dict[str, float]:
+        exportacao = {
+            pais: self.modelo_exportacao.tempo_esperado(pais)
+            for pais in paises
+        }
+        download = {pais: self.tempo_download(pais) for pais in paises}
+        tipico_exportacao = mediana_conhecida(exportacao.values())
+        tipico_download = mediana_conhecida(download.values())
+        return {
+            pais: (
+                tipico_exportacao
+                if exportacao[pais] is None
+                else exportacao[pais]
+            )
+            + (tipico_download if download[pais] is None else download[pais])
+            for pais in paises
+        }
+
+
+# =============================================================================
+# FUNÇÕES
+# =============================================================================
+
+
+def le_spans(path_jsonl: Path) -> list[dict]:
+    if not Path(path_jsonl).exists():
+        return []
+    spans = []
+    with open(path_jsonl, "r", encoding="utf-8") as jsonl_f:
+        for linha in jsonl_f:
+            try:
+                spans.append(json.loads(linha))
+            except json.JSONDecodeError:
+                continue
+    return spans
+
+
+def mediana_conhecida(valores) -> float:
+    conhecidos = [valor for valor in valores if valor is not None]
+    return statistics.median(conhecidos) if conhecidos else 0.0
+
+
+# -----------------------------------------------------------------------------
+# Prioridade de cada consulta (menor = antes)
+# -----------------------------------------------------------------------------
+
+
+def prioridade(
+    modo: str,
+    custo: float,
+    falhas: int,
+    data_copia: Optional[datetime],
+    agora: datetime,
+) -> float:
+    if modo == "fifo":
+        return 0.0
+
+    if modo == "sjf":
+        idade = (
+            IDADE_SEM_COPIA_DIAS
+            if data_copia is None
+            else max(0.0, (agora - data_copia).total_seconds() / SEGUNDOS_DIA)
+        )
+        return (
+            custo
+            * (1 + PENALIDADE_FALHA * falhas)
+            / (1 + idade / ESCALA_IDADE_DIAS)
+        )
+
+    if modo == "prazo":
+        # Folga = tempo até o prazo - custo <- sem cópia, o prazo já venceu
+        prazo = (
+            0.0
+            if data_copia is None
+            else (data_copia - agora).total_seconds()
+            + PRAZO_ATUALIZACAO_DIAS * SEGUNDOS_DIA
+        )
+        return prazo - custo + ATRASO_FALHA * falhas
+
+    raise ValueError(
+        f"prioridade: Modo '{modo}' desconhecido (use {MODOS_FILA})."
+    )
+
+
+# -----------------------------------------------------------------------------
+# Bin packing (LPT): a consulta mais cara vai para a faixa menos carregada.
+# Cada worker reserva primeiro da sua faixa <- as cargas ficam parecidas
+# -----------------------------------------------------------------------------
+
+
+def distribui(custos: dict[str, float], numero_faixas: int) -> dict[str, int]:
+    cargas = [(0.0, faixa) for faixa in range(numero_faixas)]
+    faixas = {}
+    for chave, custo in sorted(
+        custos.items(), key=lambda item: (-item[1], item[0])
+    ):
+        carga, faixa = heapq.heappop(cargas)
+        faixas[chave] = faixa
+        heapq.heappush(cargas, (carga + custo, faixa))
+    return faixas
+
+
+# -----------------------------------------------------------------------------
+# Reordena a fila: prioridade (modo) + faixa de cada consulta quando há mais
+# de um worker. Retorna quantas consultas foram priorizadas. Sem 'fila' e
+# 'registro', usa os locais (o coordenador passa os dele).
+# -----------------------------------------------------------------------------
+
+
+def prioriza_fila(
+    modo: str = MODO_FILA,
+    numero_faixas: int = 1,
+    fila: Optional[FilaConsultas] = None,
+    registro: Optional[RegistroConsultasFeitas] = None,
+) -> int:
+    # Lidos na hora da chamada <- os testes trocam esses objetos
+    fila = controle_fluxo.FILA if fila is None else fila
+    registro = (
+        controle_fluxo.REGISTRO_CONSULTAS if registro is None else registro
+    )
+    if not fila.existe():
+        return 0
+
+    pendentes = fila.pendentes()
+    if not pendentes:
+        return 0
+
+    modelo = ModeloCusto(
+        METRICAS.path_jsonl,
+        website_scraping.MODELO_EXPORTACAO,
+        website_scraping.ASSINATURAS,
+    )
+    custos_paises = modelo.custos([
+        consulta.COUNTRY for consulta, _ in pendentes
+    ])
+    custos = {
+        chave_consulta(consulta): custos_paises[consulta.COUNTRY]
+        for consulta, _ in pendentes
+    }
+    faixas = distribui(custos, numero_faixas) if numero_faixas > 1 else {}
+
+    agora = datetime.now()
+    prioridades: dict[str, tuple[float, Optional[int]]] = {}
+    for consulta, tentativas in pendentes:
+        chave = chave_consulta(consulta)
+        prioridades[chave] = (
+            prioridade(
+                modo,
+                custos[chave],
+                modelo.falhas_seguidas.get(consulta.COUNTRY, 0) + tentativas,
+                registro.data_consulta(consulta.COUNTRY),
+                agora,
+            ),
+            faixas.get(chave),
+        )
+    fila.prioriza(prioridades)
+
+    LOGGER.info(
+        f"prioriza_fila: {len(prioridades)} consultas ordenadas (modo '{modo}', {max(numero_faixas, 1)} faixa(s))."
+    )
+    return len(prioridades)
@@ -0,0 +1,152 @@
+# =============================================================================
+# BIBLIOTECAS E MÓDULOS
+# =============================================================================
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+from scraping_wto.log import LOGGER
+from scraping_wto.schemas import Consulta, Etapa, EtapaConsulta
+from scraping_wto.utils import get_path_projeto
+
+# =============================================================================
+# CONSTANTES
+# =============================================================================
+
+path_projeto = get_path_projeto()
+assert isinstance(path_projeto, Path)
+
+PATH_ETAPAS_CONSULTAS = path_projeto / "log/etapas_consultas.json"
+
+# Depois de tantas retomadas com erro, a consulta recomeça do zero
+MAXIMO_TENTATIVAS_RETOMADA = 2
+
+# =============================================================================
+# CLASSES E SCHEMAS
+# =============================================================================
+
+
+class RegistroEtapas:
+    """Última etapa concluída de cada consulta em andamento, salva em disco.
+    Uma consulta que deu erro é retomada de onde parou na próxima execução."""
+
+    def __init__(self, path_arquivo: Path = PATH_ETAPAS_CONSULTAS) -> None:
+        self.path_arquivo = Path(path_arquivo)
+        self._lock = threading.Lock()
+        self._etapas: dict[str, EtapaConsulta] = {}
+        if self.path_arquivo.exists():
+            with open(self.path_arquivo, "r", encoding="utf-8") as json_f:
+                self._etapas = {
+                    chave: EtapaConsulta(**registro)
+                    for chave, registro in json.load(json_f).items()
+                }
+        return None
+
+    def get(self, consulta: Consulta) -> Optional[EtapaConsulta]:
+        with self._lock:
+            return self._etapas.get(chave_consulta(consulta))
+
+    def retomada(self, consulta: Consulta) -> Optional[EtapaConsulta]:
+        """Etapa de onde a consulta deve continuar (None = do zero)"""
+
+        registro = self.get(consulta)
+        if registro is None:
+            return None
+        if registro.tentativas >= MAXIMO_TENTATIVAS_RETOMADA:
+            LOGGER.warning(
+                f"RegistroEtapas: '{consulta.COUNTRY}' falhou {registro.tentativas}x a partir de '{registro.etapa.value}'. Recomeçando do zero."
+            )
+            self.remove(consulta)
+            return None
+        LOGGER.info(
+            f"RegistroEtapas: ⏩ '{consulta.COUNTRY}' retomada depois de '{registro.etapa.value}'."
+        )
+        return registro
+
+    def marca(self, consulta: Consulta, etapa: Etapa, **campos) -> None:
+        """Os campos não informados (ex.: início da exportação) são mantidos"""
+
+        chave = chave_consulta(consulta)
+        with self._lock:
+            anterior = self._etapas.get(chave)
+            registro = {} if anterior is None else anterior.model_dump()
+            registro.update(
+                campos, consulta=consulta, etapa=etapa, tentativas=0
+            )
+            self._etapas[chave] = EtapaConsulta(**registro)
+            self._salva()
+        LOGGER.debug(f"RegistroEtapas: '{consulta.COUNTRY}' -> {etapa.value}")
+        return None
+
+    def falhou(self, consulta: Consulta) -> None:
+        with self._lock:
+            registro = self._etapas.get(chave_consulta(consulta))
+            if registro is None:
+                return None
+            registro.tentativas += 1
+            self._salva()
+        return None
+
+    def remove(self, consulta: Consulta) -> None:
+        with self._lock:
+            if self._etapas.pop(chave_consulta(consulta), None) is not None:
+                self._salva()
+        return None
+
+    def descarta_exportacoes(
+        self, consultas: Optional[list[Consulta]] = None
+    ) -> None:
+        """Os relatórios foram deletados no site <- as etapas que dependiam
+        deles (antes da extração) não valem mais. Sem consultas: todas."""
+
+        chaves = (
+            None
+            if consultas is None
+            else {chave_consulta(c) for c in consultas}
+        )
+        with self._lock:
+            descartadas = [
+                chave
+                for chave, registro in self._etapas.items()
+                if (chaves is None or chave in chaves)
+                and not registro.etapa.passou(Etapa.EXTRAIDO)
+            ]
+            for chave in descartadas:
+                del self._etapas[chave]
+            if descartadas:
+                self._salva()
+        return None
+
+    def _salva(self) -> None:
+        # Escreve num arquivo temporário e troca <- nunca deixa o JSON pela metade
+        self.path_arquivo.parent.mkdir(exist_ok=True, parents=True)
+        path_temp = self.path_arquivo.with_suffix(".tmp")
+        with open(path_temp, "w", encoding="utf-8") as json_f:
+            json.dump(
+                {
+                    chave: registro.model_dump(mode="json")
+                    for chave, registro in self._etapas.items()
+                },
+                json_f,
+                indent=2,
+                sort_keys=True,
+            )
+        os.replace(path_temp, self.path_arquivo)
+        return None
+
+
+# =============================================================================
+# FUNÇÕES
+# =============================================================================
+
+
+def chave_consulta(consulta: Consulta) -> str:
+    return "|".join((
+        consulta.COUNTRY,
+        consulta.YEAR,
+        consulta.IMPORTS,
+        consulta.NOMENCLATURE,
+    ))
@@ -0,0 +1,478 @@
+# =============================================================================
+# BIBLIOTECAS E MÓDULOS
+# =============================================================================
+
+import io
+import os
+import struct
+import zipfile
+import zlib
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO, Callable, Optional
+
+from scraping_wto.gerenciador_downloads import DestinoArquivo, path_parcial
+from scraping_wto.log import LOGGER
+from scraping_wto.schemas import MembroExtraido
+
+# =============================================================================
+# CONSTANTES
+# =============================================================================
+
+ASSINATURA_LOCAL = b"PK\x03\x04"
+ASSINATURA_CENTRAL = b"PK\x01\x02"
+ASSINATURA_FIM = b"PK\x05\x06"
+ASSINATURA_DESCRITOR = b"PK\x07\x08"
+
+# Cabeçalho local: assinatura, versão, flags, método, hora, data, crc32,
+# tamanho comprimido, tamanho original, tamanho do nome, tamanho do extra
+FORMATO_CABECALHO = struct.Struct("<4sHHHHHIIIHH")
+
+# Entrada do diretório central: assinatura, versões (2), flags, método, hora,
+# data, crc32, tamanhos (2), tamanhos do nome/extra/comentário, disco,
+# atributos (2), posição do cabeçalho local
+FORMATO_CENTRAL = struct.Struct("<4sHHHHHHIIIHHHHHII")
+
+FLAG_CRIPTOGRAFADO = 0x0001
+FLAG_DESCRITOR = 0x0008
+FLAG_UTF8 = 0x0800
+
+METODO_STORED = 0
+METODO_DEFLATE = 8
+
+# Campo extra do ZIP64 e o valor que indica "o tamanho está no ZIP64"
+ID_EXTRA_ZIP64 = 0x0001
+TAMANHO_ZIP64 = 0xFFFFFFFF
+
+# Descritor (sem assinatura): crc32 + tamanhos de 4 (ou 8, no ZIP64) bytes
+TAMANHO_DESCRITOR = 12
+TAMANHO_DESCRITOR_ZIP64 = 20
+
+# =============================================================================
+# CLASSES E SCHEMAS
+# =============================================================================
+
+
+class ErroZipStream(Exception):
+    pass
+
+
+class ExtratorZipStream(DestinoArquivo):
+    """Extrai o zip enquanto ele é baixado, lendo os cabeçalhos locais na
+    ordem em que chegam. Só os membros selecionados são gravados, cada um
+    numa única passada. O zip em si só é salvo se 'path_auditoria' for dado"""
+
+    def __init__(
+        self,
+        dir_destino: Path,
+        seleciona: Optional[Callable[[str], bool]] = None,
+        path_auditoria: Optional[Path] = None,
+    ) -> None:
+        super().__init__(path_auditoria)
+        self.dir_destino = Path(dir_destino)
+        self.seleciona = membro_txt if seleciona is None else seleciona
+        self.membros: list[MembroExtraido] = []
+        # nome -> (crc32, tamanho original), como registrado no fim do zip
+        self.diretorio_central: dict[str, tuple[int, int]] = {}
+        self._reinicia_leitura()
+        return None
+
+    def _reinicia_leitura(self) -> None:
+        self._buffer = bytearray()
+        self._estado = "cabecalho"
+        self._nome = ""
+        self._flags = 0
+        self._zip64 = False
+        self._crc_esperado = 0
+        self._tamanho_esperado = 0
+        self._restante: Optional[int] = None
+        self._descompressor = None
+        self._crc = 0
+        self._tamanho = 0
+        self._numero_linhas = 0
+        self._ultimo_byte = b""
+        self._saida_f: Optional[BinaryIO] = None
+        self._path_saida: Optional[Path] = None
+        return None
+
+    # -------------------------------------------------------------------------
+    # Interface de 'DestinoArquivo'
+    # -------------------------------------------------------------------------
+
+    def escreve(self, bloco: bytes) -> None:
+        super().escreve(bloco)
+        self._buffer += bloco
+        try:
+            self._processa()
+        except zlib.error as e:
+            raise ErroZipStream(
+                f"ExtratorZipStream: '{self._nome}' corrompido ({e})"
+            )
+        return None
+
+    def conclui(self) -> None:
+        if self._estado != "fim":
+            raise ErroZipStream(
+                f"ExtratorZipStream: zip terminou no meio de '{self._nome or 'cabeçalho'}'"
+            )
+        super().conclui()
+        # Só agora os membros aparecem com o nome final
+        for membro in self.membros:
+            os.replace(
+                path_parcial(Path(membro.path_arquivo)), membro.path_arquivo
+            )
+        LOGGER.debug(
+            f"ExtratorZipStream: ✅ {len(self.membros)} arquivos extraídos em '{self.dir_destino}'"
+        )
+        return None
+
+    def descarta(self) -> None:
+        super().descarta()
+        if self._saida_f is not None:
+            self._saida_f.close()
+        if self._path_saida is not None:
+            path_parcial(self._path_saida).unlink(missing_ok=True)
+        for membro in self.membros:
+            path_parcial(Path(membro.path_arquivo)).unlink(missing_ok=True)
+        self.membros = []
+        self.diretorio_central = {}
+        self._reinicia_leitura()
+        return None
+
+    # -------------------------------------------------------------------------
+    # Leitura do zip
+    # -------------------------------------------------------------------------
+
+    def _processa(self) -> None:
+        while True:
+            if self._estado == "cabecalho":
+                avancou = self._le_cabecalho()
+            elif self._estado == "dados":
+                avancou = self._le_dados()
+            elif self._estado == "descritor":
+                avancou = self._le_descritor()
+            elif self._estado == "central":
+                avancou = self._le_central()
+            else:
+                # Registros finais: tudo o que interessa já foi lido
+                self._buffer.clear()
+                return None
+            if not avancou:
+                return None
+
+    def _le_cabecalho(self) -> bool:
+        if len(self._buffer) < len(ASSINATURA_LOCAL):
+            return False
+
+        assinatura = bytes(self._buffer[: len(ASSINATURA_LOCAL)])
+        if assinatura == ASSINATURA_CENTRAL:
+            self._estado = "central"
+            return True
+        if assinatura == ASSINATURA_FIM:
+            self._estado = "fim"
+            return True
+        if assinatura != ASSINATURA_LOCAL:
+            raise ErroZipStream(
+                f"ExtratorZipStream: assinatura inesperada {assinatura!r}"
+            )
+
+        if len(self._buffer) < FORMATO_CABECALHO.size:
+            return False
+        (
+            _,
+            _,
+            flags,
+            metodo,
+            _,
+            _,
+            crc,
+            tamanho_comprimido,
+            tamanho,
+            tamanho_nome,
+            tamanho_extra,
+        ) = FORMATO_CABECALHO.unpack_from(self._buffer)
+
+        fim_cabecalho = FORMATO_CABECALHO.size + tamanho_nome + tamanho_extra
+        if len(self._buffer) < fim_cabecalho:
+            return False
+
+        nome_bytes = bytes(
+            self._buffer[
+                FORMATO_CABECALHO.size : FORMATO_CABECALHO.size + tamanho_nome
+            ]
+        )
+        extra = bytes(
+            self._buffer[FORMATO_CABECALHO.size + tamanho_nome : fim_cabecalho]
+        )
+        del self._buffer[:fim_cabecalho]
+
+        if flags & FLAG_CRIPTOGRAFADO:
+            raise ErroZipStream("ExtratorZipStream: zip criptografado")
+        if metodo not in {METODO_STORED, METODO_DEFLATE}:
+            raise ErroZipStream(
+                f"ExtratorZipStream: método de compressão {metodo}"
+            )
+        if metodo == METODO_STORED and flags & FLAG_DESCRITOR:
+            raise ErroZipStream(
+                "ExtratorZipStream: membro sem compressão e sem tamanho"
+            )
+
+        self._nome = nome_bytes.decode(
+            "utf-8" if flags & FLAG_UTF8 else "cp437"
+        )
+        self._flags = flags
+        campo_zip64 = campo_extra(extra, ID_EXTRA_ZIP64)
+        self._zip64 = campo_zip64 is not None
+        if TAMANHO_ZIP64 in {tamanho, tamanho_comprimido}:
+            if campo_zip64 is None:
+                raise ErroZipStream(
+                    "ExtratorZipStream: ZIP64 sem o campo extra"
+                )
+            tamanho, tamanho_comprimido = tamanhos_zip64(
+                campo_zip64, tamanho, tamanho_comprimido
+            )
+        self._crc_esperado = crc
+        self._tamanho_esperado = tamanho
+        self._restante = None if flags & FLAG_DESCRITOR else tamanho_comprimido
+        self._descompressor = (
+            zlib.decompressobj(-zlib.MAX_WBITS)
+            if metodo == METODO_DEFLATE
+            else None
+        )
+        self._crc = 0
+        self._tamanho = 0
+        self._numero_linhas = 0
+        self._ultimo_byte = b""
+        self._abre_saida()
+        self._estado = "dados"
+        return True
+
+    def _abre_saida(self) -> None:
+        self._saida_f = None
+        self._path_saida = None
+        if self._nome.endswith("/") or not self.seleciona(self._nome):
+            return None
+
+        caminho = PurePosixPath(self._nome)
+        if caminho.is_absolute() or ".." in caminho.parts:
+            raise ErroZipStream(
+                f"ExtratorZipStream: caminho inválido '{self._nome}'"
+            )
+
+        self._path_saida = self.dir_destino.joinpath(*caminho.parts)
+        self._path_saida.parent.mkdir(exist_ok=True, parents=True)
+        self._saida_f = open(path_parcial(self._path_saida), "wb")
+        return None
+
+    def _grava(self, dados: bytes) -> None:
+        if not dados:
+            return None
+        self._crc = zlib.crc32(dados, self._crc)
+        self._tamanho += len(dados)
+        if self._saida_f is not None:
+            self._saida_f.write(dados)
+            self._numero_linhas += dados.count(b"\n")
+            self._ultimo_byte = dados[-1:]
+        return None
+
+    def _le_dados(self) -> bool:
+        # Tamanho conhecido: consome exatamente os bytes do membro. Os que não
+        # foram selecionados nem são descomprimidos
+        if self._restante is not None:
+            pedaco = bytes(self._buffer[: self._restante])
+            del self._buffer[: len(pedaco)]
+            self._restante -= len(pedaco)
+            if self._saida_f is None:
+                pass
+            elif self._descompressor is None:
+                self._grava(pedaco)
+            else:
+                self._grava(self._descompressor.decompress(pedaco))
+            if self._restante > 0:
+                return False
+            if self._saida_f is not None and self._descompressor is not None:
+                self._grava(self._descompressor.flush())
+            self._estado = (
+                "descritor" if self._flags & FLAG_DESCRITOR else "cabecalho"
+            )
+            if self._estado == "cabecalho":
+                self._fecha_membro()
+            return True
+
+        # Tamanho só no descritor: o fim do deflate marca o fim do membro
+        assert self._descompressor is not None
+        self._grava(self._descompressor.decompress(bytes(self._buffer)))
+        self._buffer.clear()
+        if not self._descompressor.eof:
+            return False
+        self._buffer += self._descompressor.unused_data
+        self._estado = "descritor"
+        return True
+
+    def _le_descritor(self) -> bool:
+        tamanho = TAMANHO_DESCRITOR_ZIP64 if self._zip64 else TAMANHO_DESCRITOR
+        # +4 <- assinatura opcional do descritor
+        if len(self._buffer) < tamanho + len(ASSINATURA_DESCRITOR):
+            return False
+        inicio = (
+            len(ASSINATURA_DESCRITOR)
+            if self._buffer.startswith(ASSINATURA_DESCRITOR)
+            else 0
+        )
+        # crc32, tamanho comprimido, tamanho original
+        formato = "<IQQ" if self._zip64 else "<III"
+        crc, _, tamanho_original = struct.unpack_from(
+            formato, self._buffer, inicio
+        )
+        del self._buffer[: inicio + tamanho]
+        self._crc_esperado = crc
+        self._tamanho_esperado = tamanho_original
+        self._fecha_membro()
+        self._estado = "cabecalho"
+        return True
+
+    def _fecha_membro(self) -> None:
+        if self._saida_f is None:
+            return None
+        if (
+            self._crc != self._crc_esperado
+            or self._tamanho != self._tamanho_esperado
+        ):
+            raise ErroZipStream(
+                f"ExtratorZipStream: '{self._nome}' corrompido (crc {self._crc:08x} != {self._crc_esperado:08x})"
+            )
+        self._saida_f.close()
+        self._saida_f = None
+        self.membros.append(
+            MembroExtraido(
+                nome=self._nome,
+                path_arquivo=str(self._path_saida),
+                crc32=self._crc,
+                tamanho=self._tamanho,
+                # A última linha pode não ter '\n'
+                numero_linhas=self._numero_linhas
+                + (self._ultimo_byte not in {b"", b"\n"}),
+            )
+        )
+        self._path_saida = None
+        return None
+
+    def _le_central(self) -> bool:
+        if len(self._buffer) < len(ASSINATURA_CENTRAL):
+            return False
+        if not self._buffer.startswith(ASSINATURA_CENTRAL):
+            # Fim do diretório central (ZIP64 ou não)
+            self._estado = "fim"
+            return True
+
+        if len(self._buffer) < FORMATO_CENTRAL.size:
+            return False
+        campos = FORMATO_CENTRAL.unpack_from(self._buffer)
+        flags, crc, tamanho_comprimido, tamanho = (
+            campos[3],
+            campos[7],
+            campos[8],
+            campos[9],
+        )
+        tamanho_nome, tamanho_extra, tamanho_comentario = (
+            campos[10],
+            campos[11],
+            campos[12],
+        )
+
+        fim_entrada = (
+            FORMATO_CENTRAL.size
+            + tamanho_nome
+            + tamanho_extra
+            + tamanho_comentario
+        )
+        if len(self._buffer) < fim_entrada:
+            return False
+
+        inicio_extra = FORMATO_CENTRAL.size + tamanho_nome
+        nome = bytes(self._buffer[FORMATO_CENTRAL.size : inicio_extra]).decode(
+            "utf-8" if flags & FLAG_UTF8 else "cp437"
+        )
+        extra = bytes(
+            self._buffer[inicio_extra : inicio_extra + tamanho_extra]
+        )
+        del self._buffer[:fim_entrada]
+
+        if TAMANHO_ZIP64 in {tamanho, tamanho_comprimido}:
+            campo_zip64 = campo_extra(extra, ID_EXTRA_ZIP64)
+            if campo_zip64 is None:
+                raise ErroZipStream(
+                    "ExtratorZipStream: ZIP64 sem o campo extra"
+                )
+            tamanho, _ = tamanhos_zip64(
+                campo_zip64, tamanho, tamanho_comprimido
+            )
+        self.diretorio_central[nome] = (crc, tamanho)
+        return True
+
+
+# =============================================================================
+# FUNÇÕES
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# Membros extraídos por padrão: as tabelas em texto
+# -----------------------------------------------------------------------------
+
+
+def membro_txt(nome: str) -> bool:
+    return nome.lower().endswith(".txt")
+
+
+# -----------------------------------------------------------------------------
+# Conteúdo de um campo do "extra" do cabeçalho local
+# -----------------------------------------------------------------------------
+
+
+def campo_extra(extra: bytes, id_procurado: int) -> Optional[bytes]:
+    posicao = 0
+    while posicao + 4 <= len(extra):
+        id_campo, tamanho_campo = struct.unpack_from("<HH", extra, posicao)
+        if id_campo == id_procurado:
+            return extra[posicao + 4 : posicao + 4 + tamanho_campo]
+        posicao += 4 + tamanho_campo
+    return None
+
+
+# -----------------------------------------------------------------------------
+# Tamanhos reais de um membro ZIP64
+# -----------------------------------------------------------------------------
+
+
+def tamanhos_zip64(
+    campo: bytes, tamanho: int, tamanho_comprimido: int
+) -> tuple[int, int]:
+    valores = struct.unpack_from(f"<{len(campo) // 8}Q", campo)
+    # A ordem é fixa, mas só aparecem os tamanhos que estouraram
+    n = 0
+    if tamanho == TAMANHO_ZIP64:
+        tamanho = valores[n]
+        n += 1
+    if tamanho_comprimido == TAMANHO_ZIP64:
+        tamanho_comprimido = valores[n]
+    return tamanho, tamanho_comprimido
+
+
+# -----------------------------------------------------------------------------
+# Diretório central a partir só do fim do zip (nome -> crc32, tamanho).
+# None = a cauda não tem o diretório central inteiro
+# -----------------------------------------------------------------------------
+
+
+def diretorio_central_da_cauda(
+    cauda: bytes,
+) -> Optional[dict[str, tuple[int, int]]]:
+    # O zipfile aceita um zip "deslocado" (com bytes faltando no começo)
+    # enquanto os registros do fim e o diretório central estiverem inteiros
+    try:
+        with zipfile.ZipFile(io.BytesIO(cauda)) as zip_f:
+            return {
+                info.filename: (info.CRC, info.file_size)
+                for info in zip_f.infolist()
+            }
+    except (zipfile.BadZipFile, ValueError, OSError, struct.error):
+        return None
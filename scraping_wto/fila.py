@@ -0,0 +1,434 @@
+# =============================================================================
+# BIBLIOTECAS E MÓDULOS
+# =============================================================================
+
+import json
+import os
+import pickle
+import socket
+import sqlite3
+import threading
+from pathlib import Path
+from time import time
+from typing import Iterable, Optional
+
+from scraping_wto.etapas import chave_consulta
+from scraping_wto.log import LOGGER
+from scraping_wto.schemas import Consulta
+from scraping_wto.utils import get_path_projeto
+
+# =============================================================================
+# CONSTANTES
+# =============================================================================
+
+path_projeto = get_path_projeto()
+assert isinstance(path_projeto, Path)
+
+PATH_FILA_CONSULTAS = path_projeto / "temp/consultas_a_fazer.sqlite3"
+
+# A fila antiga (lista de consultas em pickle) é renomeada depois de importada
+SUFIXO_PICKLE_IMPORTADO = ".importado"
+
+# Uma consulta reservada por um worker que morreu volta para a fila depois
+# desse tempo (s). Uma consulta completa (exportação + download) leva minutos.
+TIMEOUT_VISIBILIDADE = float(os.getenv("TIMEOUT_VISIBILIDADE_WTO", "1800"))
+
+# Consulta que deu erro só volta a ser reservada depois desse tempo (s)
+ATRASO_DEVOLUCAO = 60.0
+
+# Reservas por execução <- depois disso a consulta espera a próxima execução
+MAXIMO_TENTATIVAS_FILA = 3
+
+# Espera (s) pelo lock do SQLite quando outro processo está escrevendo
+TIMEOUT_LOCK = 30.0
+
+SQL_CRIA_TABELA = """
+CREATE TABLE IF NOT EXISTS consultas (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    chave TEXT NOT NULL UNIQUE,
+    consulta TEXT NOT NULL,
+    tentativas INTEGER NOT NULL DEFAULT 0,
+    visivel_em REAL NOT NULL DEFAULT 0,
+    dono TEXT,
+    prioridade REAL NOT NULL DEFAULT 0,
+    faixa INTEGER
+)
+"""
+
+# Colunas que as filas criadas antes do escalonador não têm
+COLUNAS_NOVAS = {"prioridade": "REAL NOT NULL DEFAULT 0", "faixa": "INTEGER"}
+
+# =============================================================================
+# CLASSES E SCHEMAS
+# =============================================================================
+
+
+class FilaConsultas:
+    """Fila de consultas num SQLite (modo WAL): cada operação é uma transação,
+    então um crash não corrompe a fila e vários processos podem usá-la.
+
+    'reserva' esconde a consulta dos outros workers por TIMEOUT_VISIBILIDADE;
+    'confirma' tira da fila (deu certo) e 'devolve' libera de novo (deu erro)."""
+
+    def __init__(
+        self,
+        path_arquivo: Path = PATH_FILA_CONSULTAS,
+        timeout_visibilidade: float = TIMEOUT_VISIBILIDADE,
+        maximo_tentativas: int = MAXIMO_TENTATIVAS_FILA,
+    ) -> None:
+        self.path_arquivo = Path(path_arquivo)
+        self.timeout_visibilidade = timeout_visibilidade
+        self.maximo_tentativas = maximo_tentativas
+        # Uma conexão por thread (o sqlite3 não compartilha conexões)
+        self._local = threading.local()
+        return None
+
+    def existe(self) -> bool:
+        return self.path_arquivo.exists()
+
+    # -------------------------------------------------------------------------
+    # Conexão da thread <- cria o arquivo e a tabela na primeira vez
+    # -------------------------------------------------------------------------
+
+    def _conexao(self) -> sqlite3.Connection:
+        conexao = getattr(self._local, "conexao", None)
+        if (
+            conexao is not None
+            and getattr(self._local, "path", None) == self.path_arquivo
+        ):
+            return conexao
+
+        self.path_arquivo.parent.mkdir(exist_ok=True, parents=True)
+        # Autocommit <- as transações são abertas explicitamente ('BEGIN IMMEDIATE')
+        conexao = sqlite3.connect(
+            self.path_arquivo, timeout=TIMEOUT_LOCK, isolation_level=None
+        )
+        conexao.execute("PRAGMA journal_mode=WAL")
+        conexao.execute("PRAGMA synchronous=NORMAL")
+        conexao.execute(SQL_CRIA_TABELA)
+        migra_tabela(conexao)
+        self._local.conexao = conexao
+        self._local.path = self.path_arquivo
+        return conexao
+
+    def fecha(self) -> None:
+        """Fecha a conexão da thread atual"""
+
+        conexao = getattr(self._local, "conexao", None)
+        if conexao is not None:
+            conexao.close()
+            self._local.conexao = None
+        return None
+
+    # -------------------------------------------------------------------------
+    # Enfileirar: O(1), repetidas são ignoradas
+    # -------------------------------------------------------------------------
+
+    def adiciona(self, consulta: Consulta) -> bool:
+        """Retorna False se a consulta já estava na fila"""
+
+        cursor = self._conexao().execute(
+            "INSERT OR IGNORE INTO consultas (chave, consulta) VALUES (?, ?)",
+            (chave_consulta(consulta), consulta.model_dump_json()),
+        )
+        return cursor.rowcount == 1
+
+    # -------------------------------------------------------------------------
+    # Reservar (claim): as consultas visíveis de menor prioridade (empate =
+    # mais antigas). Com 'faixa', as da faixa do worker vêm antes das outras.
+    # -------------------------------------------------------------------------
+
+    def reserva(
+        self,
+        quantidade: int = 1,
+        dono: Optional[str] = None,
+        faixa: Optional[int] = None,
+    ) -> list[Consulta]:
+        conexao = self._conexao()
+        agora = time()
+        dono = nome_dono() if dono is None else dono
+
+        # 'IMMEDIATE' pega o lock de escrita antes do SELECT <- dois processos
+        # nunca reservam a mesma consulta
+        conexao.execute("BEGIN IMMEDIATE")
+        try:
+            linhas = conexao.execute(
+                "SELECT id, consulta FROM consultas WHERE visivel_em <= ? AND tentativas < ? "
+                "ORDER BY CASE WHEN faixa = ? THEN 0 ELSE 1 END, prioridade, id LIMIT ?",
+                (agora, self.maximo_tentativas, faixa, quantidade),
+            ).fetchall()
+            conexao.executemany(
+                "UPDATE consultas SET visivel_em = ?, tentativas = tentativas + 1, dono = ? WHERE id = ?",
+                [
+                    (agora + self.timeout_visibilidade, dono, id_linha)
+                    for id_linha, _ in linhas
+                ],
+            )
+            conexao.execute("COMMIT")
+        except BaseException:
+            conexao.execute("ROLLBACK")
+            raise
+
+        return [Consulta(**json.loads(consulta)) for _, consulta in linhas]
+
+    def confirma(self, consulta: Consulta) -> None:
+        """Ack: a consulta foi feita <- sai da fila"""
+
+        self._conexao().execute(
+            "DELETE FROM consultas WHERE chave = ?",
+            (chave_consulta(consulta),),
+        )
+        return None
+
+    def devolve(
+        self, consulta: Consulta, atraso: float = ATRASO_DEVOLUCAO
+    ) -> None:
+        """Nack: a consulta volta a ser visível depois de 'atraso' segundos"""
+
+        self._conexao().execute(
+            "UPDATE consultas SET visivel_em = ?, dono = NULL WHERE chave = ?",
+            (time() + atraso, chave_consulta(consulta)),
+        )
+        return None
+
+    # -------------------------------------------------------------------------
+    # Leases (coordenador): renovação por heartbeat e roubo de reservas
+    # -------------------------------------------------------------------------
+
+    def renova(self, consultas: list[Consulta], dono: str) -> list[Consulta]:
+        """Heartbeat: estende a reserva das consultas que ainda são do 'dono'.
+        Retorna essas (as outras foram reservadas ou roubadas por outro)."""
+
+        conexao = self._conexao()
+        visivel_em = time() + self.timeout_visibilidade
+        renovadas = []
+        conexao.execute("BEGIN IMMEDIATE")
+        try:
+            for consulta in consultas:
+                cursor = conexao.execute(
+                    "UPDATE consultas SET visivel_em = ? WHERE chave = ? AND dono = ?",
+                    (visivel_em, chave_consulta(consulta), dono),
+                )
+                if cursor.rowcount == 1:
+                    renovadas.append(consulta)
+            conexao.execute("COMMIT")
+        except BaseException:
+            conexao.execute("ROLLBACK")
+            raise
+        return renovadas
+
+    def rouba(
+        self, dono: str, quantidade: int = 1, protegidas: Iterable[str] = ()
+    ) -> list[Consulta]:
+        """Work stealing: pega reservas de outros workers que ainda não foram
+        começadas (as chaves em 'protegidas' já estão sendo baixadas). Rouba
+        as últimas reservadas <- o dono vai trabalhar nas primeiras."""
+
+        conexao = self._conexao()
+        agora = time()
+        protegidas = set(protegidas)
+        conexao.execute("BEGIN IMMEDIATE")
+        try:
+            linhas = [
+                (id_linha, consulta)
+                for id_linha, chave, consulta in conexao.execute(
+                    "SELECT id, chave, consulta FROM consultas WHERE dono IS NOT NULL AND dono != ? AND visivel_em > ? ORDER BY id DESC",
+                    (dono, agora),
+                )
+                if chave not in protegidas
+            ][:quantidade]
+            conexao.executemany(
+                "UPDATE consultas SET visivel_em = ?, dono = ? WHERE id = ?",
+                [
+                    (agora + self.timeout_visibilidade, dono, id_linha)
+                    for id_linha, _ in linhas
+                ],
+            )
+            conexao.execute("COMMIT")
+        except BaseException:
+            conexao.execute("ROLLBACK")
+            raise
+        return [Consulta(**json.loads(consulta)) for _, consulta in linhas]
+
+    def dono_de(self, consulta: Consulta) -> Optional[str]:
+        linha = (
+            self
+            ._conexao()
+            .execute(
+                "SELECT dono FROM consultas WHERE chave = ?",
+                (chave_consulta(consulta),),
+            )
+            .fetchone()
+        )
+        return None if linha is None else linha[0]
+
+    # -------------------------------------------------------------------------
+    # Escalonador: prioridade (menor = antes) e faixa (worker) de cada consulta
+    # -------------------------------------------------------------------------
+
+    def prioriza(
+        self, prioridades: dict[str, tuple[float, Optional[int]]]
+    ) -> None:
+        """'prioridades': chave da consulta -> (prioridade, faixa)"""
+
+        conexao = self._conexao()
+        conexao.execute("BEGIN IMMEDIATE")
+        try:
+            conexao.executemany(
+                "UPDATE consultas SET prioridade = ?, faixa = ? WHERE chave = ?",
+                [
+                    (valor, faixa, chave)
+                    for chave, (valor, faixa) in prioridades.items()
+                ],
+            )
+            conexao.execute("COMMIT")
+        except BaseException:
+            conexao.execute("ROLLBACK")
+            raise
+        return None
+
+    def reinicia_tentativas(self) -> None:
+        """Nova execução: as consultas que esgotaram as tentativas voltam, e as
+        reservas de processos desta máquina que já morreram são liberadas
+        (as de outros processos vivos continuam valendo)"""
+
+        conexao = self._conexao()
+        conexao.execute("BEGIN IMMEDIATE")
+        try:
+            conexao.execute(
+                "UPDATE consultas SET tentativas = 0 WHERE visivel_em <= ?",
+                (time(),),
+            )
+            orfas = [
+                (id_linha,)
+                for id_linha, dono in conexao.execute(
+                    "SELECT id, dono FROM consultas WHERE dono IS NOT NULL"
+                )
+                if dono_morto(dono)
+            ]
+            conexao.executemany(
+                "UPDATE consultas SET tentativas = 0, visivel_em = 0, dono = NULL WHERE id = ?",
+                orfas,
+            )
+            conexao.execute("COMMIT")
+        except BaseException:
+            conexao.execute("ROLLBACK")
+            raise
+        return None
+
+    # -------------------------------------------------------------------------
+    # Leitura
+    # -------------------------------------------------------------------------
+
+    def consultas(self) -> list[Consulta]:
+        """Todas as consultas, na ordem em que entraram na fila"""
+
+        linhas = (
+            self
+            ._conexao()
+            .execute("SELECT consulta FROM consultas ORDER BY id")
+            .fetchall()
+        )
+        return [Consulta(**json.loads(consulta)) for (consulta,) in linhas]
+
+    def pendentes(self) -> list[tuple[Consulta, int]]:
+        """Consultas que ainda podem ser reservadas, com as tentativas já feitas"""
+
+        linhas = (
+            self
+            ._conexao()
+            .execute(
+                "SELECT consulta, tentativas FROM consultas WHERE tentativas < ? ORDER BY id",
+                (self.maximo_tentativas,),
+            )
+            .fetchall()
+        )
+        return [
+            (Consulta(**json.loads(consulta)), tentativas)
+            for consulta, tentativas in linhas
+        ]
+
+    def numero_pendentes(self) -> int:
+        """Consultas que ainda podem ser reservadas nesta execução"""
+
+        (numero,) = (
+            self
+            ._conexao()
+            .execute(
+                "SELECT COUNT(*) FROM consultas WHERE tentativas < ?",
+                (self.maximo_tentativas,),
+            )
+            .fetchone()
+        )
+        return numero
+
+    # -------------------------------------------------------------------------
+    # Importa a fila antiga (pickle) e renomeia o arquivo <- só roda uma vez
+    # -------------------------------------------------------------------------
+
+    def importa_pickle(self, path_pickle: Path) -> int:
+        path_pickle = Path(path_pickle)
+        if not path_pickle.exists():
+            return 0
+
+        with open(path_pickle, "rb") as pkl_f:
+            consultas: list[Consulta] = pickle.load(pkl_f)
+
+        numero_importadas = sum(
+            self.adiciona(consulta) for consulta in consultas
+        )
+        path_pickle.rename(
+            path_pickle.with_name(path_pickle.name + SUFIXO_PICKLE_IMPORTADO)
+        )
+        LOGGER.info(
+            f"FilaConsultas: 📥 {numero_importadas} consultas importadas de '{path_pickle.name}'."
+        )
+        return numero_importadas
+
+
+# =============================================================================
+# FUNÇÕES
+# =============================================================================
+
+
+def migra_tabela(conexao: sqlite3.Connection) -> None:
+    colunas = {
+        linha[1] for linha in conexao.execute("PRAGMA table_info(consultas)")
+    }
+    for coluna, definicao in COLUNAS_NOVAS.items():
+        if coluna in colunas:
+            continue
+        try:
+            conexao.execute(
+                f"ALTER TABLE consultas ADD COLUMN {coluna} {definicao}"
+            )
+        except sqlite3.OperationalError:
+            # Outro processo acabou de criar a coluna
+            pass
+    return None
+
+
+def nome_dono() -> str:
+    """Quem reservou: máquina, processo e thread"""
+
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.current_thread().name}"
+
+
+def dono_morto(dono: str) -> bool:
+    """Só dá para saber dos processos desta máquina"""
+
+    maquina, _, resto = dono.partition(":")
+    pid, _, _ = resto.partition(":")
+    if (
+        maquina != socket.gethostname()
+        or not pid.isdigit()
+        or int(pid) == os.getpid()
+    ):
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        return False
+    return False
@@ -0,0 +1,352 @@
+# =============================================================================
+# BIBLIOTECAS E MÓDULOS
+# =============================================================================
+
+import asyncio
+import hashlib
+import os
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from time import perf_counter
+from typing import BinaryIO, Optional, Tuple, Union
+
+import requests
+
+from scraping_wto.limitador import LIMITADOR, resposta_sobrecarga
+from scraping_wto.log import LOGGER
+from scraping_wto.metricas import METRICAS
+from scraping_wto.schemas import ResultadoDownload
+
+# =============================================================================
+# CONSTANTES
+# =============================================================================
+
+# (conexão, leitura) em segundos <- a leitura vale para cada bloco, não para o
+# arquivo inteiro
+TIMEOUT_DOWNLOAD = (10, 120)
+
+# Tamanho (bytes) de cada bloco escrito no disco
+TAMANHO_BLOCO = 1024 * 1024
+
+# Quantos arquivos são baixados ao mesmo tempo (no processo todo)
+NUMERO_DOWNLOADS_SIMULTANEOS = int(os.getenv("NUMERO_DOWNLOADS_WTO", "4"))
+
+# Quantas vezes um download interrompido é retomado
+TENTATIVAS_DOWNLOAD = 3
+
+SUCESSO = 200
+CONTEUDO_PARCIAL = 206
+INTERVALO_INVALIDO = 416
+
+# =============================================================================
+# CLASSES E SCHEMAS
+# =============================================================================
+
+
+class DestinoArquivo:
+    """Para onde vão os bytes do download: um '.part' que vira o arquivo final
+    só quando o download termina. Com 'path_arquivo=None' nada é gravado"""
+
+    def __init__(self, path_arquivo: Optional[Path]) -> None:
+        self.path_arquivo = (
+            None if path_arquivo is None else Path(path_arquivo)
+        )
+        self.posicao = 0
+        # SHA-256 de tudo o que foi recebido (o arquivo inteiro, no fim)
+        self.sha256 = hashlib.sha256()
+        self._arquivo_f: Optional[BinaryIO] = None
+        if self.path_arquivo is not None:
+            self.path_arquivo.parent.mkdir(exist_ok=True, parents=True)
+            # Cada download é um arquivo novo no servidor (nova exportação),
+            # então um '.part' de uma execução anterior não serve
+            path_parcial(self.path_arquivo).unlink(missing_ok=True)
+        return None
+
+    @property
+    def path_final(self) -> str:
+        return "" if self.path_arquivo is None else str(self.path_arquivo)
+
+    def escreve(self, bloco: bytes) -> None:
+        if self.path_arquivo is not None:
+            if self._arquivo_f is None:
+                self._arquivo_f = open(path_parcial(self.path_arquivo), "ab")
+            self._arquivo_f.write(bloco)
+        self.posicao += len(bloco)
+        self.sha256.update(bloco)
+        return None
+
+    def _fecha_arquivo(self) -> None:
+        if self._arquivo_f is not None:
+            self._arquivo_f.close()
+            self._arquivo_f = None
+        return None
+
+    def reinicia(self) -> None:
+        """O servidor mandou o arquivo desde o início"""
+        self.descarta()
+        self.posicao = 0
+        self.sha256 = hashlib.sha256()
+        return None
+
+    def conclui(self) -> None:
+        self._fecha_arquivo()
+        if self.path_arquivo is not None:
+            os.replace(path_parcial(self.path_arquivo), self.path_arquivo)
+        return None
+
+    def descarta(self) -> None:
+        self._fecha_arquivo()
+        if self.path_arquivo is not None:
+            path_parcial(self.path_arquivo).unlink(missing_ok=True)
+        return None
+
+
+class GerenciadorDownloads:
+    """Event loop (asyncio) numa thread própria. Qualquer thread pode pedir
+    downloads; no máximo 'numero_simultaneos' rodam ao mesmo tempo"""
+
+    def __init__(
+        self,
+        numero_simultaneos: int = NUMERO_DOWNLOADS_SIMULTANEOS,
+        tamanho_bloco: int = TAMANHO_BLOCO,
+    ) -> None:
+        assert numero_simultaneos >= 1, (
+            "GerenciadorDownloads: numero_simultaneos < 1"
+        )
+        self.numero_simultaneos = numero_simultaneos
+        self.tamanho_bloco = tamanho_bloco
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaforo: Optional[asyncio.Semaphore] = None
+        return None
+
+    def _garante_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._semaforo = asyncio.Semaphore(self.numero_simultaneos)
+                threading.Thread(
+                    target=self._loop.run_forever,
+                    name="downloads",
+                    daemon=True,
+                ).start()
+        return self._loop
+
+    async def baixa_async(
+        self,
+        url: str,
+        destino: Union[Path, DestinoArquivo],
+        sessao: Optional[requests.Session] = None,
+        timeout: Tuple[float, float] = TIMEOUT_DOWNLOAD,
+    ) -> ResultadoDownload:
+        assert self._semaforo is not None, "baixa_async: loop não iniciado"
+        async with self._semaforo:
+            return await asyncio.to_thread(
+                baixa_arquivo,
+                url,
+                destino,
+                sessao,
+                timeout,
+                self.tamanho_bloco,
+            )
+
+    def submete(
+        self,
+        url: str,
+        destino: Union[Path, DestinoArquivo],
+        sessao: Optional[requests.Session] = None,
+        timeout: Tuple[float, float] = TIMEOUT_DOWNLOAD,
+    ) -> Future:
+        loop = self._garante_loop()
+        return asyncio.run_coroutine_threadsafe(
+            self.baixa_async(url, destino, sessao, timeout), loop
+        )
+
+    def baixa(
+        self,
+        url: str,
+        destino: Union[Path, DestinoArquivo],
+        sessao: Optional[requests.Session] = None,
+        timeout: Tuple[float, float] = TIMEOUT_DOWNLOAD,
+    ) -> ResultadoDownload:
+        return self.submete(url, destino, sessao, timeout).result()
+
+    def baixa_varios(
+        self,
+        downloads: list[Tuple[str, Path]],
+        sessao: Optional[requests.Session] = None,
+    ) -> list[ResultadoDownload]:
+        """'downloads' = [(url, path do arquivo), ...]"""
+
+        futuros = [self.submete(url, path, sessao) for url, path in downloads]
+        return [futuro.result() for futuro in futuros]
+
+    def fecha(self) -> None:
+        with self._lock:
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._loop = None
+                self._semaforo = None
+        return None
+
+
+# =============================================================================
+# FUNÇÕES
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# Path do arquivo parcial <- vira o arquivo final só quando o download termina
+# -----------------------------------------------------------------------------
+
+
+def path_parcial(path_arquivo: Path) -> Path:
+    return path_arquivo.with_name(f"{path_arquivo.name}.part")
+
+
+# -----------------------------------------------------------------------------
+# Uma tentativa de download, continuando de onde a anterior parou
+# -----------------------------------------------------------------------------
+
+
+def _tentativa_download(
+    url: str,
+    destino: DestinoArquivo,
+    cliente_http,
+    timeout: Tuple[float, float],
+    tamanho_bloco: int,
+) -> int:
+    """Retorna o status HTTP. Um download cortado levanta
+    'requests.exceptions.RequestException'"""
+
+    cabecalhos = (
+        {"Range": f"bytes={destino.posicao}-"} if destino.posicao else {}
+    )
+
+    # Só o pedido passa pelo limitador <- a duração depende do tamanho do zip
+    LIMITADOR.espera()
+    with cliente_http.get(
+        url, headers=cabecalhos, stream=True, timeout=timeout
+    ) as resposta:
+        if resposta.status_code == INTERVALO_INVALIDO:
+            # O que já foi baixado não bate com o arquivo do servidor
+            destino.reinicia()
+            return resposta.status_code
+
+        if resposta.status_code not in {SUCESSO, CONTEUDO_PARCIAL}:
+            if resposta_sobrecarga(resposta.status_code):
+                LIMITADOR.registra(0.0, erro=True)
+            return resposta.status_code
+
+        # Servidor ignorou o Range (200) <- recomeça do zero
+        if resposta.status_code == SUCESSO and destino.posicao:
+            destino.reinicia()
+        tamanho_esperado = resposta.headers.get("Content-Length")
+
+        bytes_baixados = 0
+        for bloco in resposta.iter_content(chunk_size=tamanho_bloco):
+            destino.escreve(bloco)
+            bytes_baixados += len(bloco)
+
+    if tamanho_esperado is not None and bytes_baixados != int(
+        tamanho_esperado
+    ):
+        raise requests.exceptions.ConnectionError(
+            f"{bytes_baixados}/{tamanho_esperado} bytes recebidos"
+        )
+
+    return resposta.status_code
+
+
+# -----------------------------------------------------------------------------
+# Repete as tentativas enquanto a conexão cair
+# -----------------------------------------------------------------------------
+
+
+def _tentativas_download(
+    url: str,
+    destino: DestinoArquivo,
+    cliente_http,
+    timeout: Tuple[float, float],
+    tamanho_bloco: int,
+) -> Tuple[Optional[int], int, int]:
+    """Retorna (status da última tentativa, bytes que vieram de tentativas
+    anteriores, tentativas além da primeira)"""
+
+    status = None
+    tentativa = 1
+    for tentativa in range(1, TENTATIVAS_DOWNLOAD + 1):
+        bytes_retomados = destino.posicao
+        try:
+            status = _tentativa_download(
+                url, destino, cliente_http, timeout, tamanho_bloco
+            )
+        except requests.exceptions.RequestException as e:
+            LOGGER.warning(
+                f"baixa_arquivo: 💀 ({tentativa}/{TENTATIVAS_DOWNLOAD}) Download interrompido em {destino.posicao} bytes: {e}"
+            )
+            status = None
+            continue
+
+        if status != INTERVALO_INVALIDO:
+            break
+
+    if status == CONTEUDO_PARCIAL:
+        return status, bytes_retomados, tentativa - 1
+    return status, 0, tentativa - 1
+
+
+# -----------------------------------------------------------------------------
+# Download em blocos direto para o 'destino', retomando com HTTP Range
+# -----------------------------------------------------------------------------
+
+
+def baixa_arquivo(
+    url: str,
+    destino: Union[Path, DestinoArquivo],
+    sessao: Optional[requests.Session] = None,
+    timeout: Tuple[float, float] = TIMEOUT_DOWNLOAD,
+    tamanho_bloco: int = TAMANHO_BLOCO,
+) -> ResultadoDownload:
+    """O 'destino' pode ser um path (o arquivo é salvo como está) ou um
+    'DestinoArquivo' que trata os bytes enquanto chegam (ex.: 'ExtratorZipStream')"""
+
+    if not isinstance(destino, DestinoArquivo):
+        destino = DestinoArquivo(destino)
+
+    cliente_http = requests if sessao is None else sessao
+    t_inicio = perf_counter()
+
+    with METRICAS.span("download") as span:
+        try:
+            status, bytes_retomados, span.tentativas = _tentativas_download(
+                url, destino, cliente_http, timeout, tamanho_bloco
+            )
+            if status in {SUCESSO, CONTEUDO_PARCIAL}:
+                destino.conclui()
+        except Exception:
+            destino.descarta()
+            raise
+        span.bytes = destino.posicao
+
+    if status not in {SUCESSO, CONTEUDO_PARCIAL}:
+        LOGGER.warning(
+            f"baixa_arquivo: ❌ Download do arquivo falhou. Status code: {status}"
+        )
+        destino.descarta()
+        return ResultadoDownload(
+            url=url, sucesso=False, duracao=perf_counter() - t_inicio
+        )
+
+    resultado = ResultadoDownload(
+        url=url,
+        sucesso=True,
+        path_arquivo=destino.path_final,
+        bytes_baixados=destino.posicao,
+        bytes_retomados=bytes_retomados,
+        duracao=perf_counter() - t_inicio,
+    )
+    LOGGER.debug(
+        f"baixa_arquivo: ✅ '{url.rsplit('/', maxsplit=1)[-1]}' baixado ({resultado.bytes_baixados / 1e6:.1f} MB a {resultado.bytes_por_segundo / 1e6:.2f} MB/s)"
+    )
+    return resultado
@@ -0,0 +1,165 @@
+# =============================================================================
+# BIBLIOTECAS E MÓDULOS
+# =============================================================================
+
+import os
+import threading
+from contextlib import contextmanager
+from time import monotonic, sleep
+from typing import Iterator
+
+from scraping_wto.log import LOGGER
+from scraping_wto.metricas import METRICAS
+
+# =============================================================================
+# CONSTANTES
+# =============================================================================
+
+# Requisições/ações por segundo, somando todos os workers do processo
+TAXA_INICIAL = float(os.getenv("TAXA_REQUISICOES_WTO", "2.0"))
+TAXA_MINIMA = 0.2
+TAXA_MAXIMA = float(os.getenv("TAXA_MAXIMA_WTO", "10.0"))
+
+# Quantas ações podem sair de uma vez depois de um tempo parado
+CAPACIDADE_BALDE = 2.0
+
+# AIMD: cada resposta rápida soma INCREMENTO_TAXA; uma lenta (ou erro)
+# multiplica a taxa por FATOR_REDUCAO, no máximo uma vez por INTERVALO_REDUCAO
+LATENCIA_ALVO = float(os.getenv("LATENCIA_ALVO_WTO", "3.0"))
+INCREMENTO_TAXA = 0.1
+FATOR_REDUCAO = 0.5
+INTERVALO_REDUCAO = 1.0
+
+# Gauge do Prometheus com a taxa atual (publicado quando a taxa muda)
+MEDIDA_TAXA = "limitador_taxa"
+
+# Respostas HTTP que pedem para ir mais devagar (além dos 5xx)
+CODIGOS_SOBRECARGA = {408, 429}
+
+# =============================================================================
+# CLASSES E SCHEMAS
+# =============================================================================
+
+
+class LimitadorTaxa:
+    """Balde de fichas (token bucket) compartilhado pelas threads, com a taxa
+    ajustada (AIMD) pela latência e pelos erros das respostas do site"""
+
+    def __init__(
+        self,
+        taxa_inicial: float = TAXA_INICIAL,
+        taxa_minima: float = TAXA_MINIMA,
+        taxa_maxima: float = TAXA_MAXIMA,
+        capacidade: float = CAPACIDADE_BALDE,
+        latencia_alvo: float = LATENCIA_ALVO,
+    ) -> None:
+        self._lock = threading.Lock()
+        self.taxa_minima = taxa_minima
+        self.taxa_maxima = taxa_maxima
+        self.capacidade = capacidade
+        self.latencia_alvo = latencia_alvo
+        self.taxa = min(max(taxa_inicial, taxa_minima), taxa_maxima)
+        self._fichas = capacidade
+        self._ultima_recarga = monotonic()
+        self._ultima_reducao = 0.0
+        self.numero_esperas = 0
+        self.tempo_total_espera = 0.0
+        self.numero_respostas = 0
+        self.numero_erros = 0
+        self.numero_reducoes = 0
+        return None
+
+    # -------------------------------------------------------------------------
+    # Pega uma ficha <- dorme (fora do lock) o tempo que faltar para ela
+    # -------------------------------------------------------------------------
+
+    def espera(self) -> float:
+        """Retorna quanto tempo (s) esperou"""
+
+        with self._lock:
+            agora = monotonic()
+            self._fichas = min(
+                self.capacidade,
+                self._fichas + (agora - self._ultima_recarga) * self.taxa,
+            )
+            self._ultima_recarga = agora
+            # A ficha fica reservada <- quem chega depois espera na fila
+            self._fichas -= 1
+            tempo_espera = max(0.0, -self._fichas / self.taxa)
+            self.numero_esperas += 1
+            self.tempo_total_espera += tempo_espera
+
+        if tempo_espera > 0:
+            sleep(tempo_espera)
+        return tempo_espera
+
+    # -------------------------------------------------------------------------
+    # AIMD: sobe devagar enquanto o site responde bem, cai pela metade se não
+    # -------------------------------------------------------------------------
+
+    def registra(self, latencia: float, erro: bool = False) -> None:
+        with self._lock:
+            self.numero_respostas += 1
+            self.numero_erros += int(erro)
+            taxa_anterior = self.taxa
+            reduziu = False
+
+            if not erro and latencia <= self.latencia_alvo:
+                self.taxa = min(self.taxa_maxima, self.taxa + INCREMENTO_TAXA)
+            # Várias threads vendo a mesma lentidão contam como uma só
+            elif monotonic() - self._ultima_reducao >= INTERVALO_REDUCAO:
+                self._ultima_reducao = monotonic()
+                self.taxa = max(self.taxa_minima, self.taxa * FATOR_REDUCAO)
+                self.numero_reducoes += 1
+                reduziu = True
+            taxa = self.taxa
+
+        # Fora do lock <- o registro de métricas tem o dele
+        if taxa != taxa_anterior:
+            METRICAS.medida(MEDIDA_TAXA, taxa)
+        if reduziu:
+            LOGGER.debug(
+                f"LimitadorTaxa: 🐢 {'Erro' if erro else f'Resposta em {latencia:.2f} s'}. Taxa reduzida para {taxa:.2f}/s."
+            )
+        return None
+
+    @contextmanager
+    def acao(self) -> Iterator[None]:
+        """Espera a ficha, mede a ação e registra (exceção = erro)"""
+
+        self.espera()
+        t_inicio = monotonic()
+        try:
+            yield
+        except Exception:
+            self.registra(monotonic() - t_inicio, erro=True)
+            raise
+        self.registra(monotonic() - t_inicio)
+        return None
+
+    def resumo(self) -> dict:
+        with self._lock:
+            return {
+                "taxa": self.taxa,
+                "numero_esperas": self.numero_esperas,
+                "tempo_total_espera": self.tempo_total_espera,
+                "numero_respostas": self.numero_respostas,
+                "numero_erros": self.numero_erros,
+                "numero_reducoes": self.numero_reducoes,
+            }
+
+
+# =============================================================================
+# FUNÇÕES
+# =============================================================================
+
+
+def resposta_sobrecarga(status_code: int) -> bool:
+    return status_code in CODIGOS_SOBRECARGA or status_code >= 500  # noqa: PLR2004
+
+
+# =============================================================================
+# LIMITADOR DO PROCESSO (compartilhado por todos os workers)
+# =============================================================================
+
+LIMITADOR = LimitadorTaxa()
@@ -0,0 +1,23 @@
+# =============================================================================
+# BIBLIOTECAS E MÓDULOS
+# =============================================================================
+
+import logging
+import logging.config
+from pathlib import Path
+
+from scraping_wto.utils import get_path_projeto
+
+# =============================================================================
+# CONSTANTES
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# Configurando o logger
+# -----------------------------------------------------------------------------
+
+DIR_PROJETO = get_path_projeto()
+assert isinstance(DIR_PROJETO, Path)
+
+logging.config.fileConfig(DIR_PROJETO / "config/logging.toml")
+LOGGER = logging.getLogger("logMain.info.debug")
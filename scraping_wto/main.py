@@ -2,17 +2,42 @@
 # BIBLIOTECAS E MÓDULOS
 # =============================================================================
 
+import atexit
 import logging
 import logging.config
-import pickle
-from pathlib import Path
-
-from scraping_wto.selenium_utils import navegador_firefox
+import os
+from typing import Callable
+
+from scraping_wto.cliente_http import ClienteTAO
+from scraping_wto.controle_fluxo import (
+    devolve_para_fila,
+    fila_vazia,
+    prepara_fila,
+    reserva_da_fila,
+    salva_log_consultas,
+    tamanho_fila,
+)
+from scraping_wto.coordenador import (
+    URL_COORDENADOR,
+    ClienteCoordenador,
+    publica_fila,
+    worker_remoto,
+)
+from scraping_wto.escalonador import prioriza_fila
+from scraping_wto.limitador import LIMITADOR
+from scraping_wto.metricas import METRICAS, verifica_regressao
+from scraping_wto.pool_navegadores import loop_consulta_paralelo
+from scraping_wto.schemas import Consulta
+from scraping_wto.selenium_utils import NAVEGADOR_ENXUTO, PERFIL_PERSISTENTE
+from scraping_wto.sessao_navegador import SessaoNavegador
 from scraping_wto.website_scraping import (
+    METRICAS_ESPERA,
+    coleta_infos_paises,
+    confere_consulta,
     confere_dados_consulta_pais,
     download_consulta,
+    download_consultas_pipeline,
     get_lista_paises,
-    navegador_login,
 )
 
 # =============================================================================
@@ -26,6 +51,15 @@ from scraping_wto.website_scraping import (
 USAR_FIREFOX_PADRAO = False
 HEADLESS = True
 
+# "selenium" (Firefox) ou "http" (sem navegador, replay dos postbacks)
+BACKEND = os.getenv("BACKEND_WTO", "selenium")
+
+# Quantos navegadores (logados) baixam consultas da fila ao mesmo tempo
+NUMERO_WORKERS = int(os.getenv("NUMERO_WORKERS_WTO", "1"))
+
+# Quantas exportações são pedidas de uma vez no modo pipeline (1 = desligado)
+TAMANHO_LOTE_PIPELINE = int(os.getenv("TAMANHO_LOTE_PIPELINE_WTO", "1"))
+
 # -----------------------------------------------------------------------------
 # Configurando o logger
 # -----------------------------------------------------------------------------
@@ -33,27 +67,81 @@ HEADLESS = True
 logging.config.fileConfig("config/logging.toml")
 LOGGER = logging.getLogger("logMain.info.debug")
 
+# =============================================================================
+# FUNÇÕES
+# =============================================================================
+
 # -----------------------------------------------------------------------------
-# Paths
+# Reserva as consultas da fila uma a uma até não sobrar nenhuma visível.
+# Deu certo: a própria consulta sai da fila; deu erro: volta para a fila.
 # -----------------------------------------------------------------------------
 
-PATH_FILA_CONSULTAS = Path("temp/consultas_a_fazer.pkl")
 
-# =============================================================================
-# FUNÇÕES
-# =============================================================================
+def consome_fila(nome_loop: str, baixa: Callable[[Consulta], None]) -> None:
+    if URL_COORDENADOR is not None:
+        consome_coordenador(nome_loop, baixa)
+        return None
+
+    total = tamanho_fila()
+    LOGGER.info(f"{nome_loop}: {total} consultas na fila.")
+
+    n = 0
+    while consultas := reserva_da_fila():
+        consulta = consultas[0]
+        n += 1
+        LOGGER.debug(
+            f"{nome_loop}: ({n}/{total}) '{consulta.COUNTRY.upper()}'"
+        )
+        try:
+            baixa(consulta)
+        except Exception as e:
+            devolve_para_fila(consulta)
+            LOGGER.warning(
+                f"{nome_loop}: Erro consulta para país '{consulta.COUNTRY}': {e}"
+            )
+
+    return None
+
+
+# -----------------------------------------------------------------------------
+# Várias máquinas/contas: a fila local vai para o coordenador e as consultas
+# passam a vir dele (com lease, heartbeat e roubo de trabalho)
+# -----------------------------------------------------------------------------
+
+
+def consome_coordenador(
+    nome_loop: str, baixa: Callable[[Consulta], None]
+) -> None:
+    with ClienteCoordenador(URL_COORDENADOR) as coordenador:
+        publica_fila(coordenador)
+        LOGGER.info(
+            f"{nome_loop}: Consultas vindas de '{URL_COORDENADOR}' ({coordenador.worker})."
+        )
+        numero_feitas = worker_remoto(coordenador, baixa)
+    LOGGER.info(
+        f"{nome_loop}: {numero_feitas} consultas feitas para o coordenador."
+    )
+    return None
+
+
+def existem_consultas() -> bool:
+    """Com coordenador, sempre pode haver consultas (de outras máquinas)"""
+
+    return URL_COORDENADOR is not None or not fila_vazia()
+
 
 # -----------------------------------------------------------------------------
-# Verifica se a fila de consultas está vazia
+# Ordena a fila local pelo custo esperado. Com coordenador, a fila local só é
+# publicada <- quem ordena é o coordenador, na fila dele
 # -----------------------------------------------------------------------------
 
 
-def fila_vazia() -> bool:
-    with open(PATH_FILA_CONSULTAS, "rb") as pkl_f:
-        consultas_existentes = pickle.load(pkl_f)
-    if consultas_existentes:
-        return False
-    return True
+def ordena_fila(nome_loop: str, numero_faixas: int = 1) -> None:
+    if URL_COORDENADOR is not None:
+        LOGGER.info(f"{nome_loop}: A fila é ordenada pelo coordenador.")
+        return None
+    prioriza_fila(numero_faixas=numero_faixas)
+    return None
 
 
 # -----------------------------------------------------------------------------
@@ -61,38 +149,147 @@ def fila_vazia() -> bool:
 # -----------------------------------------------------------------------------
 
 
-def loop_consulta() -> None:
-    navegador = navegador_firefox(
-        use_default_firefox_bin=USAR_FIREFOX_PADRAO, headless=HEADLESS
+def loop_consulta(
+    sessao: SessaoNavegador,
+    numero_workers: int = NUMERO_WORKERS,
+    tamanho_lote: int = TAMANHO_LOTE_PIPELINE,
+) -> None:
+    # Ordena a fila pelo custo esperado <- com N workers, uma faixa para cada
+    ordena_fila(
+        "loop_consulta",
+        numero_faixas=min(numero_workers, max(tamanho_fila(), 1)),
     )
-    navegador_login(navegador=navegador)
-
-    with open(PATH_FILA_CONSULTAS, "rb") as pkl_f:
-        consultas_existentes = pickle.load(pkl_f)
 
-    LOGGER.info(f"loop_consulta: {len(consultas_existentes)} consultas na fila.")
-    for n, consulta in enumerate(consultas_existentes, 1):
-        LOGGER.debug(
-            f"loop_consulta: ({n}/{len(consultas_existentes)}) '{consulta.COUNTRY.upper()}'"
+    if numero_workers > 1 and URL_COORDENADOR is None:
+        loop_consulta_paralelo(
+            numero_workers=numero_workers,
+            sessao_principal=sessao,
+            perfil_persistente=PERFIL_PERSISTENTE,
+            use_default_firefox_bin=USAR_FIREFOX_PADRAO,
+            headless=HEADLESS,
+            enxuto=NAVEGADOR_ENXUTO,
         )
+        return None
+
+    if tamanho_lote > 1 and URL_COORDENADOR is None:
+        LOGGER.info(f"loop_consulta: {tamanho_fila()} consultas na fila.")
+        while lote := reserva_da_fila(tamanho_lote):
+            LOGGER.debug(f"loop_consulta: Lote de {len(lote)} consultas")
+            try:
+                feitas = download_consultas_pipeline(
+                    navegador=sessao.garante_sessao(),
+                    consultas=lote,
+                    sessao_http=sessao.sessao_http,
+                )
+            except Exception as e:
+                LOGGER.warning(f"loop_consulta: Erro no lote: {e}")
+                sessao.marca_falha()
+                feitas = []
+            for consulta in lote:
+                if consulta not in feitas:
+                    devolve_para_fila(consulta)
+        return None
+
+    def baixa(consulta: Consulta) -> None:
         try:
-            download_consulta(navegador=navegador, consulta=consulta)
-        except Exception as e:
-            LOGGER.warning(
-                f"loop_consulta: Erro consulta para país '{consulta.COUNTRY}': {e}"
+            download_consulta(
+                navegador=sessao.garante_sessao(),
+                consulta=consulta,
+                sessao_http=sessao.sessao_http,
             )
+        except Exception:
+            # Pode ser a sessão vencida <- conferida antes da próxima consulta
+            sessao.marca_falha()
+            raise
+        return None
 
-    navegador.close()
+    consome_fila("loop_consulta", baixa)
 
     return None
 
 
+# -----------------------------------------------------------------------------
+# Loop de download usando o backend HTTP (sem navegador)
+# -----------------------------------------------------------------------------
+
+
+def loop_consulta_http(cliente: ClienteTAO) -> None:
+    ordena_fila("loop_consulta_http")
+    consome_fila(
+        "loop_consulta_http",
+        lambda consulta: cliente.download_consulta(consulta=consulta),
+    )
+    return None
+
+
+# -----------------------------------------------------------------------------
+# Limitador e métricas por etapa <- alerta se a espera da exportação regrediu
+# -----------------------------------------------------------------------------
+
+
+def resume_execucao() -> None:
+    salva_log_consultas()
+    LOGGER.info(f"main: Limitador de requisições: {LIMITADOR.resumo()}")
+    LOGGER.info(f"main: Pop-ups 'Processing': {METRICAS_ESPERA.resumo()}")
+    verifica_regressao(METRICAS)
+    for etapa, valores in METRICAS.resumo().items():
+        LOGGER.info(
+            f"main: ⏱️ '{etapa}': {valores['n']}x, {valores['total']:.1f} s no total, {valores['erros']} erro(s)"
+        )
+    METRICAS.salva_prometheus()
+    LOGGER.info(f"main: Métricas salvas em '{METRICAS.path_jsonl}'")
+    return None
+
+
 # =============================================================================
 # CÓDIGO
 # =============================================================================
 
 
-def main() -> None:
+def main(backend: str = BACKEND) -> None:
+    # Se o processo terminar no meio (erro, Ctrl+C), o que está na memória é
+    # salvo e o textfile do Prometheus fica atualizado
+    atexit.register(salva_log_consultas)
+    atexit.register(METRICAS.salva_prometheus)
+
+    prepara_fila()
+
+    # -----------------------------------------------------------------------------
+    # Backend HTTP: mesmas etapas, sem abrir o Firefox
+    # -----------------------------------------------------------------------------
+
+    if backend == "http":
+        with ClienteTAO() as cliente:
+            executa_etapas_http(cliente)
+        resume_execucao()
+        LOGGER.info("main: Fim do código.")
+        return None
+
+    # -----------------------------------------------------------------------------
+    # Uma única sessão (navegador + login) para todas as etapas
+    # -----------------------------------------------------------------------------
+
+    with SessaoNavegador(
+        nome_perfil="principal" if PERFIL_PERSISTENTE else None,
+        use_default_firefox_bin=USAR_FIREFOX_PADRAO,
+        headless=HEADLESS,
+        enxuto=NAVEGADOR_ENXUTO,
+    ) as sessao:
+        executa_etapas(sessao)
+
+    LOGGER.info("main: Navegador fechado.")
+
+    # -----------------------------------------------------------------------------
+    # Finalizando o código
+    # -----------------------------------------------------------------------------
+
+    resume_execucao()
+    LOGGER.info("main: Fim do código.")
+
+    return None
+
+
+def executa_etapas(sessao: SessaoNavegador) -> None:
 
     # -----------------------------------------------------------------------------
     # Verificando se existe uma fila pré-existente de consultas
@@ -101,76 +298,117 @@ def main() -> None:
     LOGGER.info(
         "main: Verificando se existem consultas já existentes a serem realizadas."
     )
-    if PATH_FILA_CONSULTAS.exists() and not fila_vazia():
-        LOGGER.info("main: Existe uma fila já existente. Realizando consultas . . .")
-        loop_consulta()
+    if existem_consultas():
+        LOGGER.info(
+            "main: Existe uma fila já existente. Realizando consultas . . ."
+        )
+        loop_consulta(sessao)
         LOGGER.info("main: Consultas realizadas.")
     else:
         LOGGER.info("main: Não existem consultas pendentes.")
 
     # -----------------------------------------------------------------------------
-    # Abrindo o navegador
-    # -----------------------------------------------------------------------------
-
-    navegador = navegador_firefox(
-        use_default_firefox_bin=USAR_FIREFOX_PADRAO, headless=HEADLESS
-    )
-    LOGGER.info("main: Navegador aberto.")
-
-    # -----------------------------------------------------------------------------
-    # Fazendo login na WTO
+    # Abrindo o navegador e fazendo login na WTO (só se ainda não estiver logado)
     # -----------------------------------------------------------------------------
 
-    navegador_login(navegador=navegador)
-    LOGGER.info("main: Login feito.")
+    navegador = sessao.garante_sessao()
+    LOGGER.info("main: Navegador aberto e logado.")
 
     # -----------------------------------------------------------------------------
     # Obtendo a lista de países disponíveis para consulta
     # -----------------------------------------------------------------------------
 
-    lista_web_element_pais = get_lista_paises(navegador=navegador)
-    lista_paises = list(
-        map(lambda web_element: web_element.text, lista_web_element_pais)
-    )
+    lista_paises = get_lista_paises(navegador=navegador, modo="textos")
     LOGGER.info("main: Lista de países obtida.")
 
     # -----------------------------------------------------------------------------
     # Fazendo a verificação da consulta para cada país
     # -----------------------------------------------------------------------------
 
-    LOGGER.info("main: Conferindo dados disponíveis para consulta de cada país.")
+    LOGGER.info(
+        "main: Conferindo dados disponíveis para consulta de cada país."
+    )
+
+    # Primeiro tenta ler todos os países de uma vez (um único script)
+    try:
+        consultas_disponiveis = coleta_infos_paises(
+            navegador=navegador, paises=lista_paises
+        )
+    except Exception as e:
+        LOGGER.warning(
+            f"main: Erro na coleta em lote: {e}. Conferindo país a país."
+        )
+        consultas_disponiveis = []
+
+    for consulta in consultas_disponiveis:
+        confere_consulta(consulta, consulta.COUNTRY)
+
+    # Os que ficaram de fora são conferidos um a um
+    paises_conferidos = {
+        consulta.COUNTRY for consulta in consultas_disponiveis
+    }
+    lista_paises = [
+        pais for pais in lista_paises if pais not in paises_conferidos
+    ]
+
     for n, pais in enumerate(lista_paises, 1):
         LOGGER.debug(f"main: ({n}/{len(lista_paises)}) '{pais.upper()}'")
         try:
+            # Se precisou refazer o login, a janela de consulta foi fechada
+            numero_logins = sessao.numero_logins
+            navegador = sessao.garante_sessao()
+            if sessao.numero_logins != numero_logins:
+                get_lista_paises(navegador=navegador)
             confere_dados_consulta_pais(navegador=navegador, pais=pais)
         except Exception as e:
-            LOGGER.warning(f"main: Erro de execução para o país '{pais}': {e}.")
+            LOGGER.warning(
+                f"main: Erro de execução para o país '{pais}': {e}."
+            )
             print(e)
     LOGGER.info("main: Consultas verificadas.")
 
-    # -----------------------------------------------------------------------------
-    # Fechando o navegador
-    # -----------------------------------------------------------------------------
-
-    navegador.close()
-    LOGGER.info("main: Navegador fechado.")
-
     # -----------------------------------------------------------------------------
     # Verificando se existe uma fila de consultas
     # -----------------------------------------------------------------------------
 
-    if PATH_FILA_CONSULTAS.exists() and not fila_vazia():
+    if existem_consultas():
         LOGGER.info("main: Realizando consultas na fila . . .")
-        loop_consulta()
+        loop_consulta(sessao)
         LOGGER.info("main: Consultas realizadas.")
     else:
         LOGGER.info("main: Não existem consultas pendentes.")
 
-    # -----------------------------------------------------------------------------
-    # Finalizando o código
-    # -----------------------------------------------------------------------------
+    return None
 
-    LOGGER.info("main: Fim do código.")
+
+def executa_etapas_http(cliente: ClienteTAO) -> None:
+    cliente.login()
+    LOGGER.info("main: Login feito (HTTP).")
+
+    if existem_consultas():
+        LOGGER.info(
+            "main: Existe uma fila já existente. Realizando consultas . . ."
+        )
+        loop_consulta_http(cliente)
+
+    lista_paises = cliente.get_lista_paises()
+    LOGGER.info("main: Lista de países obtida.")
+
+    for n, pais in enumerate(lista_paises, 1):
+        LOGGER.debug(f"main: ({n}/{len(lista_paises)}) '{pais.upper()}'")
+        try:
+            confere_consulta(cliente.get_info_ultima_consulta_pais(pais), pais)
+        except Exception as e:
+            LOGGER.warning(
+                f"main: Erro de execução para o país '{pais}': {e}."
+            )
+    LOGGER.info("main: Consultas verificadas.")
+
+    if existem_consultas():
+        LOGGER.info("main: Realizando consultas na fila . . .")
+        loop_consulta_http(cliente)
+    else:
+        LOGGER.info("main: Não existem consultas pendentes.")
 
     return None
 
@@ -0,0 +1,367 @@
+# =============================================================================
+# BIBLIOTECAS E MÓDULOS
+# =============================================================================
+
+import functools
+import inspect
+import json
+import os
+import statistics
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from time import monotonic, perf_counter, time
+from typing import Callable, Iterator, Optional
+
+from scraping_wto.log import LOGGER
+from scraping_wto.schemas import Consulta
+from scraping_wto.utils import get_path_projeto
+
+# =============================================================================
+# CONSTANTES
+# =============================================================================
+
+path_projeto = get_path_projeto()
+
+# No diretório do projeto, qualquer que seja o diretório de trabalho
+PATH_METRICAS_JSONL = Path(
+    os.getenv("PATH_METRICAS_WTO", str(path_projeto / "log/metricas.jsonl"))
+)
+PATH_METRICAS_PROMETHEUS = Path(
+    os.getenv(
+        "PATH_PROMETHEUS_WTO", str(path_projeto / "log/scraping_wto.prom")
+    )
+)
+
+# O textfile do Prometheus é reescrito no máximo uma vez por esse intervalo
+# (s); o que ficar pendente é salvo no fim da execução ('salva_prometheus')
+INTERVALO_PROMETHEUS = float(os.getenv("INTERVALO_PROMETHEUS_WTO", "15"))
+
+PREFIXO_PROMETHEUS = "scraping_wto"
+
+# Alerta quando a etapa fica FATOR_REGRESSAO vezes mais lenta do que a
+# mediana das execuções anteriores (do mesmo país)
+ETAPA_ESPERA_EXPORTACAO = "espera_exportacao"
+FATOR_REGRESSAO = 1.5
+MINIMO_AMOSTRAS_REGRESSAO = 3
+
+# =============================================================================
+# CLASSES E SCHEMAS
+# =============================================================================
+
+
+@dataclass
+class Span:
+    etapa: str
+    pais: Optional[str] = None
+    execucao: str = ""
+    inicio: float = 0.0
+    duracao: float = 0.0
+    bytes: int = 0
+    tentativas: int = 0
+    erro: Optional[str] = None
+
+
+class RegistroMetricas:
+    """Duração de cada etapa (por país), bytes e tentativas. Cada span vira
+    uma linha do JSONL; os totais por etapa vão para um textfile do
+    Prometheus (node_exporter --collector.textfile)."""
+
+    def __init__(
+        self,
+        path_jsonl: Path = PATH_METRICAS_JSONL,
+        path_prometheus: Path = PATH_METRICAS_PROMETHEUS,
+        intervalo_prometheus: float = INTERVALO_PROMETHEUS,
+    ) -> None:
+        self.path_jsonl = Path(path_jsonl)
+        self.path_prometheus = Path(path_prometheus)
+        self.intervalo_prometheus = intervalo_prometheus
+        self._ultima_escrita_prometheus = float("-inf")
+        self._prometheus_pendente = False
+        self.execucao = f"{datetime.now():%Y%m%dT%H%M%S}-{os.getpid()}"
+        self._lock = threading.Lock()
+        self._etapas: dict[str, dict] = defaultdict(
+            lambda: {
+                "n": 0,
+                "total": 0.0,
+                "max": 0.0,
+                "erros": 0,
+                "bytes": 0,
+                "tentativas": 0,
+            }
+        )
+        self._ultimas: dict[tuple[str, str], float] = {}
+        self._medidas: dict[str, float] = {}
+        return None
+
+    # -------------------------------------------------------------------------
+    # Span: mede o bloco; quem chama pode preencher bytes/tentativas
+    # -------------------------------------------------------------------------
+
+    @contextmanager
+    def span(self, etapa: str, pais: Optional[str] = None) -> Iterator[Span]:
+        span = Span(
+            etapa=etapa, pais=pais, execucao=self.execucao, inicio=time()
+        )
+        t_inicio = perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.erro = f"{type(e).__name__}: {e}"[:200]
+            raise
+        finally:
+            span.duracao = perf_counter() - t_inicio
+            self.registra(span)
+        return None
+
+    def cronometra(self, etapa: str) -> Callable:
+        """Decorador: um span por chamada, com o país tirado dos argumentos
+        ('consulta' ou 'pais')"""
+
+        def decorador(funcao: Callable) -> Callable:
+            assinatura = inspect.signature(funcao)
+
+            @functools.wraps(funcao)
+            def cronometrada(*args, **kwargs):
+                with self.span(
+                    etapa, pais_dos_argumentos(assinatura, args, kwargs)
+                ):
+                    return funcao(*args, **kwargs)
+
+            return cronometrada
+
+        return decorador
+
+    def medida(self, nome: str, valor: float) -> None:
+        """Gauge avulso (ex.: taxa do limitador) no textfile do Prometheus"""
+
+        with self._lock:
+            self._medidas[nome] = valor
+            try:
+                self._escreve_prometheus()
+            except OSError as e:
+                LOGGER.warning(
+                    f"RegistroMetricas: Não foi possível salvar as métricas: {e}"
+                )
+        return None
+
+    def registra(self, span: Span) -> None:
+        with self._lock:
+            etapa = self._etapas[span.etapa]
+            etapa["n"] += 1
+            etapa["total"] += span.duracao
+            etapa["max"] = max(etapa["max"], span.duracao)
+            etapa["erros"] += span.erro is not None
+            etapa["bytes"] += span.bytes
+            etapa["tentativas"] += span.tentativas
+            if span.pais is not None:
+                self._ultimas[(span.etapa, span.pais)] = span.duracao
+
+            try:
+                self.path_jsonl.parent.mkdir(exist_ok=True, parents=True)
+                with open(self.path_jsonl, "a", encoding="utf-8") as jsonl_f:
+                    jsonl_f.write(
+                        json.dumps(asdict(span), ensure_ascii=False) + "\n"
+                    )
+                self._escreve_prometheus()
+            except OSError as e:
+                # Métrica nunca derruba o scraper
+                LOGGER.warning(
+                    f"RegistroMetricas: Não foi possível salvar as métricas: {e}"
+                )
+        return None
+
+    def resumo(self) -> dict:
+        with self._lock:
+            return {
+                etapa: dict(valores) for etapa, valores in self._etapas.items()
+            }
+
+    def salva_prometheus(self) -> None:
+        """Escreve o que ficou pendente por causa do intervalo"""
+
+        with self._lock:
+            if not self._prometheus_pendente:
+                return None
+            try:
+                self._escreve_prometheus(forca=True)
+            except OSError as e:
+                LOGGER.warning(
+                    f"RegistroMetricas: Não foi possível salvar as métricas: {e}"
+                )
+        return None
+
+    # -------------------------------------------------------------------------
+    # Textfile do Prometheus <- reescrito inteiro (troca atômica), no máximo
+    # uma vez por 'intervalo_prometheus'
+    # -------------------------------------------------------------------------
+
+    def _escreve_prometheus(self, forca: bool = False) -> None:
+        agora = monotonic()
+        if (
+            not forca
+            and agora - self._ultima_escrita_prometheus
+            < self.intervalo_prometheus
+        ):
+            self._prometheus_pendente = True
+            return None
+        self._ultima_escrita_prometheus = agora
+        self._prometheus_pendente = False
+
+        linhas = []
+        for nome, chave, tipo, ajuda in (
+            (
+                "etapa_segundos_total",
+                "total",
+                "counter",
+                "Tempo gasto na etapa",
+            ),
+            (
+                "etapa_execucoes_total",
+                "n",
+                "counter",
+                "Vezes que a etapa rodou",
+            ),
+            (
+                "etapa_erros_total",
+                "erros",
+                "counter",
+                "Vezes que a etapa deu erro",
+            ),
+            (
+                "etapa_bytes_total",
+                "bytes",
+                "counter",
+                "Bytes transferidos na etapa",
+            ),
+            (
+                "etapa_tentativas_total",
+                "tentativas",
+                "counter",
+                "Tentativas extras na etapa",
+            ),
+            ("etapa_segundos_max", "max", "gauge", "Maior duração da etapa"),
+        ):
+            linhas += [
+                f"# HELP {PREFIXO_PROMETHEUS}_{nome} {ajuda}",
+                f"# TYPE {PREFIXO_PROMETHEUS}_{nome} {tipo}",
+            ]
+            linhas += [
+                f'{PREFIXO_PROMETHEUS}_{nome}{{etapa="{etapa}"}} {valores[chave]}'
+                for etapa, valores in sorted(self._etapas.items())
+            ]
+
+        linhas += [
+            f"# HELP {PREFIXO_PROMETHEUS}_etapa_ultima_segundos Duração da última execução da etapa no país",
+            f"# TYPE {PREFIXO_PROMETHEUS}_etapa_ultima_segundos gauge",
+        ]
+        linhas += [
+            f'{PREFIXO_PROMETHEUS}_etapa_ultima_segundos{{etapa="{etapa}",pais="{rotulo(pais)}"}} {duracao}'
+            for (etapa, pais), duracao in sorted(self._ultimas.items())
+        ]
+        for nome, valor in sorted(self._medidas.items()):
+            linhas += [
+                f"# TYPE {PREFIXO_PROMETHEUS}_{nome} gauge",
+                f"{PREFIXO_PROMETHEUS}_{nome} {valor}",
+            ]
+
+        self.path_prometheus.parent.mkdir(exist_ok=True, parents=True)
+        path_temp = self.path_prometheus.with_suffix(".tmp")
+        with open(path_temp, "w", encoding="utf-8") as prom_f:
+            prom_f.write("\n".join(linhas) + "\n")
+        os.replace(path_temp, self.path_prometheus)
+        return None
+
+
+# =============================================================================
+# FUNÇÕES
+# =============================================================================
+
+
+def pais_dos_argumentos(
+    assinatura: inspect.Signature, args: tuple, kwargs: dict
+) -> Optional[str]:
+    try:
+        argumentos = assinatura.bind_partial(*args, **kwargs).arguments
+    except TypeError:
+        return None
+    consulta = argumentos.get("consulta")
+    if isinstance(consulta, Consulta):
+        return consulta.COUNTRY
+    pais = argumentos.get("pais")
+    return pais if isinstance(pais, str) else None
+
+
+def rotulo(texto: str) -> str:
+    return texto.replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+# -----------------------------------------------------------------------------
+# Regressão: etapa desta execução x mediana das anteriores, país a país.
+# Retorna a mediana das razões (None = poucas amostras para comparar)
+# -----------------------------------------------------------------------------
+
+
+def razao_regressao(
+    path_jsonl: Path,
+    execucao: str,
+    etapa: str = ETAPA_ESPERA_EXPORTACAO,
+    minimo_amostras: int = MINIMO_AMOSTRAS_REGRESSAO,
+) -> Optional[float]:
+    if not Path(path_jsonl).exists():
+        return None
+
+    anteriores: dict[str, list[float]] = defaultdict(list)
+    atuais: dict[str, list[float]] = defaultdict(list)
+    with open(path_jsonl, "r", encoding="utf-8") as jsonl_f:
+        for linha in jsonl_f:
+            try:
+                span = json.loads(linha)
+            except json.JSONDecodeError:
+                continue
+            if (
+                span["etapa"] != etapa
+                or span["pais"] is None
+                or span["erro"] is not None
+            ):
+                continue
+            destino = atuais if span["execucao"] == execucao else anteriores
+            destino[span["pais"]].append(span["duracao"])
+
+    razoes = [
+        statistics.median(duracoes) / statistics.median(anteriores[pais])
+        for pais, duracoes in atuais.items()
+        if len(anteriores[pais]) >= minimo_amostras
+        and statistics.median(anteriores[pais]) > 0
+    ]
+    return statistics.median(razoes) if razoes else None
+
+
+def verifica_regressao(
+    metricas: "RegistroMetricas",
+    etapa: str = ETAPA_ESPERA_EXPORTACAO,
+    fator: float = FATOR_REGRESSAO,
+) -> bool:
+    """Loga um alerta e publica a razão como gauge. True = regrediu."""
+
+    razao = razao_regressao(metricas.path_jsonl, metricas.execucao, etapa)
+    if razao is None:
+        return False
+
+    metricas.medida(f"regressao_{etapa}_razao", razao)
+    if razao > fator:
+        LOGGER.warning(
+            f"verifica_regressao: 🚨 '{etapa}' está {razao:.2f}x mais lenta do que nas execuções anteriores!"
+        )
+        return True
+    return False
+
+
+# =============================================================================
+# MÉTRICAS DO PROCESSO
+# =============================================================================
+
+METRICAS = RegistroMetricas()
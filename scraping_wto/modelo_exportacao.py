@@ -0,0 +1,123 @@
+# =============================================================================
+# BIBLIOTECAS E MÓDULOS
+# =============================================================================
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Iterator, Optional
+
+from scraping_wto.utils import get_path_projeto
+
+# =============================================================================
+# CONSTANTES
+# =============================================================================
+
+path_projeto = get_path_projeto()
+assert isinstance(path_projeto, Path)
+
+PATH_TEMPOS_EXPORTACAO = path_projeto / "log/tempos_exportacao.json"
+
+# Peso da exportação mais recente na média móvel exponencial
+PESO_EWMA = 0.3
+
+# Intervalos (s) entre as verificações de "relatório pronto?"
+INTERVALO_INICIAL = 1.0
+FATOR_BACKOFF = 2.0
+INTERVALO_MAXIMO = 30.0
+
+# Prazo (s) para uma exportação ficar pronta
+PRAZO_MINIMO = 30 * 60
+MULTIPLICADOR_PRAZO = 3
+
+# =============================================================================
+# CLASSES E SCHEMAS
+# =============================================================================
+
+
+class ModeloTempoExportacao:
+    """Tempo esperado (s) de exportação de cada país, aprendido das anteriores"""
+
+    def __init__(self, path_arquivo: Path = PATH_TEMPOS_EXPORTACAO) -> None:
+        self.path_arquivo = Path(path_arquivo)
+        self._lock = threading.Lock()
+        self._tempos: dict[str, dict] = {}
+        if self.path_arquivo.exists():
+            with open(self.path_arquivo, "r", encoding="utf-8") as json_f:
+                self._tempos = json.load(json_f)
+        return None
+
+    def tempo_esperado(self, pais: Optional[str]) -> Optional[float]:
+        if pais is None:
+            return None
+        with self._lock:
+            registro = self._tempos.get(pais)
+        return None if registro is None else registro["media"]
+
+    def registra(self, pais: str, duracao: float) -> None:
+        with self._lock:
+            registro = self._tempos.get(pais)
+            if registro is None:
+                registro = {"media": duracao, "n": 0}
+            registro["media"] = (
+                PESO_EWMA * duracao + (1 - PESO_EWMA) * registro["media"]
+            )
+            registro["n"] += 1
+            self._tempos[pais] = registro
+            self._salva()
+        return None
+
+    def _salva(self) -> None:
+        # Escreve num arquivo temporário e troca <- nunca deixa o JSON pela metade
+        self.path_arquivo.parent.mkdir(exist_ok=True, parents=True)
+        path_temp = self.path_arquivo.with_suffix(".tmp")
+        with open(path_temp, "w", encoding="utf-8") as json_f:
+            json.dump(self._tempos, json_f, indent=2, sort_keys=True)
+        os.replace(path_temp, self.path_arquivo)
+        return None
+
+
+# =============================================================================
+# FUNÇÕES
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# Intervalos entre verificações: começa pelo tempo esperado e cresce em
+# progressão geométrica até o máximo
+# -----------------------------------------------------------------------------
+
+
+def intervalos_backoff(
+    tempo_esperado: Optional[float] = None,
+    inicial: float = INTERVALO_INICIAL,
+    fator: float = FATOR_BACKOFF,
+    maximo: float = INTERVALO_MAXIMO,
+) -> Iterator[float]:
+    # Exportações grandes podem esperar mais entre uma verificação e outra
+    if tempo_esperado is not None:
+        maximo = max(maximo, tempo_esperado / 10)
+
+    # A 1ª verificação é um pouco antes do tempo esperado
+    intervalo = (
+        inicial
+        if tempo_esperado is None
+        else min(maximo, max(inicial, 0.8 * tempo_esperado))
+    )
+    yield intervalo
+
+    intervalo = inicial
+    while True:
+        yield intervalo
+        intervalo = min(maximo, intervalo * fator)
+
+
+# -----------------------------------------------------------------------------
+# Prazo máximo (s) para uma exportação ficar pronta
+# -----------------------------------------------------------------------------
+
+
+def prazo_exportacao(tempo_esperado: Optional[float] = None) -> float:
+    if tempo_esperado is None:
+        return PRAZO_MINIMO
+    return max(PRAZO_MINIMO, MULTIPLICADOR_PRAZO * tempo_esperado)
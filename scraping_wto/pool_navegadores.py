@@ -0,0 +1,134 @@
+# =============================================================================
+# BIBLIOTECAS E MÓDULOS
+# =============================================================================
+
+from concurrent.futures import ThreadPoolExecutor
+from threading import current_thread
+from typing import Optional
+
+from scraping_wto.controle_fluxo import (
+    devolve_para_fila,
+    reserva_da_fila,
+    tamanho_fila,
+)
+from scraping_wto.log import LOGGER
+from scraping_wto.sessao_navegador import SessaoNavegador
+from scraping_wto.website_scraping import download_consulta
+
+# =============================================================================
+# FUNÇÕES
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# Worker: um navegador logado que reserva consultas da fila compartilhada
+# (SQLite <- outros processos podem consumir a mesma fila)
+# -----------------------------------------------------------------------------
+
+
+def worker_consultas(
+    sessao: Optional[SessaoNavegador] = None,
+    perfil_persistente: bool = False,
+    faixa: Optional[int] = None,
+    **kwargs_navegador,
+) -> int:
+    """Retorna o número de consultas baixadas com sucesso pelo worker.
+    Se receber uma sessão já aberta, usa ela e não a fecha no final.
+    Com 'perfil_persistente', cada worker tem o seu perfil (nome da thread).
+    Com 'faixa', reserva antes as consultas que o escalonador deu a ele."""
+
+    nome_worker = current_thread().name
+    consultas_feitas = 0
+
+    sessao_propria = sessao is None
+    if sessao is None:
+        sessao = SessaoNavegador(
+            nome_perfil=nome_worker if perfil_persistente else None,
+            **kwargs_navegador,
+        )
+
+    try:
+        sessao.garante_sessao()
+        LOGGER.info(f"worker_consultas: [{nome_worker}] Navegador pronto.")
+
+        while consultas := reserva_da_fila(faixa=faixa):
+            consulta = consultas[0]
+            LOGGER.debug(
+                f"worker_consultas: [{nome_worker}] '{consulta.COUNTRY.upper()}'"
+            )
+            try:
+                download_consulta(
+                    navegador=sessao.garante_sessao(),
+                    consulta=consulta,
+                    exclusivo=False,
+                    sessao_http=sessao.sessao_http,
+                )
+                consultas_feitas += 1
+            except Exception as e:
+                devolve_para_fila(consulta)
+                sessao.marca_falha()
+                LOGGER.warning(
+                    f"worker_consultas: [{nome_worker}] Erro consulta para país '{consulta.COUNTRY}': {e}"
+                )
+    finally:
+        if sessao_propria:
+            sessao.fecha()
+
+    LOGGER.info(
+        f"worker_consultas: [{nome_worker}] Fim. {consultas_feitas} consultas feitas."
+    )
+
+    return consultas_feitas
+
+
+# -----------------------------------------------------------------------------
+# N navegadores em paralelo consumindo a fila
+# -----------------------------------------------------------------------------
+
+
+def loop_consulta_paralelo(
+    numero_workers: int,
+    sessao_principal: Optional[SessaoNavegador] = None,
+    perfil_persistente: bool = False,
+    **kwargs_navegador,
+) -> int:
+    """O primeiro worker reaproveita a 'sessao_principal', se houver"""
+
+    assert numero_workers >= 1, "loop_consulta_paralelo: numero_workers < 1"
+
+    total = tamanho_fila()
+
+    # Não faz sentido abrir mais navegadores do que consultas
+    numero_workers = min(numero_workers, total)
+    if numero_workers == 0:
+        return 0
+
+    LOGGER.info(
+        f"loop_consulta_paralelo: {total} consultas para {numero_workers} workers."
+    )
+
+    with ThreadPoolExecutor(
+        max_workers=numero_workers, thread_name_prefix="worker"
+    ) as executor:
+        futuros = [
+            executor.submit(
+                worker_consultas,
+                sessao_principal if n == 0 else None,
+                perfil_persistente,
+                n,
+                **kwargs_navegador,
+            )
+            for n in range(numero_workers)
+        ]
+
+    total_feitas = 0
+    for futuro in futuros:
+        try:
+            total_feitas += futuro.result()
+        except Exception as e:
+            LOGGER.warning(f"loop_consulta_paralelo: Worker morreu: {e}")
+
+    LOGGER.info(
+        f"loop_consulta_paralelo: {total_feitas}/{total} consultas feitas."
+    )
+
+    return total_feitas
@@ -0,0 +1,143 @@
+# =============================================================================
+# BIBLIOTECAS E MÓDULOS
+# =============================================================================
+
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from scraping_wto.diario import DiarioCSV
+from scraping_wto.schemas import Consulta
+from scraping_wto.utils import get_path_projeto
+
+# =============================================================================
+# CONSTANTES
+# =============================================================================
+
+path_projeto = get_path_projeto()
+assert isinstance(path_projeto, Path)
+
+PATH_LOG_CONSULTAS_FEITAS = path_projeto / "log/consultas_feitas.csv"
+
+FORMATO_DATA = "%Y-%m-%d"
+COLUNAS_LOG = ["COUNTRY", "YEAR", "IMPORTS", "NOMENCLATURE", "DATA_CONSULTA"]
+
+# Write-behind: cada registro vai na hora para o diário (append-only) e o CSV
+# é compactado no máximo uma vez a cada ATRASO_ESCRITA (s) (0 = a cada registro)
+ATRASO_ESCRITA = 5.0
+
+# =============================================================================
+# CLASSES E SCHEMAS
+# =============================================================================
+
+
+class RegistroConsultasFeitas:
+    """Log de consultas feitas carregado uma única vez num dict (país ->
+    última consulta). Os registros vão para um diário com fsync (ver
+    'DiarioCSV'); o CSV é reescrito em segundo plano."""
+
+    def __init__(
+        self,
+        path_arquivo: Path = PATH_LOG_CONSULTAS_FEITAS,
+        atraso_escrita: float = ATRASO_ESCRITA,
+    ) -> None:
+        self.path_arquivo = Path(path_arquivo)
+        self.atraso_escrita = atraso_escrita
+        self.diario = DiarioCSV(self.path_arquivo, COLUNAS_LOG)
+        self._lock = threading.RLock()
+        self._consultas: Optional[dict[str, Consulta]] = None
+        self._datas: dict[str, str] = {}
+        self._timer: Optional[threading.Timer] = None
+        return None
+
+    # -------------------------------------------------------------------------
+    # Lê o CSV + diário na primeira consulta ao registro
+    # -------------------------------------------------------------------------
+
+    def _carregadas(self) -> dict[str, Consulta]:
+        with self._lock:
+            if self._consultas is None:
+                linhas = self.diario.le()
+                self._consultas = {
+                    pais: Consulta(**{
+                        coluna: linha[coluna] for coluna in COLUNAS_LOG[:-1]
+                    })
+                    for pais, linha in linhas.items()
+                }
+                self._datas = {
+                    pais: linha["DATA_CONSULTA"]
+                    for pais, linha in linhas.items()
+                }
+            return self._consultas
+
+    def ultima(self, pais: str) -> Optional[Consulta]:
+        return self._carregadas().get(pais)
+
+    def data_consulta(self, pais: str) -> Optional[datetime]:
+        """Quando a cópia local do país foi baixada (None = nunca)"""
+
+        self._carregadas()
+        try:
+            return datetime.strptime(self._datas[pais], FORMATO_DATA)
+        except (KeyError, ValueError):
+            return None
+
+    def ja_feita(self, consulta: Consulta) -> bool:
+        """Feita = a mesma consulta, ou uma de um ano mais recente, já está
+        no log. Um ano mais novo disponível no site = não feita."""
+
+        ultima = self.ultima(consulta.COUNTRY)
+        if ultima is None:
+            return False
+        if ultima == consulta:
+            return True
+        return ano(ultima.YEAR) > ano(consulta.YEAR)
+
+    def registra(
+        self, consulta: Consulta, data_consulta: Optional[str] = None
+    ) -> None:
+        """Substitui a linha do país"""
+
+        if data_consulta is None:
+            data_consulta = datetime.now().strftime(format=FORMATO_DATA)
+        self.diario.anota({
+            **consulta.model_dump(),
+            "DATA_CONSULTA": data_consulta,
+        })
+        with self._lock:
+            self._carregadas()[consulta.COUNTRY] = consulta
+            self._datas[consulta.COUNTRY] = data_consulta
+            if self.atraso_escrita <= 0 or self.diario.precisa_compactar():
+                self.salva()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.atraso_escrita, self.salva)
+                self._timer.daemon = True
+                self._timer.start()
+        return None
+
+    # -------------------------------------------------------------------------
+    # Compacta o diário no CSV (ordenado por país)
+    # -------------------------------------------------------------------------
+
+    def salva(self) -> None:
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        self.diario.compacta()
+        return None
+
+
+# =============================================================================
+# FUNÇÕES
+# =============================================================================
+
+
+def ano(texto: str) -> int:
+    """Compara '2022' x '2021' como números (não como texto)"""
+
+    try:
+        return int(float(texto))
+    except ValueError:
+        return -1
@@ -2,6 +2,8 @@
 # BIBLIOTECAS E MÓDULOS
 # =============================================================================
 
+from enum import Enum
+
 from pydantic import BaseModel
 
 # =============================================================================
@@ -19,3 +21,59 @@ class Consulta(BaseModel):
 class TipoRelatorio(BaseModel):
     nome: str
     regex: str
+
+
+class ResultadoDownload(BaseModel):
+    url: str
+    sucesso: bool
+    path_arquivo: str = ""
+    bytes_baixados: int = 0
+    # Bytes que vieram de uma tentativa anterior (conexão caiu e foi retomada)
+    bytes_retomados: int = 0
+    duracao: float = 0.0
+
+    @property
+    def bytes_por_segundo(self) -> float:
+        return self.bytes_baixados / self.duracao if self.duracao > 0 else 0.0
+
+
+class MembroExtraido(BaseModel):
+    nome: str
+    path_arquivo: str
+    crc32: int
+    tamanho: int
+    numero_linhas: int = 0
+
+
+class Etapa(str, Enum):
+    """Etapas de uma consulta, na ordem. Download e extração são um passo só
+    (os .txt saem do zip enquanto ele é baixado)."""
+
+    EXPORTADO = "exportado"
+    PRONTO = "pronto"
+    EXTRAIDO = "extraido"
+    VALIDADO = "validado"
+
+    def passou(self, etapa: "Etapa") -> bool:
+        etapas = list(Etapa)
+        return etapas.index(self) >= etapas.index(etapa)
+
+
+class EtapaConsulta(BaseModel):
+    consulta: Consulta
+    etapa: Etapa
+    t_inicio_exportacao: float = 0.0
+    link_download: str = ""
+    # Quantas vezes a retomada a partir desta etapa já falhou
+    tentativas: int = 0
+
+
+class AssinaturaConsulta(BaseModel):
+    """O que foi baixado de um país: hash dos metadados da consulta (YEAR,
+    IMPORTS, NOMENCLATURE) e o zip (tamanho, crc32 de cada membro, SHA-256)"""
+
+    pais: str
+    hash_consulta: str
+    tamanho_zip: int = 0
+    crcs: dict[str, int] = {}
+    sha256_zip: str = ""
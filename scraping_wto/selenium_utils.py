@@ -4,11 +4,15 @@
 
 import logging
 import logging.config
+import os
 import subprocess
 from pathlib import Path
+from typing import Optional
 
 import requests
+from requests.adapters import HTTPAdapter
 from selenium import webdriver
+from selenium.common import WebDriverException
 from selenium.webdriver.firefox.service import Service as GeckoService
 from selenium.webdriver.remote.webdriver import WebDriver
 from selenium.webdriver.remote.webelement import WebElement
@@ -27,6 +31,55 @@ assert isinstance(DIR_PROJETO, Path)
 logging.config.fileConfig(DIR_PROJETO / "config/logging.toml")
 LOGGER = logging.getLogger("logMain.info.debug")
 
+# -----------------------------------------------------------------------------
+# Sessão HTTP usada nos downloads
+# -----------------------------------------------------------------------------
+
+TAMANHO_POOL_CONEXOES = 10
+
+# -----------------------------------------------------------------------------
+# Timeout (s) dos scripts assíncronos <- limite de segurança, os próprios
+# scripts têm timeouts menores
+# -----------------------------------------------------------------------------
+
+TIMEOUT_SCRIPTS = 300
+
+# -----------------------------------------------------------------------------
+# Perfis persistentes do Firefox <- cookies de login e cache sobrevivem ao
+# fechamento do navegador (um diretório por navegador aberto ao mesmo tempo).
+# Desligado por padrão: o perfil guarda os cookies da sessão logada
+# -----------------------------------------------------------------------------
+
+DIR_PERFIS_FIREFOX = Path(
+    os.getenv("DIR_PERFIS_WTO", str(DIR_PROJETO / "data/perfis_firefox"))
+)
+PERFIL_PERSISTENTE = os.getenv("PERFIL_PERSISTENTE_WTO", "0") == "1"
+
+# -----------------------------------------------------------------------------
+# Modo enxuto: o scraper só lê o HTML/DOM <- imagens, fontes e CSS não são
+# baixados e os caches de navegação (voltar/avançar, sessão) ficam desligados
+# -----------------------------------------------------------------------------
+
+NAVEGADOR_ENXUTO = os.getenv("NAVEGADOR_ENXUTO_WTO", "0") == "1"
+
+PREFERENCIAS_ENXUTO = {
+    # 2 = bloqueia
+    "permissions.default.image": 2,
+    "permissions.default.stylesheet": 2,
+    "gfx.downloadable_fonts.enabled": False,
+    "browser.display.use_document_fonts": 0,
+    "media.autoplay.default": 5,
+    # Páginas anteriores não ficam em memória nem no histórico da sessão
+    "browser.sessionhistory.max_total_viewers": 0,
+    "browser.sessionhistory.max_entries": 2,
+    "browser.sessionstore.resume_from_crash": False,
+    "browser.sessionstore.max_tabs_undo": 0,
+    # Nada de pré-carregar links e DNS
+    "network.prefetch-next": False,
+    "network.dns.disablePrefetch": True,
+    "network.http.speculative-parallel-limit": 0,
+}
+
 # =============================================================================
 # FUNÇÕES
 # =============================================================================
@@ -59,14 +112,31 @@ def download_geckodriver(
     return None
 
 
+# -----------------------------------------------------------------------------
+# Diretório de um perfil persistente do Firefox (criado se não existir)
+# -----------------------------------------------------------------------------
+
+
+def path_perfil_firefox(nome_perfil: str = "principal") -> Path:
+    path_perfil = DIR_PERFIS_FIREFOX / nome_perfil
+    path_perfil.mkdir(exist_ok=True, parents=True)
+    return path_perfil
+
+
 # -----------------------------------------------------------------------------
 # Retorna um WebDriver do Firefox via Selenium
 # -----------------------------------------------------------------------------
 
 
 def navegador_firefox(
-    use_default_firefox_bin: bool = True, headless: bool = True
+    use_default_firefox_bin: bool = True,
+    headless: bool = True,
+    path_perfil: Optional[Path] = None,
+    enxuto: bool = False,
 ) -> WebDriver:
+    """Com 'path_perfil', usa (e mantém) esse perfil em vez de um temporário.
+    Com 'enxuto', bloqueia imagens/fontes/CSS e não espera o evento 'load'."""
+
     def get_firefox_binary_path() -> str:
         """Returns the path to the Firefox binary."""
 
@@ -100,7 +170,9 @@ def navegador_firefox(
     firefox_options.add_argument("disable-infobars")
     firefox_options.add_argument("--window-size=1920,1080")
     firefox_options.set_preference("browser.download.folderList", 2)
-    firefox_options.set_preference("browser.download.manager.showWhenStarting", False)
+    firefox_options.set_preference(
+        "browser.download.manager.showWhenStarting", False
+    )
     firefox_options.set_preference(
         "browser.download.dir", str(path_download.absolute())
     )
@@ -109,11 +181,38 @@ def navegador_firefox(
     )
     firefox_options.set_preference("dom.webnotifications.enabled", False)
     firefox_options.set_preference("browser.tabs.warnOnClose", False)
-
-    navegador = webdriver.Firefox(
-        service=GeckoService(executable_path=str(path_geckodriver.absolute())),
-        options=firefox_options,
+    if enxuto:
+        for preferencia, valor in PREFERENCIAS_ENXUTO.items():
+            firefox_options.set_preference(preferencia, valor)
+        # 'get' volta no DOMContentLoaded <- os scripts do WebForms já rodaram
+        firefox_options.page_load_strategy = "eager"
+
+    servico = GeckoService(executable_path=str(path_geckodriver.absolute()))
+    if path_perfil is None:
+        navegador = webdriver.Firefox(service=servico, options=firefox_options)
+        navegador.set_script_timeout(TIMEOUT_SCRIPTS)
+        return navegador
+
+    # Cookies e cache ficam no perfil entre uma execução e outra
+    firefox_options.set_preference("browser.cache.disk.enable", True)
+    firefox_options.set_preference(
+        "privacy.sanitize.sanitizeOnShutdown", False
     )
+    firefox_options.set_preference("network.cookie.lifetimePolicy", 0)
+    firefox_options.add_argument("-profile")
+    firefox_options.add_argument(str(path_perfil.absolute()))
+
+    try:
+        navegador = webdriver.Firefox(service=servico, options=firefox_options)
+    except WebDriverException as e:
+        # Ex.: um Firefox que não fechou direito ainda segura a trava do perfil
+        LOGGER.warning(
+            f"navegador_firefox: Perfil '{path_perfil}' indisponível ({e}). Usando um temporário . . ."
+        )
+        return navegador_firefox(
+            use_default_firefox_bin, headless, enxuto=enxuto
+        )
+    navegador.set_script_timeout(TIMEOUT_SCRIPTS)
 
     return navegador
 
@@ -176,10 +275,68 @@ def clica_botao(navegador: WebDriver, by: str, value: str) -> None:
 # -----------------------------------------------------------------------------
 
 
-def insere_texto(navegador: WebDriver, by: str, value: str, texto: str) -> None:
+def insere_texto(
+    navegador: WebDriver, by: str, value: str, texto: str
+) -> None:
 
     caixa_texto = espera_presenca_elemento(navegador, by, value)
     caixa_texto.clear()
     caixa_texto.send_keys(texto)
 
     return None
+
+
+# -----------------------------------------------------------------------------
+# Copia os cookies (login) do navegador para uma sessão do requests
+# -----------------------------------------------------------------------------
+
+
+def atualiza_cookies(sessao: requests.Session, navegador: WebDriver) -> None:
+    for cookie in navegador.get_cookies():
+        sessao.cookies.set(
+            name=cookie["name"],
+            value=cookie["value"],
+            domain=cookie.get("domain", ""),
+            path=cookie.get("path", "/"),
+        )
+    return None
+
+
+# -----------------------------------------------------------------------------
+# Retorna uma sessão HTTP com keep-alive e pool de conexões
+# -----------------------------------------------------------------------------
+
+
+def cria_sessao_http(
+    tamanho_pool: int = TAMANHO_POOL_CONEXOES,
+) -> requests.Session:
+    sessao = requests.Session()
+    adaptador = HTTPAdapter(
+        pool_connections=tamanho_pool, pool_maxsize=tamanho_pool
+    )
+    sessao.mount("https://", adaptador)
+    sessao.mount("http://", adaptador)
+    return sessao
+
+
+# -----------------------------------------------------------------------------
+# Retorna uma sessão HTTP (keep-alive + pool) autenticada com o login do navegador
+# -----------------------------------------------------------------------------
+
+
+def sessao_requests(
+    navegador: WebDriver,
+    sessao: Optional[requests.Session] = None,
+    tamanho_pool: int = TAMANHO_POOL_CONEXOES,
+) -> requests.Session:
+    if sessao is None:
+        sessao = cria_sessao_http(tamanho_pool)
+
+    # O servidor pode amarrar a sessão ao User-Agent do navegador
+    user_agent = navegador.execute_script("return navigator.userAgent;")
+    if user_agent:
+        sessao.headers.update({"User-Agent": user_agent})
+
+    atualiza_cookies(sessao, navegador)
+
+    return sessao
@@ -0,0 +1,170 @@
+# =============================================================================
+# BIBLIOTECAS E MÓDULOS
+# =============================================================================
+
+from typing import Optional
+
+import requests
+from selenium.common import WebDriverException
+from selenium.webdriver.remote.webdriver import WebDriver
+
+from scraping_wto.log import LOGGER
+from scraping_wto.selenium_utils import (
+    navegador_firefox,
+    path_perfil_firefox,
+    sessao_requests,
+)
+from scraping_wto.website_scraping import (
+    PAGINA_LOGIN,
+    navegador_login,
+    reinicia_navegador,
+    sessao_ativa,
+)
+
+# =============================================================================
+# CLASSES E SCHEMAS
+# =============================================================================
+
+
+class SessaoNavegador:
+    """Dona de um único WebDriver logado, compartilhado por todas as etapas.
+    Com 'nome_perfil', o Firefox usa um perfil persistente com esse nome."""
+
+    def __init__(
+        self, nome_perfil: Optional[str] = None, **kwargs_navegador
+    ) -> None:
+        if nome_perfil is not None:
+            kwargs_navegador["path_perfil"] = path_perfil_firefox(nome_perfil)
+        self._kwargs_navegador = kwargs_navegador
+        self._navegador: Optional[WebDriver] = None
+        self._sessao_http: Optional[requests.Session] = None
+        self.numero_logins = 0
+        self.numero_logins_reaproveitados = 0
+        self.numero_reinicios = 0
+        self._conferir_sessao = False
+        return None
+
+    def __enter__(self) -> "SessaoNavegador":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.fecha()
+        return None
+
+    # -------------------------------------------------------------------------
+    # Verifica se a sessão ainda é válida
+    # -------------------------------------------------------------------------
+
+    def navegador_vivo(self) -> bool:
+        if self._navegador is None:
+            return False
+        try:
+            _ = self._navegador.current_url
+        except WebDriverException:
+            return False
+        return True
+
+    def sessao_expirada(self) -> bool:
+        assert self._navegador is not None, (
+            "sessao_expirada: navegador is None"
+        )
+        if self._conferir_sessao:
+            # Depois de uma falha, a URL não basta <- pergunta ao servidor
+            self._conferir_sessao = False
+            return not sessao_ativa(self._navegador)
+        return PAGINA_LOGIN in self._navegador.current_url.lower()
+
+    def marca_falha(self) -> None:
+        """Uma consulta falhou: antes de entregar o navegador de novo, confere
+        se a sessão ainda vale no servidor"""
+
+        self._conferir_sessao = True
+        return None
+
+    # -------------------------------------------------------------------------
+    # Retorna o navegador logado, fazendo login/reinício apenas se precisar
+    # -------------------------------------------------------------------------
+
+    def garante_sessao(self) -> WebDriver:
+        if self._navegador is None:
+            LOGGER.debug("SessaoNavegador: Abrindo o navegador . . .")
+            self._navegador = navegador_firefox(**self._kwargs_navegador)
+            self._login()
+
+        elif not self.navegador_vivo():
+            LOGGER.warning(
+                "SessaoNavegador: Navegador não responde. Reiniciando . . ."
+            )
+            self.reinicia()
+
+        elif self.sessao_expirada():
+            LOGGER.info(
+                "SessaoNavegador: Sessão expirada. Refazendo o login . . ."
+            )
+            self._login()
+
+        return self._navegador
+
+    @property
+    def navegador(self) -> WebDriver:
+        return self.garante_sessao()
+
+    # -------------------------------------------------------------------------
+    # Sessão HTTP (keep-alive) com os mesmos cookies do navegador
+    # -------------------------------------------------------------------------
+
+    @property
+    def sessao_http(self) -> requests.Session:
+        navegador = self.garante_sessao()
+        if self._sessao_http is None:
+            self._sessao_http = sessao_requests(navegador)
+        return self._sessao_http
+
+    # -------------------------------------------------------------------------
+    # Força o reinício do navegador <- usado quando uma etapa deu erro grave
+    # -------------------------------------------------------------------------
+
+    def reinicia(self) -> WebDriver:
+        if self._navegador is None:
+            return self.garante_sessao()
+
+        self._navegador = reinicia_navegador(
+            self._navegador, **self._kwargs_navegador
+        )
+        self.numero_logins += 1
+        self.numero_reinicios += 1
+        self._conferir_sessao = False
+        self._sincroniza_sessao_http()
+
+        return self._navegador
+
+    def fecha(self) -> None:
+        if self._navegador is None:
+            return None
+        try:
+            self._navegador.quit()
+        except WebDriverException:
+            pass
+        self._navegador = None
+        if self._sessao_http is not None:
+            self._sessao_http.close()
+            self._sessao_http = None
+        LOGGER.debug(
+            f"SessaoNavegador: Navegador fechado ({self.numero_logins} logins, {self.numero_logins_reaproveitados} reaproveitados, {self.numero_reinicios} reinícios)."
+        )
+        return None
+
+    def _login(self) -> None:
+        assert self._navegador is not None, "_login: navegador is None"
+        if navegador_login(navegador=self._navegador) is False:
+            self.numero_logins_reaproveitados += 1
+        self.numero_logins += 1
+        self._sincroniza_sessao_http()
+        return None
+
+    def _sincroniza_sessao_http(self) -> None:
+        # Um novo login gera novos cookies de autenticação
+        if self._sessao_http is not None and self._navegador is not None:
+            self._sessao_http.cookies.clear()
+            sessao_requests(self._navegador, sessao=self._sessao_http)
+        return None
@@ -81,7 +81,9 @@ def extrai_arquivo(path_arquivo: Path, dir_destino: Optional[Path]) -> None:
     LOGGER.debug(f"extrai_arquivo: 📦 Extraindo '{path_arquivo.name}' . . .")
     zip_file = zip.ZipFile(file=path_arquivo, mode="r")
     zip_file.extractall(path=dir_destino if not None else path_arquivo.parent)
-    LOGGER.debug(f"extrai_arquivo: ✅ '{path_arquivo.name}' foi extraído com sucesso!")
+    LOGGER.debug(
+        f"extrai_arquivo: ✅ '{path_arquivo.name}' foi extraído com sucesso!"
+    )
 
     return None
 
@@ -91,7 +93,9 @@ def extrai_arquivo(path_arquivo: Path, dir_destino: Optional[Path]) -> None:
 # -----------------------------------------------------------------------------
 
 
-def extraindo_todos_arquivos(dir_arquivos_zip: Path, dir_destino: Path) -> None:
+def extraindo_todos_arquivos(
+    dir_arquivos_zip: Path, dir_destino: Path
+) -> None:
     arquivos_zip = dir_arquivos_zip.glob(pattern="*.zip")
 
     LOGGER.debug("extraindo_todos_arquivos: 📦 EXTRAINDO ARQUIVOS ZIP")
@@ -128,7 +132,9 @@ def normaliza_str(input_str: str) -> str:
 
     # Normalizando o texto conforme a forma NFC
     nfkd_form = unicodedata.normalize("NFKD", input_str)
-    output_str = "".join([c for c in nfkd_form if not unicodedata.combining(c)])
+    output_str = "".join([
+        c for c in nfkd_form if not unicodedata.combining(c)
+    ])
 
     # Removendo as possíveis tags de HTML
     regex_tags = r"</?.>"
@@ -162,9 +168,9 @@ def normaliza_nomes(input_str: str) -> str:
     output_str = output_str.replace(" ", "_")
 
     if output_str:
-        assert (
-            len(output_str) <= NUMERO_MAX_CHARS_WTO
-        ), f"normaliza_nomes: ERRO! Nome normalizado com >{NUMERO_MAX_CHARS_WTO} chars."
+        assert len(output_str) <= NUMERO_MAX_CHARS_WTO, (
+            f"normaliza_nomes: ERRO! Nome normalizado com >{NUMERO_MAX_CHARS_WTO} chars."
+        )
         return output_str
 
     return input_str[:NUMERO_MAX_CHARS_WTO].lower().replace(" ", "_")
@@ -195,3 +201,19 @@ def extrai_nome_pais(texto: str) -> str:
     if re.findall(regex, texto):
         return re.findall(regex, texto)[0]
     return ""
+
+
+# -----------------------------------------------------------------------------
+# A linha da tabela de relatórios é a do país? Compara o nome exato do arquivo
+# ('<nome>_TL...'), no link ou numa célula <- 'niger' não pega 'nigeria'
+# -----------------------------------------------------------------------------
+
+
+def relatorio_do_pais(
+    nome_arquivo: str, celulas: list[str], links: list[str]
+) -> bool:
+    return any(
+        extrai_nome_pais(link) == nome_arquivo for link in links
+    ) or any(
+        celula.strip().startswith(f"{nome_arquivo}_TL") for celula in celulas
+    )
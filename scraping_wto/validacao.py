@@ -0,0 +1,160 @@
+# =============================================================================
+# BIBLIOTECAS E MÓDULOS
+# =============================================================================
+
+import csv
+import io
+from pathlib import Path
+from typing import BinaryIO
+
+from scraping_wto.extrator_zip import ExtratorZipStream
+from scraping_wto.log import LOGGER
+from scraping_wto.utils import normaliza_nomes
+
+# =============================================================================
+# CONSTANTES
+# =============================================================================
+
+# Quantas linhas (além do cabeçalho) são lidas para conferir o país
+NUMERO_LINHAS_AMOSTRA = 5
+
+COLUNA_REPORTER = "Reporter"
+SEPARADOR = "\t"
+
+# Tabela usada para conferir o país <- cabeçalho + pelo menos uma linha
+SUFIXO_TABELA_REPORTER = "_DutyDetails_TL.txt"
+MINIMO_LINHAS_TABELA_REPORTER = 2
+
+# =============================================================================
+# CLASSES E SCHEMAS
+# =============================================================================
+
+
+class ErroValidacao(Exception):
+    pass
+
+
+# =============================================================================
+# FUNÇÕES
+# =============================================================================
+
+# -----------------------------------------------------------------------------
+# Cabeçalho e primeiras linhas de uma tabela <- não lê o resto do arquivo
+# -----------------------------------------------------------------------------
+
+
+def amostra_tabela(
+    arquivo_f: BinaryIO, numero_linhas: int = NUMERO_LINHAS_AMOSTRA
+) -> tuple[list[str], list[list[str]]]:
+    texto = io.TextIOWrapper(
+        arquivo_f, encoding="utf-8", errors="replace", newline=""
+    )
+    leitor = csv.reader(texto, delimiter=SEPARADOR)
+    cabecalho = next(leitor, [])
+    linhas = [linha for _, linha in zip(range(numero_linhas), leitor)]
+    return cabecalho, linhas
+
+
+def amostra_arquivo(
+    path_arquivo: Path, numero_linhas: int = NUMERO_LINHAS_AMOSTRA
+) -> tuple[list[str], list[list[str]]]:
+    with open(path_arquivo, "rb") as arquivo_f:
+        return amostra_tabela(arquivo_f, numero_linhas)
+
+
+# -----------------------------------------------------------------------------
+# País (normalizado) da amostra <- todas as linhas precisam concordar
+# -----------------------------------------------------------------------------
+
+
+def reporter_da_amostra(cabecalho: list[str], linhas: list[list[str]]) -> str:
+    if COLUNA_REPORTER not in cabecalho:
+        raise ErroValidacao(
+            f"reporter_da_amostra: coluna '{COLUNA_REPORTER}' não existe"
+        )
+    if not linhas:
+        raise ErroValidacao("reporter_da_amostra: tabela sem linhas")
+
+    coluna = cabecalho.index(COLUNA_REPORTER)
+    reporters = {
+        normaliza_nomes(linha[coluna])
+        for linha in linhas
+        if len(linha) > coluna
+    }
+    if len(reporters) != 1:
+        raise ErroValidacao(
+            f"reporter_da_amostra: países diferentes na amostra {reporters}"
+        )
+    return reporters.pop()
+
+
+# -----------------------------------------------------------------------------
+# Membros extraídos x diretório central do zip (crc32, tamanho, linhas)
+# -----------------------------------------------------------------------------
+
+
+def valida_extracao(extrator: ExtratorZipStream) -> None:
+    extraidos = {membro.nome: membro for membro in extrator.membros}
+
+    faltando = [
+        nome
+        for nome in extrator.diretorio_central
+        if extrator.seleciona(nome)
+        and not nome.endswith("/")
+        and nome not in extraidos
+    ]
+    if faltando:
+        raise ErroValidacao(
+            f"valida_extracao: membros não extraídos {faltando}"
+        )
+
+    for nome, membro in extraidos.items():
+        if nome not in extrator.diretorio_central:
+            raise ErroValidacao(
+                f"valida_extracao: '{nome}' não está no diretório central"
+            )
+        crc, tamanho = extrator.diretorio_central[nome]
+        if (membro.crc32, membro.tamanho) != (crc, tamanho):
+            raise ErroValidacao(
+                f"valida_extracao: '{nome}' difere do diretório central (crc {membro.crc32:08x} != {crc:08x})"
+            )
+        if membro.numero_linhas < 1:
+            raise ErroValidacao(f"valida_extracao: '{nome}' sem cabeçalho")
+
+    return None
+
+
+# -----------------------------------------------------------------------------
+# Confere se o download extraído é mesmo do país pedido
+# -----------------------------------------------------------------------------
+
+
+def valida_download(extrator: ExtratorZipStream, nome_pais: str) -> None:
+    """'nome_pais' é o nome normalizado (o do arquivo do zip)"""
+
+    valida_extracao(extrator)
+
+    tabelas_reporter = [
+        membro
+        for membro in extrator.membros
+        if membro.nome.endswith(SUFIXO_TABELA_REPORTER)
+    ]
+    if not tabelas_reporter:
+        raise ErroValidacao(
+            f"valida_download: zip sem '*{SUFIXO_TABELA_REPORTER}'"
+        )
+
+    membro = tabelas_reporter[0]
+    if membro.numero_linhas < MINIMO_LINHAS_TABELA_REPORTER:
+        raise ErroValidacao(f"valida_download: '{membro.nome}' sem linhas")
+
+    reporter = reporter_da_amostra(*amostra_arquivo(Path(membro.path_arquivo)))
+    if reporter != nome_pais:
+        raise ErroValidacao(
+            f"valida_download: '{membro.nome}' é de '{reporter}', não de '{nome_pais}'"
+        )
+
+    LOGGER.debug(
+        f"valida_download: ✅ '{nome_pais}' conferido ({membro.numero_linhas - 1} linhas)"
+    )
+    return None
@@ -4,17 +4,28 @@
 
 import os
 import re
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from time import sleep
-from typing import Callable, Optional, Tuple
+from time import sleep, time
+from typing import Callable, Literal, Optional, Tuple, Union, overload
 
-import pandas as pd
 import requests
 from dotenv import find_dotenv, load_dotenv
-from selenium.common import NoSuchElementException, TimeoutException
+from selenium.common import (
+    NoSuchElementException,
+    TimeoutException,
+    WebDriverException,
+)
 from selenium.webdriver.remote.webdriver import WebDriver
 from selenium.webdriver.remote.webelement import WebElement
+from selenium.webdriver.support.wait import WebDriverWait
 
+from scraping_wto.assinaturas import (
+    RegistroAssinaturas,
+    diretorio_central_remoto,
+)
 from scraping_wto.controle_fluxo import (
     add_na_fila,
     consulta_ja_feita,
@@ -22,23 +33,38 @@ from scraping_wto.controle_fluxo import (
     log_consulta_realizada_sucesso,
     remove_da_fila,
 )
+from scraping_wto.etapas import RegistroEtapas
+from scraping_wto.extrator_zip import ExtratorZipStream, membro_txt
+from scraping_wto.gerenciador_downloads import (
+    TIMEOUT_DOWNLOAD,
+    GerenciadorDownloads,
+)
+from scraping_wto.limitador import LIMITADOR
 from scraping_wto.log import LOGGER
-from scraping_wto.schemas import Consulta
+from scraping_wto.metricas import ETAPA_ESPERA_EXPORTACAO, METRICAS
+from scraping_wto.modelo_exportacao import (
+    ModeloTempoExportacao,
+    intervalos_backoff,
+    prazo_exportacao,
+)
+from scraping_wto.schemas import Consulta, Etapa, EtapaConsulta
 from scraping_wto.selenium_utils import (
+    TIMEOUT_SCRIPTS,
+    atualiza_cookies,
     clica_botao,
     espera_elemento_clicavel,
     espera_elemento_visivel,
-    espera_presenca_elemento,
     insere_texto,
     navegador_firefox,
+    sessao_requests,
 )
 from scraping_wto.utils import (
-    extrai_arquivo,
     extrai_nome_pais,
     get_path_projeto,
     normaliza_nomes,
-    tempo_espera_aleatorio,
+    relatorio_do_pais,
 )
+from scraping_wto.validacao import ErroValidacao, valida_download
 
 # =============================================================================
 # CLASSES E SCHEMAS
@@ -73,11 +99,243 @@ if (!linhaInfosPais) {
     return infosPais;
 }"""
 
+    @staticmethod
+    def espera_processamento() -> str:
+        """Script assíncrono: resolve quando o pop-up "Processing" some (ou no
+        timeout), sem ficar consultando o elemento pelo WebDriver"""
+
+        return """const [seletor, timeoutMs] = [arguments[0], arguments[1]];
+const callback = arguments[arguments.length - 1];
+const inicio = performance.now();
+const elemento = document.querySelector(seletor);
+const resposta = (status) => callback({ status: status, duracaoMs: performance.now() - inicio });
+if (!elemento) {
+    resposta("sem_elemento");
+    return;
+}
+const prm = (window.Sys && Sys.WebForms) ? Sys.WebForms.PageRequestManager.getInstance() : null;
+const ocupado = () => elemento.getAttribute("aria-hidden") === "false" || (prm !== null && prm.get_isInAsyncPostBack());
+if (!ocupado()) {
+    resposta("livre");
+    return;
+}
+let observer = null;
+let intervalo = null;
+const finaliza = (status) => {
+    clearTimeout(timer);
+    clearInterval(intervalo);
+    observer.disconnect();
+    resposta(status);
+};
+const timer = setTimeout(() => finaliza("timeout"), timeoutMs);
+observer = new MutationObserver(() => { if (!ocupado()) finaliza("livre"); });
+observer.observe(elemento, { attributes: true, attributeFilter: ["aria-hidden", "style"] });
+// O fim do postback nem sempre muda o atributo <- confere a cada 250 ms
+intervalo = setInterval(() => { if (!ocupado()) finaliza("livre"); }, 250);"""
+
+    @staticmethod
+    def coleta_infos_todos_paises() -> str:
+        """Script assíncrono: clica em cada país da janela de consulta, espera
+        o postback (UpdatePanel) terminar e lê a 1ª linha da tabela de anos.
+        Tudo numa única ida ao WebDriver. País sem postback (timeout) ou com
+        a linha vazia volta com 'infos' null."""
+
+        return """const [paises, timeoutPorPaisMs] = [arguments[0], arguments[1]];
+const callback = arguments[arguments.length - 1];
+if (!(window.Sys && Sys.WebForms)) {
+    callback({ erro: "PageRequestManager não encontrado" });
+    return;
+}
+const prm = Sys.WebForms.PageRequestManager.getInstance();
+const seletorLinhas = ["GridItem", "GridAlternatingItem"]
+    .map(classe => `#ctl00_qsl_qs_pop_ctl00_dgCountry tr.${classe}`)
+    .join(", ");
+const normaliza = texto => texto.replace(/\\s+/g, " ").trim();
+const linhasPaises = () => [...document.querySelectorAll(seletorLinhas)];
+const nomes = paises !== null ? paises : linhasPaises().map(linha => normaliza(linha.textContent));
+const leInfos = () => {
+    const tabela = document.querySelector("#ctl00_qsl_qs_pop_ctl00_dgYear");
+    const linha = tabela ? tabela.querySelector("tr.GridItem") : null;
+    const infos = linha ? [...linha.querySelectorAll("td")].slice(1).map(td => td.textContent) : [];
+    return infos.some(texto => texto.trim()) ? infos : null;
+};
+// O clique só agenda o postback (setTimeout('__doPostBack(...)', 0)) <- logo
+// depois dele 'get_isInAsyncPostBack()' ainda é false. Espera o par
+// beginRequest -> endRequest deste clique.
+const clicaEEspera = input => new Promise(resolve => {
+    let comecou = false;
+    const inicio = () => { comecou = true; };
+    const fim = () => { if (comecou) finaliza(true); };
+    const finaliza = terminou => {
+        clearTimeout(timer);
+        prm.remove_beginRequest(inicio);
+        prm.remove_endRequest(fim);
+        resolve(terminou);
+    };
+    const timer = setTimeout(() => finaliza(false), timeoutPorPaisMs);
+    prm.add_beginRequest(inicio);
+    prm.add_endRequest(fim);
+    input.click();
+});
+(async () => {
+    const resultados = [];
+    for (const nome of nomes) {
+        // O UpdatePanel recria as linhas a cada postback <- busca de novo
+        const linha = linhasPaises().find(linha => normaliza(linha.textContent) === nome);
+        const input = linha ? linha.querySelector("input") : null;
+        if (!input) {
+            resultados.push({ pais: nome, infos: null });
+            continue;
+        }
+        const terminou = await clicaEEspera(input);
+        resultados.push({ pais: nome, infos: terminou ? leInfos() : null });
+    }
+    callback({ resultados: resultados });
+})().catch(e => callback({ erro: String(e) }));"""
+
+    @staticmethod
+    def get_lista_paises() -> str:
+        """Nome e id do input de cada linha da janela de consulta, numa única
+        ida ao WebDriver"""
+
+        return """const tabela = document.querySelector("#ctl00_qsl_qs_pop_ctl00_dgCountry");
+if (!tabela) {
+    return [];
+}
+const normaliza = texto => texto.replace(/\\s+/g, " ").trim();
+return [...tabela.querySelectorAll("tr.GridItem, tr.GridAlternatingItem")].map(linha => {
+    const input = linha.querySelector("input");
+    return { pais: normaliza(linha.textContent), id: input ? input.id : null };
+});"""
+
+    @staticmethod
+    def clica_pais_por_id() -> str:
+        """Clica no input pelo id, se a linha ainda for a do país (o
+        UpdatePanel recria a tabela a cada postback)"""
+
+        return """const [id, pais] = [arguments[0], arguments[1]];
+const input = document.getElementById(id);
+const linha = input ? input.closest("tr") : null;
+if (!linha || linha.textContent.replace(/\\s+/g, " ").trim() !== pais) {
+    return false;
+}
+input.click();
+return true;"""
+
+    @staticmethod
+    def deleta_relatorios() -> str:
+        """Script assíncrono: faz os postbacks do botão "Delete" via fetch,
+        um atrás do outro, lendo a tabela (e o __VIEWSTATE) da resposta do
+        anterior. Sem clique, sem confirm() e sem esperar a página a cada
+        relatório. 'nomes' = null deleta todos."""
+
+        return """const [nomes, limite] = [arguments[0], arguments[1]];
+const callback = arguments[arguments.length - 1];
+const seletorLinhas = ["table2", "table3"]
+    .map(classe => `#ctl00_c_viewFile_dgExportFile .${classe}`)
+    .join(", ");
+// Nome exato do arquivo ('<nome>_TL...'), no link ou numa célula <- 'niger'
+// não pode pegar o relatório de 'nigeria'
+const arquivoDoLink = href => (href.match(/.*\\/(.*)_TL/) || [])[1];
+const relatorioDoPais = (linha, nome) =>
+    [...linha.querySelectorAll("a[href]")].some(link => arquivoDoLink(link.href) === nome)
+    || [...linha.querySelectorAll("td")].some(celula => celula.textContent.trim().startsWith(`${nome}_TL`));
+const botaoDeletar = (doc) => [...doc.querySelectorAll(seletorLinhas)]
+    .filter(linha => nomes === null || nomes.some(nome => relatorioDoPais(linha, nome)))
+    .map(linha => linha.querySelector("input[id*='bDelete']"))
+    .find(botao => botao);
+let doc = document;
+let deletados = 0;
+(async () => {
+    for (; deletados < limite; deletados++) {
+        const botao = botaoDeletar(doc);
+        if (!botao) {
+            callback({ deletados: deletados });
+            return;
+        }
+        const form = botao.form;
+        const dados = new URLSearchParams(new FormData(form));
+        dados.set("__EVENTTARGET", "");
+        dados.set("__EVENTARGUMENT", "");
+        dados.append(botao.name, botao.value);
+        const resposta = await fetch(new URL(form.getAttribute("action"), location.href), {
+            method: "POST",
+            body: dados,
+            credentials: "same-origin",
+        });
+        if (!resposta.ok) {
+            callback({ deletados: deletados, erro: `HTTP ${resposta.status}` });
+            return;
+        }
+        doc = new DOMParser().parseFromString(await resposta.text(), "text/html");
+    }
+    callback({ deletados: deletados, erro: "limite de relatórios atingido" });
+})().catch(e => callback({ deletados: deletados, erro: String(e) }));"""
+
+    @staticmethod
+    def get_status_relatorios() -> str:
+        """Uma única ida ao WebDriver para o status de todas as linhas da
+        tabela de relatórios exportados"""
+
+        return """const tabela = document.querySelector("#ctl00_c_viewFile_dgExportFile");
+if (!tabela) {
+    return [];
+}
+return [...tabela.querySelectorAll(".table2, .table3")].map(linha => {
+    const link = linha.querySelector("a[href]");
+    return {
+        texto: linha.textContent,
+        link: link ? link.href : null,
+        pronto: !linha.querySelector("input[id*='bReload']") && link !== null,
+    };
+});"""
+
+
+class MetricasEspera:
+    """Quanto tempo cada pop-up "Processing" ficou na tela (em segundos)"""
+
+    def __init__(self, tamanho_historico: int = 1000) -> None:
+        self._lock = threading.Lock()
+        self.duracoes: deque = deque(maxlen=tamanho_historico)
+        self.numero_esperas = 0
+        self.numero_timeouts = 0
+        self.tempo_total = 0.0
+        self.tempo_maximo = 0.0
+        return None
+
+    def registra(self, duracao: float, timeout: bool = False) -> None:
+        with self._lock:
+            self.duracoes.append(duracao)
+            self.numero_esperas += 1
+            self.numero_timeouts += int(timeout)
+            self.tempo_total += duracao
+            self.tempo_maximo = max(self.tempo_maximo, duracao)
+        return None
+
+    def resumo(self) -> dict:
+        with self._lock:
+            return {
+                "numero_esperas": self.numero_esperas,
+                "numero_timeouts": self.numero_timeouts,
+                "tempo_total": self.tempo_total,
+                "tempo_medio": self.tempo_total / max(self.numero_esperas, 1),
+                "tempo_maximo": self.tempo_maximo,
+            }
+
 
 # =============================================================================
 # CONSTANTES
 # =============================================================================
 
+# -----------------------------------------------------------------------------
+# Site da WTO (pode apontar para outro servidor, ex.: testes)
+# -----------------------------------------------------------------------------
+
+URL_BASE_TAO = os.getenv("URL_TAO", "https://tao.wto.org").rstrip("/")
+
+# Quando a sessão expira, o site redireciona para a página de login
+PAGINA_LOGIN = "welcome.aspx"
+
 # -----------------------------------------------------------------------------
 # Paths
 # -----------------------------------------------------------------------------
@@ -87,12 +345,64 @@ assert isinstance(path_projeto, Path)
 DIR_DOWNLOAD_ARQUIVOS = str(path_projeto / "data/bronze/tl/zip")
 DIR_DESTINO_UNZIP = path_projeto / "data/bronze/tl"
 
+# -----------------------------------------------------------------------------
+# Downloads (limite de downloads simultâneos vale para o processo todo)
+# -----------------------------------------------------------------------------
+
+GERENCIADOR_DOWNLOADS = GerenciadorDownloads()
+
+# O zip baixado só é guardado (em DIR_DOWNLOAD_ARQUIVOS) para auditoria; os
+# .txt são extraídos direto do download
+GUARDA_ZIP_AUDITORIA = os.getenv("GUARDA_ZIP_WTO", "0") == "1"
+
 # -----------------------------------------------------------------------------
 # Scripts do JS
 # -----------------------------------------------------------------------------
 
 JS_SCRIPTS = ScriptsJS()
 
+# -----------------------------------------------------------------------------
+# Espera do pop-up "Processing"
+# -----------------------------------------------------------------------------
+
+TIMEOUT_EM_ESPERA = 120
+
+# Espera (s) pelo link do relatório pronto
+TIMEOUT_LINK_DOWNLOAD = 10
+METRICAS_ESPERA = MetricasEspera()
+
+# -----------------------------------------------------------------------------
+# Tempo de exportação esperado por país (para o backoff do botão de refresh)
+# -----------------------------------------------------------------------------
+
+MODELO_EXPORTACAO = ModeloTempoExportacao()
+
+# -----------------------------------------------------------------------------
+# Etapa em que cada consulta parou (para retomar depois de um erro)
+# -----------------------------------------------------------------------------
+
+REGISTRO_ETAPAS = RegistroEtapas()
+
+# -----------------------------------------------------------------------------
+# Assinatura (metadados + zip) do último download validado de cada país
+# -----------------------------------------------------------------------------
+
+ASSINATURAS = RegistroAssinaturas()
+
+# -----------------------------------------------------------------------------
+# Id do input de cada país na janela de consulta <- preenchido pela
+# get_lista_paises, evita o XPath com normalize-space() a cada clique
+# -----------------------------------------------------------------------------
+
+IDS_PAISES: dict[str, str] = {}
+
+# -----------------------------------------------------------------------------
+# Máximo de relatórios deletados por um único script <- evita loop infinito
+# se o site não apagar a linha
+# -----------------------------------------------------------------------------
+
+LIMITE_DELECOES_LOTE = 500
+
 # =============================================================================
 # FUNÇÕES
 # =============================================================================
@@ -102,8 +412,18 @@ JS_SCRIPTS = ScriptsJS()
 # -----------------------------------------------------------------------------
 
 
-def navegador_login(navegador: WebDriver) -> None:
-    """Retorna um navegador já na página inicial da WTO"""
+@METRICAS.cronometra("login")
+def navegador_login(navegador: WebDriver) -> bool:
+    """Retorna um navegador já na página inicial da WTO. Retorna False se o
+    login (cookie do "lembre-se de mim" no perfil) ainda era válido."""
+
+    # Sem login válido, o site redireciona para a página de login <- o
+    # formulário já fica aberto e o caminho normal não paga página a mais
+    navegador.get(f"{URL_BASE_TAO}/default.aspx")
+    if PAGINA_LOGIN not in navegador.current_url.lower():
+        LOGGER.debug("navegador_login: ⚡ Login do perfil ainda válido!")
+        return False
+    LOGGER.debug("navegador_login: Página web aberta!")
 
     # Pegando as infos de login
     load_dotenv(find_dotenv())
@@ -114,11 +434,6 @@ def navegador_login(navegador: WebDriver) -> None:
     senha = os.getenv("SENHA_WTO")
     assert senha is not None, "senha is None"
 
-    # Abrindo a página
-    link_pagina = "https://tao.wto.org/welcome.aspx?ReturnUrl=%2fdefault.aspx"
-    navegador.get(link_pagina)
-    LOGGER.debug("navegador_login: Página web aberta!")
-
     # Inserindo o usuário
     LOGGER.debug("navegador_login: Inserindo o usuário. . .")
     localizador_usuario = ("xpath", '//*[@id="ctl00_c_ctrLogin_UserName"]')
@@ -141,9 +456,24 @@ def navegador_login(navegador: WebDriver) -> None:
     clica_botao(navegador, *localizador_login)
 
     LOGGER.debug("navegador_login: LOGIN REALIZADO!")
-    tempo_espera_aleatorio()
+    LIMITADOR.espera()
+
+    return True
+
+
+# -----------------------------------------------------------------------------
+# Confere no servidor se o login ainda vale <- a página atual pode ter ficado
+# parada com a sessão já vencida
+# -----------------------------------------------------------------------------
 
-    return None
+
+def sessao_ativa(navegador: WebDriver) -> bool:
+    navegador.get(f"{URL_BASE_TAO}/default.aspx")
+    if PAGINA_LOGIN in navegador.current_url.lower():
+        return False
+    # Sem redirecionar, mas com o formulário de login na página
+    localizador_usuario = ("xpath", '//*[@id="ctl00_c_ctrLogin_UserName"]')
+    return not navegador.find_elements(*localizador_usuario)
 
 
 # -----------------------------------------------------------------------------
@@ -152,7 +482,11 @@ def navegador_login(navegador: WebDriver) -> None:
 
 
 def reinicia_navegador(navegador: WebDriver, **kwargs) -> WebDriver:
-    navegador.close()
+    # Se o navegador já morreu, não tem o que fechar
+    try:
+        navegador.quit()
+    except WebDriverException:
+        pass
     navegador = navegador_firefox(**kwargs)
     navegador_login(navegador)
     return navegador
@@ -164,6 +498,13 @@ def reinicia_navegador(navegador: WebDriver, **kwargs) -> WebDriver:
 
 
 def clica_consulta_pais(navegador: WebDriver, pais: str) -> None:
+    id_input = IDS_PAISES.get(pais)
+    if id_input is not None and navegador.execute_script(
+        JS_SCRIPTS.clica_pais_por_id(), id_input, pais
+    ):
+        LIMITADOR.espera()
+        return None
+
     localizador_linha_pais = (
         "xpath",
         f"""//tr[(contains(@class, "GridItem") or contains(@class, "GridAlternatingItem")) and normalize-space()="{pais}"]//input""",
@@ -172,7 +513,7 @@ def clica_consulta_pais(navegador: WebDriver, pais: str) -> None:
     try:
         botao = espera_elemento_clicavel(navegador, *localizador_linha_pais)
         navegador.execute_script("arguments[0].click();", botao)
-        tempo_espera_aleatorio()
+        LIMITADOR.espera()
     except TimeoutException:
         LOGGER.warning("clica_consulta_pais: Não achou o país")
 
@@ -184,6 +525,7 @@ def clica_consulta_pais(navegador: WebDriver, pais: str) -> None:
 # -----------------------------------------------------------------------------
 
 
+@METRICAS.cronometra("info_pais")
 def get_info_ultima_consulta_pais(
     navegador: WebDriver, pais: str
 ) -> Optional[Consulta]:
@@ -192,7 +534,65 @@ def get_info_ultima_consulta_pais(
         script=JS_SCRIPTS.get_info_paises()
     )
 
-    return Consulta(COUNTRY=pais, YEAR=year, IMPORTS=imports, NOMENCLATURE=nomenclature)
+    return Consulta(
+        COUNTRY=pais, YEAR=year, IMPORTS=imports, NOMENCLATURE=nomenclature
+    )
+
+
+# -----------------------------------------------------------------------------
+# Retorna as infos mais recentes de TODOS os países de uma só vez
+# -----------------------------------------------------------------------------
+
+
+@METRICAS.cronometra("info_paises")
+def coleta_infos_paises(
+    navegador: WebDriver,
+    paises: Optional[list[str]] = None,
+    timeout_por_pais: float = TIMEOUT_EM_ESPERA,
+) -> list[Consulta]:
+    """Países que não puderam ser lidos ficam de fora da lista retornada"""
+
+    # Garante que a janela de consulta está aberta (e guarda os ids dos países)
+    ids_paises = get_lista_paises(navegador, modo="ids")
+    numero_paises = len(paises) if paises is not None else len(ids_paises)
+
+    navegador.set_script_timeout(
+        max(TIMEOUT_SCRIPTS, numero_paises * timeout_por_pais)
+    )
+    try:
+        resposta = navegador.execute_async_script(
+            JS_SCRIPTS.coleta_infos_todos_paises(),
+            paises,
+            int(timeout_por_pais * 1000),
+        )
+    finally:
+        navegador.set_script_timeout(TIMEOUT_SCRIPTS)
+
+    if "erro" in resposta:
+        raise Exception(f"coleta_infos_paises: 💀 {resposta['erro']}")
+
+    consultas = []
+    for resultado in resposta["resultados"]:
+        if resultado["infos"] is None:
+            LOGGER.warning(
+                f"coleta_infos_paises: Não foi possível ler as infos de '{resultado['pais']}'"
+            )
+            continue
+        year, imports, nomenclature = resultado["infos"]
+        consultas.append(
+            Consulta(
+                COUNTRY=resultado["pais"],
+                YEAR=year,
+                IMPORTS=imports,
+                NOMENCLATURE=nomenclature,
+            )
+        )
+
+    LOGGER.debug(
+        f"coleta_infos_paises: Infos de {len(consultas)}/{numero_paises} países coletadas."
+    )
+
+    return consultas
 
 
 # -----------------------------------------------------------------------------
@@ -233,17 +633,37 @@ def fechando_popup_query(navegador: WebDriver) -> None:
 # -----------------------------------------------------------------------------
 
 
-def em_espera(navegador: WebDriver) -> None:
-    localizador_em_progresso = (
-        "css selector",
-        "html body form#aspnetForm div#ctl00_UpdateProgressObject",
+def em_espera(
+    navegador: WebDriver, timeout: float = TIMEOUT_EM_ESPERA
+) -> float:
+    """Retorna quanto tempo (s) o pop-up ficou na tela. Uma única ida ao
+    WebDriver: quem espera é o MutationObserver dentro da página."""
+
+    seletor_em_progresso = (
+        "html body form#aspnetForm div#ctl00_UpdateProgressObject"
     )
-    web_element_em_progresso = navegador.find_element(*localizador_em_progresso)
 
-    while web_element_em_progresso.get_attribute("aria-hidden") == "false":
-        web_element_em_progresso = navegador.find_element(*localizador_em_progresso)
+    resultado = navegador.execute_async_script(
+        JS_SCRIPTS.espera_processamento(),
+        seletor_em_progresso,
+        int(timeout * 1000),
+    )
+    duracao = resultado["duracaoMs"] / 1000
 
-    return None
+    if resultado["status"] == "timeout":
+        METRICAS_ESPERA.registra(duracao, timeout=True)
+        LIMITADOR.registra(duracao, erro=True)
+        raise TimeoutException(
+            f"em_espera: 💀 'Processing' ainda na tela depois de {timeout} s!"
+        )
+
+    if resultado["status"] == "livre" and duracao > 0:
+        METRICAS_ESPERA.registra(duracao)
+        # O pop-up fica na tela enquanto o servidor responde o postback
+        LIMITADOR.registra(duracao)
+        LOGGER.debug(f"em_espera: 🕙 'Processing' durou {duracao:.2f} s.")
+
+    return duracao
 
 
 # -----------------------------------------------------------------------------
@@ -251,7 +671,32 @@ def em_espera(navegador: WebDriver) -> None:
 # -----------------------------------------------------------------------------
 
 
-def get_lista_paises(navegador: WebDriver) -> list[WebElement]:
+@overload
+def get_lista_paises(
+    navegador: WebDriver, modo: Literal["elementos"] = ...
+) -> list[WebElement]: ...
+
+
+@overload
+def get_lista_paises(
+    navegador: WebDriver, modo: Literal["textos"]
+) -> list[str]: ...
+
+
+@overload
+def get_lista_paises(
+    navegador: WebDriver, modo: Literal["ids"]
+) -> dict[str, str]: ...
+
+
+@METRICAS.cronometra("lista_paises")
+def get_lista_paises(
+    navegador: WebDriver, modo: str = "elementos"
+) -> Union[list[WebElement], list[str], dict[str, str]]:
+    """modo 'elementos': WebElements das linhas (um '.text' = uma ida ao
+    WebDriver por país); 'textos': nomes dos países; 'ids': país -> id do
+    input da linha. Os dois últimos vêm de um único script."""
+
     localizador_tabela_paises = (
         "css selector",
         "#ctl00_qsl_qs_pop_ctl00_dgCountry",
@@ -269,6 +714,16 @@ def get_lista_paises(navegador: WebDriver) -> list[WebElement]:
     em_espera(navegador)
     espera_elemento_visivel(navegador, *localizador_tabela_paises)
 
+    if modo != "elementos":
+        linhas = navegador.execute_script(JS_SCRIPTS.get_lista_paises())
+        ids_paises = {
+            linha["pais"]: linha["id"] for linha in linhas if linha["id"]
+        }
+        IDS_PAISES.update(ids_paises)
+        if modo == "ids":
+            return ids_paises
+        return [linha["pais"] for linha in linhas]
+
     lista_web_element_pais = navegador.find_element(
         *localizador_tabela_paises
     ).find_elements(*localizador_linhas_tabela_paises)
@@ -276,29 +731,104 @@ def get_lista_paises(navegador: WebDriver) -> list[WebElement]:
     return lista_web_element_pais
 
 
+# -----------------------------------------------------------------------------
+# Linha do relatório do país na tabela (nome exato do arquivo, não substring:
+# no pool, 'niger' não pode pegar o relatório de 'nigeria' de outro worker)
+# -----------------------------------------------------------------------------
+
+
+def linha_relatorio_pais(
+    navegador: WebDriver, pais: str
+) -> Optional[WebElement]:
+    nome_arquivo = normaliza_nomes(pais)
+    for linha in navegador.find_elements("css selector", ".table2, .table3"):
+        celulas = [
+            celula.text for celula in linha.find_elements("tag name", "td")
+        ]
+        links = [
+            link.get_attribute("href") or ""
+            for link in linha.find_elements("tag name", "a")
+        ]
+        if relatorio_do_pais(nome_arquivo, celulas, links):
+            return linha
+    return None
+
+
+def botao_relatorio_pais(
+    navegador: WebDriver, pais: str, nome_botao: str
+) -> Optional[WebElement]:
+    linha = linha_relatorio_pais(navegador, pais)
+    if linha is None:
+        return None
+    botoes = linha.find_elements(
+        "xpath", f".//input[contains(@id, '{nome_botao}')]"
+    )
+    return botoes[0] if botoes else None
+
+
 # -----------------------------------------------------------------------------
 # Pega o link de download do relatório <- PRECISA ESTAR NA PÁG RELATÓRIOS
 # -----------------------------------------------------------------------------
 
 
-def clica_botao_refresh(navegador: WebDriver) -> Optional[Callable]:
-    xpath_botao_reload = '//input[@id="ctl00_c_viewFile_dgExportFile_ctl02_bReload"]'
-    localizador_botao_reload = ("xpath", xpath_botao_reload)
+@METRICAS.cronometra(ETAPA_ESPERA_EXPORTACAO)
+def clica_botao_refresh(
+    navegador: WebDriver,
+    pais: Optional[str] = None,
+    t_inicio: Optional[float] = None,
+) -> float:
+    """Recarrega a tabela até o relatório ficar pronto, com intervalos
+    crescentes (backoff) a partir do tempo de exportação esperado do país.
+    Retorna há quanto tempo (s) a exportação começou."""
+
+    # Sem país, olha apenas a primeira linha da tabela (só existe um relatório)
+    localizador_botao_reload = (
+        "xpath",
+        '//input[@id="ctl00_c_viewFile_dgExportFile_ctl02_bReload"]',
+    )
+
+    def botao_reload() -> Optional[WebElement]:
+        if pais is None:
+            botoes = navegador.find_elements(*localizador_botao_reload)
+            return botoes[0] if botoes else None
+        return botao_relatorio_pais(navegador, pais, "bReload")
+
+    t_inicio = time() if t_inicio is None else t_inicio
+    tempo_esperado = MODELO_EXPORTACAO.tempo_esperado(pais)
+    prazo = prazo_exportacao(tempo_esperado)
+    intervalos = intervalos_backoff(tempo_esperado)
+    numero_recargas = 0
+
+    # Se ainda tem o botão de reload, o arquivo não está pronto
+    while botao_reload() is not None:
+        if time() - t_inicio > prazo:
+            raise TimeoutException(
+                f"clica_botao_refresh: 💀 Relatório não ficou pronto em {prazo:.0f} s!"
+            )
 
-    try:
-        sleep(5)
-        _ = espera_elemento_clicavel(navegador, *localizador_botao_reload, 1)
         LOGGER.debug(
             "clica_botao_refresh: 🕙 Arquivo ainda não está pronto para download . . ."
         )
-        clica_botao(navegador, *localizador_botao_reload)
+        sleep(next(intervalos))
+        # A tabela pode ter sido recriada durante a espera <- procura de novo
+        botao = botao_reload()
+        if botao is None:
+            break
+        navegador.execute_script("arguments[0].scrollIntoView();", botao)
+        navegador.execute_script("arguments[0].click();", botao)
         em_espera(navegador)
-        return clica_botao_refresh(navegador)
+        numero_recargas += 1
 
-    except:
-        LOGGER.debug("clica_botao_refresh: ✅Arquivo pronto para download!")
+    duracao = time() - t_inicio
+    LOGGER.debug(
+        f"clica_botao_refresh: ✅Arquivo pronto para download! ({duracao:.1f} s, {numero_recargas} recargas)"
+    )
 
-    return None
+    # Só aprende com as exportações que de fato foram acompanhadas
+    if pais is not None and numero_recargas > 0:
+        MODELO_EXPORTACAO.registra(pais, duracao)
+
+    return duracao
 
 
 # -----------------------------------------------------------------------------
@@ -306,76 +836,76 @@ def clica_botao_refresh(navegador: WebDriver) -> Optional[Callable]:
 # -----------------------------------------------------------------------------
 
 
+@METRICAS.cronometra("link_download")
 def get_link_download_pais(navegador: WebDriver, pais: str) -> str:
 
-    localizador_link_download = (
-        "xpath",
-        f'//*[@id="ctl00_c_viewFile_dgExportFile"]//a[contains(@href, "{normaliza_nomes(pais)}")]',
+    def link_pais(navegador: WebDriver) -> Optional[str]:
+        linha = linha_relatorio_pais(navegador, pais)
+        if linha is None:
+            return None
+        links = [
+            link.get_attribute("href") or ""
+            for link in linha.find_elements("tag name", "a")
+        ]
+        return next((link for link in links if link), None)
+
+    return WebDriverWait(navegador, TIMEOUT_LINK_DOWNLOAD).until(
+        link_pais,
+        f"get_link_download_pais: 💀 [!!! ERRO !!!] Não foi encontrado um link de download do {pais}!",
     )
 
-    elemento_link = espera_presenca_elemento(navegador, *localizador_link_download)
-    link_ = elemento_link.get_attribute("href")
-    assert (
-        link_ is not None
-    ), f"get_link_download_pais: 💀 [!!! ERRO !!!] Não foi encontrado um link de download do {pais}!"
-
-    return link_
-
 
 # -----------------------------------------------------------------------------
 # Faz o download de um arquivo a partir de uma URL para um determinado diretório
 # -----------------------------------------------------------------------------
 
 
-def download_arq(url_download: str, target_directory: str) -> Tuple[bool, str]:
-    SUCESSO = 200
-
-    # Define the image URL and the desired local file path
-    file_name = url_download.split("/")[-1].replace("%20", "_")
+def download_arq(
+    url_download: str,
+    target_directory: str,
+    sessao: Optional[requests.Session] = None,
+    extrator: Optional[ExtratorZipStream] = None,
+) -> Tuple[bool, str]:
+    """Usa a 'sessao' (cookies do navegador + pool de conexões) se houver.
+    O arquivo vai em blocos direto para o disco (ver 'GerenciadorDownloads').
+    Com 'extrator', o zip é extraído enquanto chega"""
 
-    # Create the target directory if it doesn't exist
-    Path(target_directory).mkdir(exist_ok=True, parents=True)
+    path_arquivo = path_download(url_download, target_directory)
 
-    path_arquivo = Path(target_directory) / file_name
+    resultado = GERENCIADOR_DOWNLOADS.baixa(
+        url_download,
+        path_arquivo if extrator is None else extrator,
+        sessao=sessao,
+        timeout=TIMEOUT_DOWNLOAD,
+    )
 
-    try:
-        # Download the image data
-        response = requests.get(url_download)
-
-        # Check if the request was successful (status code 200)
-        if response.status_code == SUCESSO:
-            with open(path_arquivo, "wb") as f:
-                f.write(response.content)
-            LOGGER.debug(f"download_arq: ✅ Arquivo salvo em: {path_arquivo}")
-            return True, str(path_arquivo)
-        else:
-            LOGGER.warning(
-                f"download_arq: ❌ Download do arquivo falhou. Status code: {response.status_code}"
-            )
-            return False, ""
-    except requests.exceptions.Timeout:
-        LOGGER.warning(
-            f"download_arq: 💀 TimeoutError: Download falhou: {url_download}"
-        )
+    if not resultado.sucesso:
+        LOGGER.warning(f"download_arq: 💀 Download falhou: {url_download}")
         return False, ""
 
+    LOGGER.debug(
+        f"download_arq: ✅ '{path_arquivo.name}' baixado ({resultado.bytes_por_segundo / 1e6:.2f} MB/s)"
+    )
+    return True, resultado.path_arquivo
+
+
+def path_download(url_download: str, target_directory: str) -> Path:
+    file_name = url_download.rsplit("/", maxsplit=1)[-1].replace("%20", "_")
+    return Path(target_directory) / file_name
+
 
 # -----------------------------------------------------------------------------
 # Deleta apenas o relatório de UM país <- PRECISA ESTAR NA PÁGINA DE RELATÓRIOS
 # -----------------------------------------------------------------------------
 
 
-def deleta_relatorio_pais(navegador: WebDriver, pais: str) -> Optional[Callable]:
-    localizador_linhas_tabela_paises = ("css selector", ".table2, .table3")
-    elementos_linha = navegador.find_elements(*localizador_linhas_tabela_paises)
-
-    nome_pais_normalizado = normaliza_nomes(pais)
-    f_filter = lambda elemento: nome_pais_normalizado in elemento.text
-    linha_pais = list(filter(f_filter, elementos_linha))
+def deleta_relatorio_pais(
+    navegador: WebDriver, pais: str
+) -> Optional[Callable]:
+    linha_pais = linha_relatorio_pais(navegador, pais)
 
-    if len(linha_pais) > 0:
+    if linha_pais is not None:
         LOGGER.debug("deleta_relatorio_pais: ✅ Relatório encontrado!")
-        linha_pais = linha_pais[0]
     else:
         LOGGER.debug("deleta_relatorio_pais: ❌ Relatório não encontrado!")
         return None
@@ -385,7 +915,9 @@ def deleta_relatorio_pais(navegador: WebDriver, pais: str) -> Optional[Callable]
     try:
         botao_deletar = linha_pais.find_element(*localizador_botao_deletar)
     except NoSuchElementException:
-        LOGGER.warning("deleta_relatorio_pais: 💀 Botão de deletar não encontrado!")
+        LOGGER.warning(
+            "deleta_relatorio_pais: 💀 Botão de deletar não encontrado!"
+        )
         return None
 
     navegador.execute_script("arguments[0].scrollIntoView();", botao_deletar)
@@ -417,7 +949,9 @@ def existe_botao_refresh(navegador: WebDriver) -> bool:
     localizador_linhas_tabela_paises = ("css selector", ".table2, .table3")
     regex = r".*zip.(?!.*Ready).*"
 
-    elementos_linha = navegador.find_elements(*localizador_linhas_tabela_paises)
+    elementos_linha = navegador.find_elements(
+        *localizador_linhas_tabela_paises
+    )
 
     for elemento in elementos_linha:
         if re.match(pattern=regex, string=elemento.text):
@@ -440,6 +974,86 @@ def deleta_todos_relatorios(navegador: WebDriver) -> None:
     return None
 
 
+# -----------------------------------------------------------------------------
+# Deleta de uma vez os relatórios dos países (ou todos) e recarrega a página
+# uma única vez no final <- PRECISA ESTAR NA PÁG RELATÓRIOS
+# -----------------------------------------------------------------------------
+
+
+def deleta_relatorios_em_lote(
+    navegador: WebDriver, paises: Optional[list[str]] = None
+) -> int:
+    """Retorna quantos relatórios foram deletados"""
+
+    nomes = (
+        None if paises is None else [normaliza_nomes(pais) for pais in paises]
+    )
+    resposta = navegador.execute_async_script(
+        JS_SCRIPTS.deleta_relatorios(), nomes, LIMITE_DELECOES_LOTE
+    )
+
+    # A página do navegador ficou com a tabela (e o __VIEWSTATE) de antes
+    if resposta["deletados"] > 0:
+        navegador.get(f"{URL_BASE_TAO}/ExportReport.aspx")
+        em_espera(navegador)
+
+    if "erro" in resposta:
+        raise Exception(
+            f"deleta_relatorios_em_lote: 💀 {resposta['erro']} ({resposta['deletados']} deletados)"
+        )
+
+    LOGGER.debug(
+        f"deleta_relatorios_em_lote: 🗑️ {resposta['deletados']} relatórios deletados."
+    )
+    return resposta["deletados"]
+
+
+# -----------------------------------------------------------------------------
+# Deleta os relatórios dos países (ou todos) <- PRECISA ESTAR NA PÁG RELATÓRIOS
+# -----------------------------------------------------------------------------
+
+
+@METRICAS.cronometra("limpeza_relatorios")
+def limpa_tabela_relatorios(
+    navegador: WebDriver, paises: Optional[list[str]] = None
+) -> None:
+    if paises is None:
+        if not existem_relatorios_na_fila(navegador):
+            return None
+        clica_botao_refresh(navegador)
+
+    try:
+        deleta_relatorios_em_lote(navegador, paises)
+        return None
+    except Exception as e:
+        LOGGER.warning(
+            f"limpa_tabela_relatorios: {e}. Deletando um a um . . ."
+        )
+
+    if paises is None:
+        deleta_todos_relatorios(navegador)
+    else:
+        for pais in paises:
+            deleta_relatorio_pais(navegador, pais)
+    return None
+
+
+# -----------------------------------------------------------------------------
+# Recarrega a tabela de relatórios <- PRECISA ESTAR NA PÁG RELATÓRIOS
+# -----------------------------------------------------------------------------
+
+
+def recarrega_tabela_relatorios(navegador: WebDriver) -> None:
+    localizador_botao_reload = (
+        "xpath",
+        '//*[@id="ctl00_c_viewFile_dgExportFile"]//input[contains(@id, "bReload")]',
+    )
+    if navegador.find_elements(*localizador_botao_reload):
+        clica_botao(navegador, *localizador_botao_reload)
+        em_espera(navegador)
+    return None
+
+
 # -----------------------------------------------------------------------------
 # Gerenciador das consultas <- diz quais foram feitas, ou n, e cria a fila
 # -----------------------------------------------------------------------------
@@ -453,13 +1067,25 @@ def confere_dados_consulta_pais(navegador: WebDriver, pais: str) -> bool:
 
     ultimos_dados_disponiveis = get_info_ultima_consulta_pais(navegador, pais)
 
+    return confere_consulta(ultimos_dados_disponiveis, pais)
+
+
+# -----------------------------------------------------------------------------
+# Decide o que fazer com as infos mais recentes de um país (fila, log de erro)
+# -----------------------------------------------------------------------------
+
+
+def confere_consulta(
+    ultimos_dados_disponiveis: Optional[Consulta], pais: str
+) -> bool:
+
     # -----------------------------------------------------------------------------
     # DEU ERRO! NoSuchElementException
     # -----------------------------------------------------------------------------
 
     if ultimos_dados_disponiveis is None:
         LOGGER.warning(
-            f"confere_dados_consulta_pais: 💀 DEU ERRO! NoSuchElementException para '{pais}'!"
+            f"confere_consulta: 💀 DEU ERRO! NoSuchElementException para '{pais}'!"
         )
         erro_consulta(pais)
 
@@ -467,9 +1093,11 @@ def confere_dados_consulta_pais(navegador: WebDriver, pais: str) -> bool:
     # INSERIR NA LISTA DE CONSULTAS A SEREM FEITAS
     # -----------------------------------------------------------------------------
 
-    elif not consulta_ja_feita(ultimos_dados_disponiveis):
+    elif not consulta_ja_feita(
+        ultimos_dados_disponiveis
+    ) and ASSINATURAS.metadados_mudaram(ultimos_dados_disponiveis):
         LOGGER.debug(
-            f"confere_dados_consulta_pais: ❌ Consulta para '{pais}' não foi feita. Adicionada à fila!"
+            f"confere_consulta: ❌ Consulta para '{pais}' não foi feita. Adicionada à fila!"
         )
         add_na_fila(ultimos_dados_disponiveis)
 
@@ -479,44 +1107,37 @@ def confere_dados_consulta_pais(navegador: WebDriver, pais: str) -> bool:
 
     else:
         LOGGER.debug(
-            f"confere_dados_consulta_pais: ✅ Consulta para '{pais}' já foi feita!"
+            f"confere_consulta: ✅ Consulta para '{pais}' já foi feita!"
         )
 
     return True
 
 
 # -----------------------------------------------------------------------------
-# Fluxo completo para download de uma consulta
+# Seleciona o país e pede a exportação do relatório TL <- PÁG RELATÓRIOS
 # -----------------------------------------------------------------------------
 
 
-def download_consulta(navegador: WebDriver, consulta: Consulta) -> None:
-
-    # -----------------------------------------------------------------------------
-    # 1 Abrindo a página de relatórios
-    # -----------------------------------------------------------------------------
-
-    navegador.get("https://tao.wto.org/ExportReport.aspx")
-
-    # -----------------------------------------------------------------------------
-    # 2 Verificando se existem relatórios na fila. SE SIM -> deleta
-    # -----------------------------------------------------------------------------
-
-    if existem_relatorios_na_fila(navegador):
-        clica_botao_refresh(navegador)
-        deleta_todos_relatorios(navegador)
+@METRICAS.cronometra("exportacao")
+def exporta_relatorio(navegador: WebDriver, consulta: Consulta) -> float:
+    """Retorna o instante (time()) em que a exportação foi pedida"""
 
     # -----------------------------------------------------------------------------
-    # 3 Selecionando o país a ser consultado
+    # 1 Selecionando o país a ser consultado
     # -----------------------------------------------------------------------------
 
     abrindo_popup_query(navegador)
     em_espera(navegador)
 
-    LOGGER.debug(f"download_consulta: Selecionando o país '{consulta.COUNTRY}' . . .")
+    LOGGER.debug(
+        f"exporta_relatorio: Selecionando o país '{consulta.COUNTRY}' . . ."
+    )
 
     # Esperando o elemento ficar visivel
-    localizador_tabela_paises = ("css selector", "#ctl00_qsl_qs_pop_ctl00_dgCountry")
+    localizador_tabela_paises = (
+        "css selector",
+        "#ctl00_qsl_qs_pop_ctl00_dgCountry",
+    )
     _ = espera_elemento_visivel(navegador, *localizador_tabela_paises)
 
     clica_consulta_pais(navegador, consulta.COUNTRY)
@@ -526,34 +1147,36 @@ def download_consulta(navegador: WebDriver, consulta: Consulta) -> None:
     em_espera(navegador)
 
     # -----------------------------------------------------------------------------
-    # 4 Inserindo as informações
+    # 2 Inserindo as informações
     # -----------------------------------------------------------------------------
 
-    tempo_espera_aleatorio()
-    LOGGER.debug("download_consulta: Inserindo informações . . .")
+    LIMITADOR.espera()
+    LOGGER.debug("exporta_relatorio: Inserindo informações . . .")
 
     # Selecionando o tipo de relatório
 
-    LOGGER.debug("download_consulta: (1/4) Escolhendo o tipo de relatório.")
+    LOGGER.debug("exporta_relatorio: (1/4) Escolhendo o tipo de relatório.")
     localizador_dropdown = ("xpath", '//*[@id="ctl00_c_drpReport"]')
     botao_tipo_relatorio_dropdown = espera_elemento_visivel(
         navegador, *localizador_dropdown
     )
     botao_tipo_relatorio_dropdown.click()
 
-    tempo_espera_aleatorio()
+    LIMITADOR.espera()
 
     try:
         localizador_tl = ("xpath", "//option[contains(@value, 'TL')]")
-        botao_tipo_relatorio = espera_elemento_visivel(navegador, *localizador_tl, 1)
+        botao_tipo_relatorio = espera_elemento_visivel(
+            navegador, *localizador_tl, 1
+        )
         botao_tipo_relatorio.click()
         em_espera(navegador)
     except TimeoutException:
-        raise Exception("download_consulta: NÃO EXISTE TL PARA ESTE PAÍS!")
+        raise Exception("exporta_relatorio: NÃO EXISTE TL PARA ESTE PAÍS!")
 
     # Selecionando o formato do relatório
 
-    LOGGER.debug("download_consulta: (2/4) Escolhendo o formato de relatório.")
+    LOGGER.debug("exporta_relatorio: (2/4) Escolhendo o formato de relatório.")
     localizador_dropdown = ("xpath", '//*[@id="ctl00_c_pickFile_ddFormat"]')
     botao_dropdown = espera_elemento_clicavel(navegador, *localizador_dropdown)
     navegador.execute_script("arguments[0].value = 'txt';", botao_dropdown)
@@ -562,8 +1185,11 @@ def download_consulta(navegador: WebDriver, consulta: Consulta) -> None:
 
     # Inserindo o nome do arquivo
 
-    LOGGER.debug("download_consulta: (3/4) Inserindo o nome do arquivo.")
-    localizador_nome_arquivo = ("xpath", '//*[@id="ctl00_c_pickFile_txtFileName"]')
+    LOGGER.debug("exporta_relatorio: (3/4) Inserindo o nome do arquivo.")
+    localizador_nome_arquivo = (
+        "xpath",
+        '//*[@id="ctl00_c_pickFile_txtFileName"]',
+    )
     insere_texto(
         navegador,
         *localizador_nome_arquivo,
@@ -572,65 +1198,373 @@ def download_consulta(navegador: WebDriver, consulta: Consulta) -> None:
 
     # Clicando em exportar
 
-    LOGGER.debug("download_consulta: (4/4) Clicando em exportar relatório")
+    LOGGER.debug("exporta_relatorio: (4/4) Clicando em exportar relatório")
     localizador_export = ("xpath", '//*[@id="ctl00_c_pickFile_btnExport"]')
     clica_botao(navegador, *localizador_export)
+    t_inicio_exportacao = time()
 
     em_espera(navegador)
 
+    return t_inicio_exportacao
+
+
+# -----------------------------------------------------------------------------
+# Baixa, extrai e confere um relatório pronto <- não usa o navegador
+# -----------------------------------------------------------------------------
+
+
+def processa_download(
+    consulta: Consulta, link_download: str, sessao_http: requests.Session
+) -> None:
+
     # -----------------------------------------------------------------------------
-    # 5 Clicando no botão de refresh
+    # 0 O zip exportado é igual ao último que foi baixado? <- só o fim dele
     # -----------------------------------------------------------------------------
 
-    clica_botao_refresh(navegador)
+    if zip_ja_baixado(consulta, link_download, sessao_http):
+        REGISTRO_ETAPAS.marca(consulta, Etapa.VALIDADO)
+        finaliza_consulta(consulta)
+        return None
 
     # -----------------------------------------------------------------------------
-    # 6 Fazendo download
+    # 1 Fazendo download
     # -----------------------------------------------------------------------------
 
-    link_download = get_link_download_pais(navegador, consulta.COUNTRY)
-    download_sucesso, path_arquivo_download = download_arq(
-        url_download=link_download,
-        target_directory=DIR_DOWNLOAD_ARQUIVOS,
+    extrator = ExtratorZipStream(
+        DIR_DESTINO_UNZIP,
+        path_auditoria=(
+            path_download(link_download, DIR_DOWNLOAD_ARQUIVOS)
+            if GUARDA_ZIP_AUDITORIA
+            else None
+        ),
     )
+    with METRICAS.span("download_extracao", consulta.COUNTRY) as span:
+        download_sucesso, _ = download_arq(
+            url_download=link_download,
+            target_directory=DIR_DOWNLOAD_ARQUIVOS,
+            sessao=sessao_http,
+            extrator=extrator,
+        )
+        # Bytes extraídos (os baixados ficam no span 'download')
+        span.bytes = sum(membro.tamanho for membro in extrator.membros)
 
     if not download_sucesso:
         raise Exception(
-            f"download_consulta: '{consulta.COUNTRY}' O DOWNLOAD NÃO FOI BEM-SUCEDIDO!"
+            f"processa_download: '{consulta.COUNTRY}' O DOWNLOAD NÃO FOI BEM-SUCEDIDO!"
         )
 
     # -----------------------------------------------------------------------------
-    # 7 Extraindo o arquivo
+    # 2 Os .txt já foram extraídos durante o download
     # -----------------------------------------------------------------------------
 
-    extrai_arquivo(Path(path_arquivo_download), DIR_DESTINO_UNZIP)
+    REGISTRO_ETAPAS.marca(
+        consulta, Etapa.EXTRAIDO, link_download=link_download
+    )
 
     # -----------------------------------------------------------------------------
-    # 8 Verificando se o conteúdo do arquivo é o mesmo do que foi consultado
+    # 3 Verificando se o conteúdo do arquivo é o mesmo do que foi consultado
+    #   (crc32/tamanhos do zip + cabeçalho e primeiras linhas, sem pandas)
     # -----------------------------------------------------------------------------
 
-    df_arquivo = pd.read_csv(
-        DIR_DESTINO_UNZIP / f"{normaliza_nomes(consulta.COUNTRY)}_DutyDetails_TL.txt",
-        sep="\t",
-        dtype=str,
-    )
-    nome_pais_no_arquivo_unzip = normaliza_nomes(df_arquivo.loc[0, "Reporter"])
-    nome_pais_no_arquivo_zip = extrai_nome_pais(path_arquivo_download)
-
-    if nome_pais_no_arquivo_unzip != nome_pais_no_arquivo_zip:
+    try:
+        with METRICAS.span("validacao", consulta.COUNTRY):
+            valida_download(extrator, extrai_nome_pais(link_download))
+    except ErroValidacao as e:
+        # O relatório exportado está errado <- não adianta retomar dele
+        REGISTRO_ETAPAS.remove(consulta)
         raise Exception(
-            f"download_consulta: '{consulta.COUNTRY}' DADOS DE DOWNLOAD SÃO DIFERENTES DOS DADOS CONSULTADOS!"
+            f"processa_download: '{consulta.COUNTRY}' DADOS DE DOWNLOAD SÃO DIFERENTES DOS DADOS CONSULTADOS! {e}"
         )
 
+    REGISTRO_ETAPAS.marca(consulta, Etapa.VALIDADO)
+    ASSINATURAS.registra(
+        consulta,
+        tamanho_zip=extrator.posicao,
+        crcs={
+            nome: crc for nome, (crc, _) in extrator.diretorio_central.items()
+        },
+        sha256_zip=extrator.sha256.hexdigest(),
+    )
+
     # -----------------------------------------------------------------------------
-    # 9 Colocando na lista de consultas realizadas com sucesso
+    # 4 Colocando na lista de consultas realizadas com sucesso
     # -----------------------------------------------------------------------------
 
+    finaliza_consulta(consulta)
+
+    return None
+
+
+# -----------------------------------------------------------------------------
+# Mesmo tamanho e mesmos crc32 do último zip (e os .txt ainda estão no disco):
+# não baixa, não extrai e não mexe nos arquivos
+# -----------------------------------------------------------------------------
+
+
+def zip_ja_baixado(
+    consulta: Consulta, link_download: str, sessao_http: requests.Session
+) -> bool:
+    anterior = ASSINATURAS.get(consulta.COUNTRY)
+    if anterior is None or not anterior.crcs:
+        return False
+    if not all(
+        (DIR_DESTINO_UNZIP / nome).exists()
+        for nome in anterior.crcs
+        if membro_txt(nome)
+    ):
+        return False
+
+    remoto = diretorio_central_remoto(link_download, sessao_http)
+    if remoto is None or not ASSINATURAS.mesmo_zip(consulta.COUNTRY, *remoto):
+        return False
+
+    # Os metadados podem ter mudado (ex.: YEAR) sem mudar os dados
+    ASSINATURAS.registra(
+        consulta, anterior.tamanho_zip, anterior.crcs, anterior.sha256_zip
+    )
+    LOGGER.info(
+        f"zip_ja_baixado: ⏭️ '{consulta.COUNTRY}' é igual ao último download. Download pulado."
+    )
+    return True
+
+
+# -----------------------------------------------------------------------------
+# Tira a consulta da fila e registra o sucesso <- última etapa
+# -----------------------------------------------------------------------------
+
+
+def finaliza_consulta(consulta: Consulta) -> None:
     remove_da_fila(consulta)
-    LOGGER.info(f"download_consulta: '{consulta.COUNTRY}' removido da fila.")
+    LOGGER.info(f"finaliza_consulta: '{consulta.COUNTRY}' removido da fila.")
     log_consulta_realizada_sucesso(consulta)
     LOGGER.info(
-        f"download_consulta: '{consulta.COUNTRY}' inserido no log de consulta com sucesso."
+        f"finaliza_consulta: '{consulta.COUNTRY}' inserido no log de consulta com sucesso."
     )
+    REGISTRO_ETAPAS.remove(consulta)
+    return None
+
+
+# -----------------------------------------------------------------------------
+# Fluxo completo para download de uma consulta
+# -----------------------------------------------------------------------------
+
+
+@METRICAS.cronometra("consulta_total")
+def download_consulta(
+    navegador: WebDriver,
+    consulta: Consulta,
+    exclusivo: bool = True,
+    sessao_http: Optional[requests.Session] = None,
+) -> None:
+    """Com 'exclusivo=False' (vários navegadores na mesma conta), mexe apenas
+    no relatório do próprio país, sem apagar os relatórios dos outros workers.
+    A 'sessao_http' é reaproveitada entre downloads (ver 'sessao_requests').
+    Se a consulta deu erro antes, continua da última etapa concluída."""
+
+    retomada = REGISTRO_ETAPAS.retomada(consulta)
+    if retomada is not None and retomada.etapa.passou(Etapa.VALIDADO):
+        finaliza_consulta(consulta)
+        return None
+
+    # -----------------------------------------------------------------------------
+    # 1 Abrindo a página de relatórios
+    # -----------------------------------------------------------------------------
+
+    with LIMITADOR.acao():
+        navegador.get(f"{URL_BASE_TAO}/ExportReport.aspx")
+
+    # -----------------------------------------------------------------------------
+    # 2 e 3 Limpando a tabela de relatórios e exportando <- só se o relatório
+    #       não tiver sido exportado numa tentativa anterior
+    # -----------------------------------------------------------------------------
+
+    if retomada is None:
+        limpa_tabela_relatorios(
+            navegador, paises=None if exclusivo else [consulta.COUNTRY]
+        )
+        REGISTRO_ETAPAS.descarta_exportacoes(None if exclusivo else [consulta])
+        t_inicio_exportacao = exporta_relatorio(navegador, consulta)
+        REGISTRO_ETAPAS.marca(
+            consulta, Etapa.EXPORTADO, t_inicio_exportacao=t_inicio_exportacao
+        )
+        retomada = REGISTRO_ETAPAS.get(consulta)
+    assert retomada is not None, "download_consulta: etapa não registrada"
+
+    try:
+        processa_etapas_restantes(navegador, retomada, sessao_http)
+    except Exception:
+        REGISTRO_ETAPAS.falhou(consulta)
+        raise
 
     return None
+
+
+# -----------------------------------------------------------------------------
+# Etapas depois da exportação: espera, link, download, extração e validação
+# -----------------------------------------------------------------------------
+
+
+def processa_etapas_restantes(
+    navegador: WebDriver,
+    retomada: EtapaConsulta,
+    sessao_http: Optional[requests.Session] = None,
+) -> None:
+    consulta = retomada.consulta
+
+    # -----------------------------------------------------------------------------
+    # 4 Clicando no botão de refresh e pegando o link
+    # -----------------------------------------------------------------------------
+
+    link_download = retomada.link_download
+    if not retomada.etapa.passou(Etapa.PRONTO):
+        clica_botao_refresh(
+            navegador, consulta.COUNTRY, t_inicio=retomada.t_inicio_exportacao
+        )
+        link_download = get_link_download_pais(navegador, consulta.COUNTRY)
+        REGISTRO_ETAPAS.marca(
+            consulta, Etapa.PRONTO, link_download=link_download
+        )
+
+    # -----------------------------------------------------------------------------
+    # 5 Fazendo download, extraindo e conferindo
+    # -----------------------------------------------------------------------------
+
+    if sessao_http is None:
+        sessao_http = sessao_requests(navegador)
+    else:
+        atualiza_cookies(sessao_http, navegador)
+
+    processa_download(consulta, link_download, sessao_http)
+
+    return None
+
+
+# -----------------------------------------------------------------------------
+# Pipeline: exporta vários países de uma vez e baixa cada um assim que ficar
+# pronto <- a geração no servidor se sobrepõe ao download/extração local
+# -----------------------------------------------------------------------------
+
+
+def download_consultas_pipeline(
+    navegador: WebDriver,
+    consultas: list[Consulta],
+    sessao_http: Optional[requests.Session] = None,
+    exclusivo: bool = True,
+    numero_downloads_simultaneos: int = 2,
+) -> list[Consulta]:
+    """Retorna as consultas que foram baixadas com sucesso"""
+
+    navegador.get(f"{URL_BASE_TAO}/ExportReport.aspx")
+
+    # -----------------------------------------------------------------------------
+    # 1 Limpando a tabela de relatórios
+    # -----------------------------------------------------------------------------
+
+    limpa_tabela_relatorios(
+        navegador,
+        paises=None
+        if exclusivo
+        else [consulta.COUNTRY for consulta in consultas],
+    )
+    REGISTRO_ETAPAS.descarta_exportacoes(None if exclusivo else consultas)
+
+    # -----------------------------------------------------------------------------
+    # 2 Pedindo todas as exportações, uma atrás da outra
+    # -----------------------------------------------------------------------------
+
+    # nome do arquivo (normalizado) -> (consulta, início da exportação)
+    pendentes: dict[str, Tuple[Consulta, float]] = {}
+    for consulta in consultas:
+        try:
+            t_inicio_exportacao = exporta_relatorio(navegador, consulta)
+            pendentes[normaliza_nomes(consulta.COUNTRY)] = (
+                consulta,
+                t_inicio_exportacao,
+            )
+        except Exception as e:
+            LOGGER.warning(
+                f"download_consultas_pipeline: Erro ao exportar '{consulta.COUNTRY}': {e}"
+            )
+
+    LOGGER.info(
+        f"download_consultas_pipeline: {len(pendentes)}/{len(consultas)} exportações pedidas."
+    )
+
+    if sessao_http is None:
+        sessao_http = sessao_requests(navegador)
+    else:
+        atualiza_cookies(sessao_http, navegador)
+
+    # -----------------------------------------------------------------------------
+    # 3 Acompanhando cada linha da tabela e baixando as que ficarem prontas
+    # -----------------------------------------------------------------------------
+
+    tempos_esperados = [
+        MODELO_EXPORTACAO.tempo_esperado(consulta.COUNTRY)
+        for consulta, _ in pendentes.values()
+    ]
+    tempo_esperado = max(
+        (tempo for tempo in tempos_esperados if tempo is not None),
+        default=None,
+    )
+    prazo = prazo_exportacao(tempo_esperado)
+    intervalos = intervalos_backoff()
+    t_inicio = time()
+
+    sucessos: list[Consulta] = []
+    futuros: dict[Future, Consulta] = {}
+
+    with ThreadPoolExecutor(
+        max_workers=numero_downloads_simultaneos, thread_name_prefix="download"
+    ) as executor:
+        while pendentes:
+            linhas = navegador.execute_script(
+                JS_SCRIPTS.get_status_relatorios()
+            )
+
+            for linha in linhas:
+                nome_arquivo = extrai_nome_pais(linha["link"] or "")
+                if not linha["pronto"] or nome_arquivo not in pendentes:
+                    continue
+
+                consulta, t_inicio_exportacao = pendentes.pop(nome_arquivo)
+                MODELO_EXPORTACAO.registra(
+                    consulta.COUNTRY, time() - t_inicio_exportacao
+                )
+                LOGGER.debug(
+                    f"download_consultas_pipeline: ✅ '{consulta.COUNTRY}' pronto! Baixando . . ."
+                )
+                futuro = executor.submit(
+                    processa_download, consulta, linha["link"], sessao_http
+                )
+                futuros[futuro] = consulta
+
+            if not pendentes:
+                break
+
+            if time() - t_inicio > prazo:
+                LOGGER.warning(
+                    f"download_consultas_pipeline: 💀 {len(pendentes)} relatórios não ficaram prontos em {prazo:.0f} s!"
+                )
+                break
+
+            LOGGER.debug(
+                f"download_consultas_pipeline: 🕙 {len(pendentes)} relatórios ainda não estão prontos . . ."
+            )
+            sleep(next(intervalos))
+            recarrega_tabela_relatorios(navegador)
+
+    for futuro, consulta in futuros.items():
+        try:
+            futuro.result()
+            sucessos.append(consulta)
+        except Exception as e:
+            LOGGER.warning(
+                f"download_consultas_pipeline: Erro consulta para país '{consulta.COUNTRY}': {e}"
+            )
+
+    LOGGER.info(
+        f"download_consultas_pipeline: {len(sucessos)}/{len(consultas)} consultas feitas."
+    )
+
+    return sucessos
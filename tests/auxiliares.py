@@ -0,0 +1,38 @@
+"""Auxiliares compartilhados pelos testes que rodam contra o servidor local
+(tests/servidor_tao.py): consultas dos países dele, conferência dos
+downloads e o marcador dos testes que precisam do Firefox."""
+
+import shutil
+from pathlib import Path
+
+import pytest
+
+from scraping_wto.controle_fluxo import get_fila
+from scraping_wto.schemas import Consulta
+from scraping_wto.utils import get_path_projeto, normaliza_nomes
+from tests.servidor_tao import PAISES
+
+PATH_GECKODRIVER = Path(str(get_path_projeto())) / "bin/geckodriver"
+
+sem_firefox = pytest.mark.skipif(
+    shutil.which("firefox") is None or not PATH_GECKODRIVER.exists(),
+    reason="Firefox/geckodriver não disponíveis",
+)
+
+
+def consulta_pais(pais: str) -> Consulta:
+    year, imports, nomenclature = PAISES[pais]
+    return Consulta(
+        COUNTRY=pais, YEAR=year, IMPORTS=imports, NOMENCLATURE=nomenclature
+    )
+
+
+def confere_downloads(dir_dados: Path, paises: list[str]) -> None:
+    for pais in paises:
+        path_txt = (
+            dir_dados
+            / f"data/bronze/tl/{normaliza_nomes(pais)}_DutyDetails_TL.txt"
+        )
+        assert path_txt.exists(), pais
+    assert get_fila() == []
+    return None
@@ -0,0 +1,166 @@
+import json
+import time
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from scraping_wto import controle_fluxo, website_scraping
+from scraping_wto.assinaturas import RegistroAssinaturas
+from scraping_wto.diario import DiarioCSV
+from scraping_wto.etapas import RegistroEtapas
+from scraping_wto.fila import FilaConsultas
+from scraping_wto.limitador import LIMITADOR
+from scraping_wto.metricas import METRICAS
+from scraping_wto.modelo_exportacao import ModeloTempoExportacao
+from scraping_wto.registro_consultas import RegistroConsultasFeitas
+from tests.cronometro import Cronometro
+from tests.servidor_tao import ServidorTAO
+
+# Resumos dos benchmarks da sessão, mostrados no final do pytest
+RESUMOS_BENCHMARK: dict[str, dict] = {}
+
+# Espera (s) entre duas recargas da tabela de relatórios nos testes
+INTERVALO_RECARGA = 0.05
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    parser.addoption(
+        "--benchmark-json",
+        default=None,
+        help="Salva os tempos dos benchmarks (por etapa e por país) neste JSON",
+    )
+    return None
+
+
+def pytest_terminal_summary(terminalreporter, config: pytest.Config) -> None:
+    if not RESUMOS_BENCHMARK:
+        return None
+
+    terminalreporter.section("benchmark (s)")
+    for teste, resumo in RESUMOS_BENCHMARK.items():
+        terminalreporter.write_line(teste)
+        for etapa, tempos in resumo["etapas"].items():
+            terminalreporter.write_line(
+                f"  {etapa:<28} n={tempos['n']:<4} total={tempos['total']:8.3f}"
+                f"  media={tempos['media']:7.3f}  max={tempos['max']:7.3f}"
+            )
+        for pais, tempos in resumo["paises"].items():
+            detalhe = "  ".join(
+                f"{etapa}={duracao:.3f}" for etapa, duracao in tempos.items()
+            )
+            terminalreporter.write_line(f"  [{pais}] {detalhe}")
+        for nome, valor in resumo["anotacoes"].items():
+            terminalreporter.write_line(f"  {nome:<28} {valor:.3f}")
+
+    path_json = config.getoption("--benchmark-json")
+    if path_json is not None:
+        Path(path_json).parent.mkdir(exist_ok=True, parents=True)
+        with open(path_json, "w", encoding="utf-8") as json_f:
+            json.dump(RESUMOS_BENCHMARK, json_f, indent=2)
+    return None
+
+
+@pytest.fixture(autouse=True)
+def limitador_livre(monkeypatch: pytest.MonkeyPatch) -> None:
+    """O servidor dos testes é local <- o limitador não segura ninguém"""
+
+    monkeypatch.setattr(LIMITADOR, "taxa_maxima", 1e6)
+    monkeypatch.setattr(LIMITADOR, "taxa", 1e6)
+    monkeypatch.setattr(LIMITADOR, "capacidade", 1e6)
+    return None
+
+
+@pytest.fixture(autouse=True)
+def metricas_temporarias(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    """Os spans dos testes não vão para o 'log/' do projeto"""
+
+    monkeypatch.setattr(METRICAS, "path_jsonl", tmp_path / "metricas.jsonl")
+    monkeypatch.setattr(
+        METRICAS, "path_prometheus", tmp_path / "scraping_wto.prom"
+    )
+    # Sem intervalo <- os testes leem o textfile logo depois de cada span
+    monkeypatch.setattr(METRICAS, "intervalo_prometheus", 0.0)
+    return None
+
+
+@pytest.fixture
+def selenium_sem_espera(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Sem pop-up 'Processing' para esperar (WebDriver falso) e com recargas
+    rápidas da tabela de relatórios"""
+
+    monkeypatch.setattr(website_scraping, "em_espera", lambda navegador: 0.0)
+    monkeypatch.setattr(
+        website_scraping, "sleep", lambda _: time.sleep(INTERVALO_RECARGA)
+    )
+    return None
+
+
+@pytest.fixture
+def servidor_tao() -> Iterator[ServidorTAO]:
+    with ServidorTAO() as servidor:
+        yield servidor
+
+
+@pytest.fixture
+def dir_dados(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Redireciona downloads, logs e fila para um diretório temporário"""
+
+    monkeypatch.setattr(
+        website_scraping,
+        "DIR_DOWNLOAD_ARQUIVOS",
+        str(tmp_path / "data/bronze/tl/zip"),
+    )
+    monkeypatch.setattr(
+        website_scraping, "DIR_DESTINO_UNZIP", tmp_path / "data/bronze/tl"
+    )
+    modelo_exportacao = ModeloTempoExportacao(
+        tmp_path / "log/tempos_exportacao.json"
+    )
+    monkeypatch.setattr(
+        website_scraping, "MODELO_EXPORTACAO", modelo_exportacao
+    )
+    registro_etapas = RegistroEtapas(tmp_path / "log/etapas_consultas.json")
+    monkeypatch.setattr(website_scraping, "REGISTRO_ETAPAS", registro_etapas)
+    monkeypatch.setattr(
+        website_scraping,
+        "ASSINATURAS",
+        RegistroAssinaturas(tmp_path / "log/assinaturas_consultas.json"),
+    )
+    # Sem write-behind <- os testes leem o CSV logo depois do registro
+    monkeypatch.setattr(
+        controle_fluxo,
+        "REGISTRO_CONSULTAS",
+        RegistroConsultasFeitas(
+            tmp_path / "log/consultas_feitas.csv", atraso_escrita=0
+        ),
+    )
+    monkeypatch.setattr(
+        controle_fluxo,
+        "DIARIO_ERROS",
+        DiarioCSV(
+            tmp_path / "log/consultas_erros.csv", ["COUNTRY", "DATA_CONSULTA"]
+        ),
+    )
+    monkeypatch.setattr(
+        controle_fluxo,
+        "PATH_CONSULTAS_A_SEREM_FEITAS",
+        tmp_path / "temp/consultas_a_fazer.pkl",
+    )
+    monkeypatch.setattr(
+        controle_fluxo,
+        "FILA",
+        FilaConsultas(tmp_path / "temp/consultas_a_fazer.sqlite3"),
+    )
+    return tmp_path
+
+
+@pytest.fixture
+def cronometro(
+    request: pytest.FixtureRequest, monkeypatch: pytest.MonkeyPatch
+) -> Iterator[Cronometro]:
+    cronometro = Cronometro(monkeypatch)
+    yield cronometro
+    RESUMOS_BENCHMARK[request.node.nodeid] = cronometro.resumo()
@@ -0,0 +1,120 @@
+"""Mede quanto tempo cada etapa do scraper leva, por país.
+
+As funções são embrulhadas via monkeypatch, sem mudar o código medido.
+"""
+
+import functools
+import inspect
+from collections import defaultdict
+from dataclasses import dataclass
+from time import perf_counter
+from typing import Any, Callable, Optional
+
+import pytest
+
+from scraping_wto.schemas import Consulta
+
+
+@dataclass
+class Medicao:
+    etapa: str
+    pais: Optional[str]
+    duracao: float
+    erro: bool = False
+
+
+def pais_dos_argumentos(
+    funcao: Callable, args: tuple, kwargs: dict
+) -> Optional[str]:
+    try:
+        argumentos = (
+            inspect.signature(funcao).bind_partial(*args, **kwargs).arguments
+        )
+    except TypeError:
+        return None
+    consulta = argumentos.get("consulta")
+    if isinstance(consulta, Consulta):
+        return consulta.COUNTRY
+    pais = argumentos.get("pais")
+    return pais if isinstance(pais, str) else None
+
+
+class Cronometro:
+    def __init__(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        self.monkeypatch = monkeypatch
+        self.medicoes: list[Medicao] = []
+        # Outras medidas do teste (ex.: memória), mostradas junto com os tempos
+        self.anotacoes: dict[str, float] = {}
+        return None
+
+    def instrumenta(
+        self, alvo: Any, nome: str, etapa: Optional[str] = None
+    ) -> None:
+        # Métodos são medidos na classe <- a assinatura inclui o 'self'
+        funcao = getattr(alvo, nome)
+        etapa = nome if etapa is None else etapa
+
+        @functools.wraps(funcao)
+        def medida(*args, **kwargs):
+            pais = pais_dos_argumentos(funcao, args, kwargs)
+            t_inicio = perf_counter()
+            try:
+                resultado = funcao(*args, **kwargs)
+            except Exception:
+                self.medicoes.append(
+                    Medicao(etapa, pais, perf_counter() - t_inicio, True)
+                )
+                raise
+            self.medicoes.append(
+                Medicao(etapa, pais, perf_counter() - t_inicio)
+            )
+            return resultado
+
+        self.monkeypatch.setattr(alvo, nome, medida)
+        return None
+
+    def mede(self, etapa: str, funcao: Callable, *args, **kwargs) -> Any:
+        t_inicio = perf_counter()
+        try:
+            return funcao(*args, **kwargs)
+        finally:
+            self.medicoes.append(
+                Medicao(
+                    etapa,
+                    pais_dos_argumentos(funcao, args, kwargs),
+                    perf_counter() - t_inicio,
+                )
+            )
+
+    def anota(self, nome: str, valor: float) -> None:
+        self.anotacoes[nome] = valor
+        return None
+
+    def resumo(self) -> dict:
+        etapas: dict[str, list[float]] = defaultdict(list)
+        paises: dict[str, dict[str, float]] = defaultdict(
+            lambda: defaultdict(float)
+        )
+        erros = 0
+        for medicao in self.medicoes:
+            etapas[medicao.etapa].append(medicao.duracao)
+            if medicao.pais is not None:
+                paises[medicao.pais][medicao.etapa] += medicao.duracao
+            erros += medicao.erro
+
+        return {
+            "etapas": {
+                etapa: {
+                    "n": len(duracoes),
+                    "total": sum(duracoes),
+                    "media": sum(duracoes) / len(duracoes),
+                    "max": max(duracoes),
+                }
+                for etapa, duracoes in etapas.items()
+            },
+            "paises": {
+                pais: dict(tempos) for pais, tempos in sorted(paises.items())
+            },
+            "erros": erros,
+            "anotacoes": dict(self.anotacoes),
+        }
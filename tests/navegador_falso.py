@@ -0,0 +1,117 @@
+"""WebDriver falso para os testes: a página de relatórios de um 'ClienteTAO'
+(tests/servidor_tao.py) vista como elementos do Selenium. Só o que as
+funções da tabela de relatórios usam."""
+
+import re
+from types import SimpleNamespace
+from typing import Optional
+
+from selenium.common import NoSuchElementException
+
+from scraping_wto.cliente_http import ClienteTAO
+from scraping_wto.website_scraping import JS_SCRIPTS
+
+REGEX_ID_INPUT = re.compile(r"contains\(@id, ['\"](\w+)['\"]\)")
+REGEX_ID_EXATO = re.compile(r"@id=['\"](\w+)['\"]")
+
+
+class ElementoFalso:
+    def __init__(
+        self, atributos: dict, texto: str = "", filhos: Optional[dict] = None
+    ) -> None:
+        self.atributos = atributos
+        self.text = texto
+        self.filhos = {} if filhos is None else filhos
+        return None
+
+    def get_attribute(self, nome: str) -> Optional[str]:
+        return self.atributos.get(nome)
+
+    def find_elements(self, por: str, valor: str) -> list["ElementoFalso"]:
+        if por == "tag name":
+            return self.filhos.get(valor, [])
+        id_input = REGEX_ID_INPUT.search(valor)
+        assert id_input is not None, valor
+        return [
+            elemento
+            for elemento in self.filhos.get("input", [])
+            if id_input.group(1) in elemento.atributos.get("id", "")
+        ]
+
+    def find_element(self, por: str, valor: str) -> "ElementoFalso":
+        elementos = self.find_elements(por, valor)
+        if not elementos:
+            raise NoSuchElementException(valor)
+        return elementos[0]
+
+
+class NavegadorFalso:
+    def __init__(self, cliente: ClienteTAO) -> None:
+        self.cliente = cliente
+        self.switch_to = SimpleNamespace(
+            alert=SimpleNamespace(accept=lambda: None)
+        )
+        return None
+
+    def get(self, url: str) -> None:
+        self.cliente.get(url.rsplit("/", 1)[-1])
+        return None
+
+    def get_cookies(self) -> list[dict]:
+        # Como o WebDriver devolve: uma lista de dicts
+        return [
+            {
+                "name": cookie.name,
+                "value": cookie.value,
+                "domain": cookie.domain,
+                "path": cookie.path,
+                "httpOnly": True,
+                "secure": cookie.secure,
+            }
+            for cookie in self.cliente.sessao.cookies
+        ]
+
+    def find_elements(self, por: str, valor: str) -> list[ElementoFalso]:
+        if valor == ".table2, .table3":
+            return [
+                ElementoFalso(
+                    linha,
+                    linha["texto"],
+                    {
+                        "td": [
+                            ElementoFalso({}, celula)
+                            for celula in linha["celulas"]
+                        ],
+                        "a": [
+                            ElementoFalso({"href": link})
+                            for link in linha["links"]
+                        ],
+                        "input": [
+                            ElementoFalso(botao) for botao in linha["inputs"]
+                        ],
+                    },
+                )
+                for linha in self.cliente.linhas_relatorios()
+            ]
+        id_exato = REGEX_ID_EXATO.search(valor)
+        assert id_exato is not None, valor
+        assert self.cliente.pagina is not None
+        elemento = self.cliente.pagina.elementos.get(id_exato.group(1))
+        return [] if elemento is None else [ElementoFalso(elemento)]
+
+    def execute_script(self, script: str, *args):
+        if script == JS_SCRIPTS.get_status_relatorios():
+            return [
+                {
+                    "texto": linha["texto"],
+                    "link": linha["links"][0] if linha["links"] else None,
+                    "pronto": bool(linha["links"])
+                    and ClienteTAO._botao_linha(linha, "bReload") is None,
+                }
+                for linha in self.cliente.linhas_relatorios()
+            ]
+        if script == "return navigator.userAgent;":
+            return self.cliente.sessao.headers.get("User-Agent")
+        if "click" in script:
+            self.cliente.clica(args[0].atributos)
+        return None
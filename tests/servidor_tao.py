@@ -0,0 +1,603 @@
+"""Servidor local que imita as páginas do TAO (WebForms) usadas pelo scraper.
+
+O HTML segue o que foi gravado do site: mesmos ids, nomes dos campos,
+__VIEWSTATE/__EVENTVALIDATION e postbacks via __doPostBack.
+"""
+
+import io
+import secrets
+import threading
+import zipfile
+from collections import Counter
+from dataclasses import dataclass, field
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import sleep, time
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+USUARIO = "usuario_teste"
+SENHA = "senha_teste"
+
+PAISES = {
+    "Brazil": ("2022", "2021", "HS17"),
+    "Niger": ("2020", "2019", "HS12"),
+    "Nigeria": ("2021", "2021", "HS17"),
+    "Viet Nam": ("2023", "2022", "HS22"),
+}
+
+PREFIXO_PAIS = "ctl00$qsl$qs_pop$ctl00$dgCountry"
+NOME_BOTAO_CONTINUAR = "ctl00$qsl$qs_pop$ctl00$bContinue"
+NOME_DROPDOWN_RELATORIO = "ctl00$c$drpReport"
+NOME_BOTAO_EXPORTAR = "ctl00$c$pickFile$btnExport"
+PREFIXO_RELATORIOS = "ctl00$c$viewFile$dgExportFile"
+
+RELATORIOS_ZIP = ("DutyDetails", "TariffDetails", "TradeDetails")
+
+TAMANHO_BLOCO_DOWNLOAD = 16 * 1024
+
+# Imagem, fonte e CSS das páginas <- nada disso é usado pelo scraper
+TAMANHO_ESTATICO = 256 * 1024
+ESTATICOS = {
+    "estatico/tao.css": (
+        "text/css",
+        b"@font-face { font-family: TAO; src: url(tao.woff); } body { font-family: TAO, sans-serif; }",
+    ),
+    "estatico/logo.png": (
+        "image/png",
+        b"\x89PNG\r\n\x1a\n" + bytes(TAMANHO_ESTATICO),
+    ),
+    "estatico/tao.woff": ("font/woff", b"wOFF" + bytes(TAMANHO_ESTATICO)),
+}
+
+
+@dataclass
+class ConfigServidor:
+    tempo_exportacao: float = 0.2
+    # Tempo de exportação específico de alguns países
+    tempos_exportacao_pais: dict = field(default_factory=dict)
+    numero_linhas_arquivo: int = 100
+    paises: dict = field(default_factory=lambda: dict(PAISES))
+    # Latências (s) simuladas antes de cada resposta
+    latencia_pagina: float = 0.0
+    latencia_postback: float = 0.0
+    latencia_download: float = 0.0
+    latencia_estatico: float = 0.0
+    # Banda (bytes/s) dos downloads <- None = sem limite
+    banda_download: Optional[float] = None
+    # Quantos downloads têm a conexão cortada no meio (para testar retomada)
+    downloads_cortados: int = 0
+    # Relatórios exportados são da conta (como no site), não da sessão <- os
+    # workers logados na mesma conta veem a mesma tabela
+    relatorios_da_conta: bool = False
+    # Países sem o relatório TL (a exportação falha, como no site)
+    paises_sem_tl: set = field(default_factory=set)
+
+
+@dataclass
+class Exportacao:
+    arquivo: str
+    pais: str
+    pronto_em: float
+    conteudo: Optional[bytes] = None
+
+
+@dataclass
+class EstadoSessao:
+    viewstate: str = ""
+    popup_aberto: bool = False
+    pais_popup: Optional[str] = None
+    pais_query: Optional[str] = None
+    relatorio: str = ""
+    exportacoes: list = field(default_factory=list)
+
+
+# -----------------------------------------------------------------------------
+# HTML
+# -----------------------------------------------------------------------------
+
+SCRIPT_POSTBACK = """<script type="text/javascript">
+var theForm = document.forms['aspnetForm'];
+function __doPostBack(eventTarget, eventArgument) {
+    if (!theForm.onsubmit || (theForm.onsubmit() != false)) {
+        theForm.__EVENTTARGET.value = eventTarget;
+        theForm.__EVENTARGUMENT.value = eventArgument;
+        theForm.submit();
+    }
+}
+</script>"""
+
+
+def html_pagina(acao: str, estado: EstadoSessao, conteudo: str) -> str:
+    return f"""<html><head><title>TAO</title>
+<link rel="stylesheet" type="text/css" href="/estatico/tao.css" /></head><body>
+<img id="logo" src="/estatico/logo.png" alt="WTO" />
+<form name="aspnetForm" method="post" action="./{acao}" id="aspnetForm">
+<input type="hidden" name="__EVENTTARGET" id="__EVENTTARGET" value="" />
+<input type="hidden" name="__EVENTARGUMENT" id="__EVENTARGUMENT" value="" />
+<input type="hidden" name="__VIEWSTATE" id="__VIEWSTATE" value="{estado.viewstate}" />
+<input type="hidden" name="__EVENTVALIDATION" id="__EVENTVALIDATION" value="ev{estado.viewstate}" />
+{SCRIPT_POSTBACK}
+<div id="ctl00_UpdateProgressObject" aria-hidden="true" style="display:none;">Processing...</div>
+{conteudo}
+</form></body></html>"""
+
+
+def html_login() -> str:
+    return """<table>
+<tr><td><input name="ctl00$c$ctrLogin$UserName" type="text" id="ctl00_c_ctrLogin_UserName" /></td></tr>
+<tr><td><input name="ctl00$c$ctrLogin$Password" type="password" id="ctl00_c_ctrLogin_Password" /></td></tr>
+<tr><td><input id="ctl00_c_ctrLogin_RememberMe" type="checkbox" name="ctl00$c$ctrLogin$RememberMe" /></td></tr>
+<tr><td><input type="submit" name="ctl00$c$ctrLogin$LoginButton" value="Log In" id="ctl00_c_ctrLogin_LoginButton" /></td></tr>
+</table>"""
+
+
+def postback_radio(nome: str) -> str:
+    return f"javascript:setTimeout('__doPostBack(\\'{nome}\\',\\'\\')', 0)"
+
+
+def html_popup(config: ConfigServidor, estado: EstadoSessao) -> str:
+    linhas_paises = []
+    for n, pais in enumerate(config.paises, 2):
+        nome = f"{PREFIXO_PAIS}$ctl{n:02d}$rbSelect"
+        marcado = ' checked="checked"' if pais == estado.pais_popup else ""
+        classe = "GridItem" if n % 2 == 0 else "GridAlternatingItem"
+        linhas_paises.append(
+            f'<tr class="{classe}"><td><input id="{nome.replace("$", "_")}" type="radio" '
+            f'name="{nome}" value="rbSelect"{marcado} onclick="{postback_radio(nome)}" /></td>'
+            f"<td>{pais}</td></tr>"
+        )
+
+    linhas_anos = ""
+    if estado.pais_popup is not None:
+        year, imports, nomenclature = config.paises[estado.pais_popup]
+        linhas_anos = (
+            f'<tr class="GridItem"><td><input type="radio" name="ano" value="0" /></td>'
+            f"<td>{year}</td><td>{imports}</td><td>{nomenclature}</td></tr>"
+            f'<tr class="GridAlternatingItem"><td><input type="radio" name="ano" value="1" /></td>'
+            f"<td>{int(year) - 1}</td><td>{imports}</td><td>{nomenclature}</td></tr>"
+        )
+
+    return f"""<div id="ctl00_qsl_qs_pop">
+<table id="ctl00_qsl_qs_pop_ctl00_dgCountry">
+<tr class="GridHeader"><td></td><td>Country</td></tr>
+{"".join(linhas_paises)}
+</table>
+<table id="ctl00_qsl_qs_pop_ctl00_dgYear">
+<tr class="GridHeader"><td></td><td>Year</td><td>Imports</td><td>Nomenclature</td></tr>
+{linhas_anos}
+</table>
+<input type="submit" name="{NOME_BOTAO_CONTINUAR}" value="Continue" id="ctl00_qsl_qs_pop_ctl00_bContinue" />
+</div>"""
+
+
+def html_relatorios(estado: EstadoSessao) -> str:
+    linhas = []
+    for n, exportacao in enumerate(estado.exportacoes, 2):
+        prefixo = f"{PREFIXO_RELATORIOS}$ctl{n:02d}"
+        id_prefixo = prefixo.replace("$", "_")
+        classe = "table2" if n % 2 == 0 else "table3"
+        botao_deletar = (
+            f'<input type="submit" name="{prefixo}$bDelete" value="Delete" '
+            f'id="{id_prefixo}_bDelete" onclick="return confirm(\'Delete this file?\');" />'
+        )
+        if time() >= exportacao.pronto_em:
+            linhas.append(
+                f'<tr class="{classe}"><td><a href="Download/{exportacao.arquivo}">{exportacao.arquivo}</a></td>'
+                f"<td>Ready</td><td></td><td>{botao_deletar}</td></tr>"
+            )
+        else:
+            linhas.append(
+                f'<tr class="{classe}"><td>{exportacao.arquivo}</td><td>Processing</td>'
+                f'<td><input type="image" name="{prefixo}$bReload" id="{id_prefixo}_bReload" src="reload.gif" /></td>'
+                f"<td>{botao_deletar}</td></tr>"
+            )
+
+    return f"""<table id="ctl00_c_viewFile_dgExportFile">
+<tr class="table1"><td>File</td><td>Status</td><td></td><td></td></tr>
+{"".join(linhas)}
+</table>"""
+
+
+def html_exportacao(config: ConfigServidor, estado: EstadoSessao) -> str:
+    if estado.pais_query is None:
+        return ""
+
+    selecionado = ' selected="selected"' if estado.relatorio == "TL" else ""
+    opcao_tl = (
+        ""
+        if estado.pais_query in config.paises_sem_tl
+        else f'\n<option value="TL"{selecionado}>Tariff line duties</option>'
+    )
+    html = f"""<span id="ctl00_c_lblQuery">{estado.pais_query}</span>
+<select name="{NOME_DROPDOWN_RELATORIO}" id="ctl00_c_drpReport" onchange="{postback_radio(NOME_DROPDOWN_RELATORIO)}">
+<option value="">-- Select a report --</option>{opcao_tl}
+</select>"""
+
+    if estado.relatorio == "TL":
+        html += f"""
+<select name="ctl00$c$pickFile$ddFormat" id="ctl00_c_pickFile_ddFormat">
+<option value="xls">Excel</option>
+<option value="txt">Text</option>
+</select>
+<input name="ctl00$c$pickFile$txtFileName" type="text" id="ctl00_c_pickFile_txtFileName" />
+<input type="submit" name="{NOME_BOTAO_EXPORTAR}" value="Export" id="ctl00_c_pickFile_btnExport" />"""
+
+    return html
+
+
+def conteudo_zip(pais: str, arquivo: str, numero_linhas: int) -> bytes:
+    nome = arquivo.split("_TL", maxsplit=1)[0]
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(
+        buffer, "w", compression=zipfile.ZIP_DEFLATED
+    ) as zip_f:
+        for relatorio in RELATORIOS_ZIP:
+            linhas = ["Reporter\tYear\tProduct\tValue"]
+            linhas += [
+                f"{pais}\t2022\t{produto:08d}\t{produto % 37}.5"
+                for produto in range(numero_linhas)
+            ]
+            zip_f.writestr(
+                f"{nome}_{relatorio}_TL.txt", "\n".join(linhas) + "\n"
+            )
+    return buffer.getvalue()
+
+
+# -----------------------------------------------------------------------------
+# Servidor
+# -----------------------------------------------------------------------------
+
+
+class ServidorTAO:
+    def __init__(self, config: Optional[ConfigServidor] = None) -> None:
+        self.config = ConfigServidor() if config is None else config
+        self.sessoes: dict[str, EstadoSessao] = {}
+        self.exportacoes_conta: list[Exportacao] = []
+        self.lock = threading.Lock()
+        self.numero_requisicoes = 0
+        self.numero_downloads_cortados = 0
+        self.estaticos_servidos: Counter = Counter()
+        self.numero_downloads_retomados = 0
+        self.numero_caudas = 0
+        self.numero_downloads_completos = 0
+        self._http = ThreadingHTTPServer(
+            ("127.0.0.1", 0), self._cria_handler()
+        )
+        self._thread = threading.Thread(
+            target=self._http.serve_forever, daemon=True
+        )
+        return None
+
+    @property
+    def url(self) -> str:
+        host, porta = self._http.server_address[:2]
+        return f"http://{host}:{porta}"
+
+    def __enter__(self) -> "ServidorTAO":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self._http.shutdown()
+        self._http.server_close()
+        return None
+
+    def _cria_handler(self) -> type:
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args) -> None:  # noqa: PLR6301
+                return None
+
+            def do_GET(self) -> None:
+                pagina = urlparse(self.path).path.lstrip("/").lower()
+                if pagina in ESTATICOS:
+                    servidor.trata_estatico(self, pagina)
+                else:
+                    servidor.trata(self, "GET", {})
+
+            def do_POST(self) -> None:
+                tamanho = int(self.headers.get("Content-Length", 0))
+                corpo = self.rfile.read(tamanho).decode("utf-8")
+                formulario = {
+                    chave: valores[0]
+                    for chave, valores in parse_qs(
+                        corpo, keep_blank_values=True
+                    ).items()
+                }
+                servidor.trata(self, "POST", formulario)
+
+        return Handler
+
+    # -------------------------------------------------------------------------
+    # Respostas
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def _responde(
+        handler: BaseHTTPRequestHandler,
+        status: int,
+        corpo: bytes = b"",
+        tipo: str = "text/html; charset=utf-8",
+        cabecalhos: Optional[dict] = None,
+    ) -> None:
+        handler.send_response(status)
+        handler.send_header("Content-Type", tipo)
+        handler.send_header("Content-Length", str(len(corpo)))
+        for chave, valor in (cabecalhos or {}).items():
+            handler.send_header(chave, valor)
+        handler.end_headers()
+        handler.wfile.write(corpo)
+        return None
+
+    def _redireciona(
+        self,
+        handler: BaseHTTPRequestHandler,
+        destino: str,
+        cabecalhos: Optional[dict] = None,
+    ) -> None:
+        self._responde(
+            handler,
+            302,
+            cabecalhos={"Location": destino, **(cabecalhos or {})},
+        )
+        return None
+
+    def _renderiza(
+        self,
+        handler: BaseHTTPRequestHandler,
+        acao: str,
+        estado: EstadoSessao,
+        conteudo: str,
+    ) -> None:
+        estado.viewstate = secrets.token_hex(16)
+        corpo = html_pagina(acao, estado, conteudo).encode("utf-8")
+        self._responde(handler, 200, corpo)
+        return None
+
+    def _estado(
+        self, handler: BaseHTTPRequestHandler
+    ) -> Optional[EstadoSessao]:
+        cookies = SimpleCookie(handler.headers.get("Cookie", ""))
+        if ".ASPXAUTH" not in cookies:
+            return None
+        return self.sessoes.get(cookies[".ASPXAUTH"].value)
+
+    # -------------------------------------------------------------------------
+    # Roteamento
+    # -------------------------------------------------------------------------
+
+    def _latencia(self, pagina: str, metodo: str) -> float:
+        if pagina.startswith("download/"):
+            return self.config.latencia_download
+        if metodo == "POST":
+            return self.config.latencia_postback
+        return self.config.latencia_pagina
+
+    def trata(
+        self, handler: BaseHTTPRequestHandler, metodo: str, formulario: dict
+    ) -> None:
+        caminho = urlparse(handler.path).path.lstrip("/")
+        pagina = caminho.lower()
+
+        # A espera fica fora do lock <- requisições simultâneas não se somam
+        sleep(self._latencia(pagina, metodo))
+
+        if pagina.startswith("download/"):
+            return self._trata_download(handler, caminho)
+
+        with self.lock:
+            self.numero_requisicoes += 1
+
+            if pagina == "welcome.aspx":
+                return self._trata_login(handler, metodo, formulario)
+
+            estado = self._estado(handler)
+            if estado is None:
+                return self._redireciona(
+                    handler, f"/welcome.aspx?ReturnUrl=%2f{caminho}"
+                )
+
+            if pagina not in {"default.aspx", "exportreport.aspx"}:
+                return self._responde(handler, 404, b"Not found")
+
+            if metodo == "POST":
+                if formulario.get("__VIEWSTATE") != estado.viewstate:
+                    return self._responde(handler, 500, b"Invalid viewstate")
+                self._trata_postback(estado, formulario)
+            else:
+                estado.popup_aberto = False
+
+            conteudo = (
+                '<a id="ctl00_qsl_lbChangeQuery" '
+                "href=\"javascript:__doPostBack('ctl00$qsl$lbChangeQuery','')\">Change query</a>"
+            )
+            if estado.popup_aberto:
+                conteudo += html_popup(self.config, estado)
+            if pagina == "exportreport.aspx":
+                conteudo += html_exportacao(
+                    self.config, estado
+                ) + html_relatorios(estado)
+
+            acao = (
+                "ExportReport.aspx"
+                if pagina == "exportreport.aspx"
+                else "default.aspx"
+            )
+            return self._renderiza(handler, acao, estado, conteudo)
+
+    def trata_estatico(
+        self, handler: BaseHTTPRequestHandler, pagina: str
+    ) -> None:
+        # Sem login e sem lock <- como o CDN/IIS serviria os arquivos
+        sleep(self.config.latencia_estatico)
+        with self.lock:
+            self.estaticos_servidos[pagina] += 1
+        tipo, corpo = ESTATICOS[pagina]
+        self._responde(handler, 200, corpo, tipo)
+        return None
+
+    def _trata_login(
+        self, handler: BaseHTTPRequestHandler, metodo: str, formulario: dict
+    ) -> None:
+        estado_login = EstadoSessao()
+        if (
+            metodo == "POST"
+            and "ctl00$c$ctrLogin$LoginButton" in formulario
+            and formulario.get("ctl00$c$ctrLogin$UserName") == USUARIO
+            and formulario.get("ctl00$c$ctrLogin$Password") == SENHA
+        ):
+            token = secrets.token_hex(16)
+            self.sessoes[token] = (
+                EstadoSessao(exportacoes=self.exportacoes_conta)
+                if self.config.relatorios_da_conta
+                else EstadoSessao()
+            )
+            # "Lembre-se de mim" <- cookie persistente, sobrevive ao navegador
+            validade = (
+                "; Max-Age=86400"
+                if "ctl00$c$ctrLogin$RememberMe" in formulario
+                else ""
+            )
+            return self._redireciona(
+                handler,
+                "/default.aspx",
+                cabecalhos={
+                    "Set-Cookie": f".ASPXAUTH={token}; Path=/; HttpOnly{validade}"
+                },
+            )
+        return self._renderiza(
+            handler, "welcome.aspx", estado_login, html_login()
+        )
+
+    def _trata_postback(self, estado: EstadoSessao, formulario: dict) -> None:
+        alvo = formulario.get("__EVENTTARGET", "")
+        botoes = {
+            chave.removesuffix(".x")
+            for chave in formulario
+            if not chave.endswith(".y")
+        }
+
+        if alvo == "ctl00$qsl$lbChangeQuery":
+            estado.popup_aberto = True
+            estado.pais_popup = None
+
+        elif alvo.startswith(PREFIXO_PAIS):
+            n = int(alvo.split("$ctl")[-1].split("$")[0])
+            estado.popup_aberto = True
+            estado.pais_popup = list(self.config.paises)[n - 2]
+
+        elif NOME_BOTAO_CONTINUAR in botoes:
+            estado.popup_aberto = False
+            estado.pais_query = estado.pais_popup
+            estado.relatorio = ""
+
+        elif alvo == NOME_DROPDOWN_RELATORIO:
+            estado.relatorio = formulario.get(NOME_DROPDOWN_RELATORIO, "")
+
+        elif NOME_BOTAO_EXPORTAR in botoes and estado.pais_query is not None:
+            assert formulario.get("ctl00$c$pickFile$ddFormat") == "txt"
+            arquivo = f"{formulario['ctl00$c$pickFile$txtFileName']}_TL.zip"
+            tempo = self.config.tempos_exportacao_pais.get(
+                estado.pais_query, self.config.tempo_exportacao
+            )
+            estado.exportacoes.append(
+                Exportacao(
+                    arquivo=arquivo,
+                    pais=estado.pais_query,
+                    pronto_em=time() + tempo,
+                )
+            )
+
+        else:
+            for n, _ in enumerate(list(estado.exportacoes), 2):
+                if f"{PREFIXO_RELATORIOS}$ctl{n:02d}$bDelete" in botoes:
+                    del estado.exportacoes[n - 2]
+                    break
+
+        return None
+
+    def _trata_download(
+        self, handler: BaseHTTPRequestHandler, caminho: str
+    ) -> None:
+        # O arquivo é enviado fora do lock <- downloads lentos não travam o site
+        with self.lock:
+            self.numero_requisicoes += 1
+            estado = self._estado(handler)
+            corpo = (
+                None
+                if estado is None
+                else self._corpo_download(estado, caminho.split("/", 1)[1])
+            )
+        if estado is None:
+            return self._redireciona(
+                handler, f"/welcome.aspx?ReturnUrl=%2f{caminho}"
+            )
+        if corpo is None:
+            return self._responde(handler, 404, b"Not found")
+        return self._responde_download(handler, corpo)
+
+    def _corpo_download(
+        self, estado: EstadoSessao, arquivo: str
+    ) -> Optional[bytes]:
+        for exportacao in estado.exportacoes:
+            if (
+                exportacao.arquivo == arquivo
+                and time() >= exportacao.pronto_em
+            ):
+                # Gerado uma vez só <- os bytes não mudam entre um Range e outro
+                if exportacao.conteudo is None:
+                    exportacao.conteudo = conteudo_zip(
+                        exportacao.pais,
+                        arquivo,
+                        self.config.numero_linhas_arquivo,
+                    )
+                return exportacao.conteudo
+        return None
+
+    def _responde_download(
+        self, handler: BaseHTTPRequestHandler, corpo: bytes
+    ) -> None:
+        intervalo = handler.headers.get("Range")
+        inicio_texto, _, fim_texto = (
+            (intervalo or "bytes=0-").removeprefix("bytes=").partition("-")
+        )
+        # 'bytes=-N' <- só os N últimos bytes (o diretório central do zip)
+        cauda = not inicio_texto
+        inicio = (
+            max(0, len(corpo) - int(fim_texto)) if cauda else int(inicio_texto)
+        )
+        if inicio >= len(corpo) > 0:
+            return self._responde(handler, 416)
+
+        with self.lock:
+            cortar = (
+                not cauda
+                and self.numero_downloads_cortados
+                < self.config.downloads_cortados
+            )
+            self.numero_downloads_cortados += cortar
+            self.numero_downloads_retomados += inicio > 0 and not cauda
+            self.numero_caudas += cauda
+            self.numero_downloads_completos += inicio == 0 and not cauda
+
+        handler.send_response(206 if inicio > 0 or cauda else 200)
+        handler.send_header("Content-Type", "application/octet-stream")
+        handler.send_header("Content-Length", str(len(corpo) - inicio))
+        if inicio > 0 or cauda:
+            handler.send_header(
+                "Content-Range",
+                f"bytes {inicio}-{len(corpo) - 1}/{len(corpo)}",
+            )
+        handler.end_headers()
+
+        parte = corpo[inicio:]
+        if cortar:
+            parte = parte[: len(parte) // 2]
+        for n in range(0, len(parte), TAMANHO_BLOCO_DOWNLOAD):
+            bloco = parte[n : n + TAMANHO_BLOCO_DOWNLOAD]
+            handler.wfile.write(bloco)
+            if self.config.banda_download is not None:
+                sleep(len(bloco) / self.config.banda_download)
+        return None
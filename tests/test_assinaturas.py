@@ -0,0 +1,88 @@
+import pytest
+
+from scraping_wto import controle_fluxo, website_scraping
+from scraping_wto.cliente_http import ClienteTAO
+from scraping_wto.controle_fluxo import add_na_fila, get_fila
+from scraping_wto.extrator_zip import diretorio_central_da_cauda
+from scraping_wto.registro_consultas import RegistroConsultasFeitas
+from scraping_wto.schemas import Consulta
+from scraping_wto.website_scraping import confere_consulta
+from tests.servidor_tao import PAISES, SENHA, USUARIO, conteudo_zip
+
+NUMERO_LINHAS = 1000
+TAMANHO_CAUDA_CURTA = 100
+
+
+def consulta_pais(pais: str, **campos) -> Consulta:
+    year, imports, nomenclature = PAISES[pais]
+    consulta = Consulta(
+        COUNTRY=pais, YEAR=year, IMPORTS=imports, NOMENCLATURE=nomenclature
+    )
+    return consulta.model_copy(update=campos)
+
+
+@pytest.fixture
+def cliente(servidor_tao) -> ClienteTAO:
+    cliente = ClienteTAO(url_base=servidor_tao.url)
+    cliente.login(usuario=USUARIO, senha=SENHA)
+    return cliente
+
+
+def test_diretorio_central_da_cauda() -> None:
+    conteudo = conteudo_zip("Niger", "niger_TL.zip", NUMERO_LINHAS)
+
+    diretorio = diretorio_central_da_cauda(conteudo[-len(conteudo) // 2 :])
+
+    assert diretorio is not None
+    assert sorted(diretorio) == [
+        "niger_DutyDetails_TL.txt",
+        "niger_TariffDetails_TL.txt",
+        "niger_TradeDetails_TL.txt",
+    ]
+    assert diretorio_central_da_cauda(conteudo[-TAMANHO_CAUDA_CURTA:]) is None
+    return None
+
+
+def test_zip_igual_nao_e_baixado_de_novo(
+    cliente: ClienteTAO, servidor_tao, dir_dados
+) -> None:
+    consulta = consulta_pais("Nigeria")
+    add_na_fila(consulta)
+    cliente.download_consulta(consulta)
+    assert servidor_tao.numero_downloads_completos == 1
+
+    # Só o ano mudou no site; os dados exportados são os mesmos
+    path_txt = dir_dados / "data/bronze/tl/nigeria_DutyDetails_TL.txt"
+    modificado_em = path_txt.stat().st_mtime_ns
+    revisada = consulta_pais("Nigeria", YEAR="2099")
+    add_na_fila(revisada)
+    cliente.download_consulta(revisada)
+
+    assert servidor_tao.numero_caudas == 1
+    assert servidor_tao.numero_downloads_completos == 1
+    assert path_txt.stat().st_mtime_ns == modificado_em
+    assert get_fila() == []
+    assert not website_scraping.ASSINATURAS.metadados_mudaram(revisada)
+    return None
+
+
+def test_metadados_iguais_nao_entram_na_fila(
+    cliente: ClienteTAO, dir_dados, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    consulta = consulta_pais("Nigeria")
+    add_na_fila(consulta)
+    cliente.download_consulta(consulta)
+    # O log de consultas feitas se perdeu <- a assinatura ainda diz que não mudou
+    monkeypatch.setattr(
+        controle_fluxo,
+        "REGISTRO_CONSULTAS",
+        RegistroConsultasFeitas(
+            dir_dados / "log/outro_log.csv", atraso_escrita=0
+        ),
+    )
+
+    confere_consulta(consulta, consulta.COUNTRY)
+    confere_consulta(consulta_pais("Nigeria", NOMENCLATURE="HS22"), "Nigeria")
+
+    assert get_fila() == [consulta_pais("Nigeria", NOMENCLATURE="HS22")]
+    return None
@@ -0,0 +1,286 @@
+"""Benchmarks de ponta a ponta contra o servidor local (tests/servidor_tao.py).
+
+Os tempos de cada etapa, por país, aparecem no resumo do pytest e podem ser
+salvos com '--benchmark-json'. Para pular: pytest -m "not benchmark".
+"""
+
+import functools
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+from selenium.webdriver.remote.webdriver import WebDriver
+
+from scraping_wto import main, sessao_navegador, website_scraping
+from scraping_wto.cliente_http import ClienteTAO
+from scraping_wto.controle_fluxo import add_na_fila
+from scraping_wto.selenium_utils import (
+    espera_presenca_elemento,
+    navegador_firefox,
+)
+from scraping_wto.sessao_navegador import SessaoNavegador
+from tests.auxiliares import confere_downloads, consulta_pais, sem_firefox
+from tests.cronometro import Cronometro
+from tests.servidor_tao import (
+    PAISES,
+    SENHA,
+    USUARIO,
+    ConfigServidor,
+    ServidorTAO,
+)
+
+pytestmark = pytest.mark.benchmark
+
+# Latências da ordem das do site, só que menores <- o benchmark roda no CI
+CONFIG_BENCHMARK = ConfigServidor(
+    tempo_exportacao=0.3,
+    tempos_exportacao_pais={"Brazil": 0.6, "Viet Nam": 0.1},
+    numero_linhas_arquivo=2000,
+    latencia_pagina=0.02,
+    latencia_postback=0.04,
+    latencia_download=0.02,
+    banda_download=2 * 1024 * 1024,
+    latencia_estatico=0.05,
+)
+
+ETAPAS_CLIENTE_HTTP = {
+    "login": "login",
+    "get_lista_paises": "lista_paises",
+    "get_info_ultima_consulta_pais": "info_pais",
+    "deleta_relatorios": "deleta_relatorios",
+    "exporta_relatorio": "exporta",
+    "espera_link_download": "espera_pronto",
+    "download_consulta": "consulta_total",
+}
+
+ETAPAS_SELENIUM = {
+    "limpa_tabela_relatorios": "deleta_relatorios",
+    "exporta_relatorio": "exporta",
+    "clica_botao_refresh": "espera_pronto",
+    "get_link_download_pais": "link_download",
+    "processa_download": "processa_download",
+}
+
+# Quantas vezes a página de exportação é aberta no benchmark do modo enxuto
+NUMERO_ABERTURAS_PAGINA = 10
+
+
+def processos_filhos(pid: int) -> list[int]:
+    filhos: dict[int, list[int]] = {}
+    for path_stat in Path("/proc").glob("[0-9]*/stat"):
+        try:
+            # O nome do processo (entre parênteses) pode ter espaços
+            campos = (
+                path_stat.read_text(encoding="utf-8").rsplit(")", 1)[1].split()
+            )
+        except (OSError, IndexError):
+            continue
+        filhos.setdefault(int(campos[1]), []).append(
+            int(path_stat.parent.name)
+        )
+    pids = [pid]
+    for pid_pai in pids:
+        pids.extend(filhos.get(pid_pai, []))
+    return pids
+
+
+def rss_firefox(navegador: WebDriver) -> int:
+    """RSS (bytes) do Firefox e dos processos de conteúdo dele (Linux)"""
+
+    total = 0
+    for pid in processos_filhos(navegador.capabilities["moz:processID"]):
+        try:
+            status = Path(f"/proc/{pid}/status").read_text(encoding="utf-8")
+        except OSError:
+            continue
+        for linha in status.splitlines():
+            if linha.startswith("VmRSS:"):
+                total += int(linha.split()[1]) * 1024
+    return total
+
+
+def abre_pagina_exportacao(navegador: WebDriver) -> None:
+    """Página pronta para o scraper <- o link de consulta já está no DOM"""
+
+    navegador.get(f"{website_scraping.URL_BASE_TAO}/ExportReport.aspx")
+    espera_presenca_elemento(navegador, "id", "ctl00_qsl_lbChangeQuery")
+    return None
+
+
+# -----------------------------------------------------------------------------
+# Fixtures
+# -----------------------------------------------------------------------------
+
+
+@pytest.fixture
+def servidor_benchmark(
+    monkeypatch: pytest.MonkeyPatch, dir_dados: Path
+) -> Iterator[ServidorTAO]:
+    monkeypatch.setenv("USUARIO_WTO", USUARIO)
+    monkeypatch.setenv("SENHA_WTO", SENHA)
+    with ServidorTAO(CONFIG_BENCHMARK) as servidor:
+        monkeypatch.setattr(website_scraping, "URL_BASE_TAO", servidor.url)
+        monkeypatch.setattr(
+            main,
+            "ClienteTAO",
+            functools.partial(ClienteTAO, url_base=servidor.url),
+        )
+        yield servidor
+
+
+@pytest.fixture
+def cronometro_http(cronometro: Cronometro) -> Cronometro:
+    for nome, etapa in ETAPAS_CLIENTE_HTTP.items():
+        cronometro.instrumenta(ClienteTAO, nome, etapa)
+    cronometro.instrumenta(
+        website_scraping, "processa_download", "processa_download"
+    )
+    cronometro.instrumenta(
+        website_scraping, "download_arq", "download_extracao"
+    )
+    return cronometro
+
+
+@pytest.fixture
+def cronometro_selenium(cronometro: Cronometro) -> Cronometro:
+    cronometro.instrumenta(sessao_navegador, "navegador_login", "login")
+    cronometro.instrumenta(main, "get_lista_paises", "lista_paises")
+    cronometro.instrumenta(main, "coleta_infos_paises", "info_paises")
+    cronometro.instrumenta(main, "confere_dados_consulta_pais", "info_pais")
+    cronometro.instrumenta(main, "download_consulta", "consulta_total")
+    for nome, etapa in ETAPAS_SELENIUM.items():
+        cronometro.instrumenta(website_scraping, nome, etapa)
+    cronometro.instrumenta(
+        website_scraping, "download_arq", "download_extracao"
+    )
+    return cronometro
+
+
+# -----------------------------------------------------------------------------
+# Backend HTTP
+# -----------------------------------------------------------------------------
+
+
+def test_benchmark_main_http(
+    servidor_benchmark, cronometro_http, dir_dados
+) -> None:
+    cronometro_http.mede("main", main.main, backend="http")
+
+    confere_downloads(dir_dados, list(PAISES))
+    resumo = cronometro_http.resumo()
+    assert resumo["erros"] == 0
+    assert resumo["etapas"]["consulta_total"]["n"] == len(PAISES)
+    return None
+
+
+def test_benchmark_loop_consulta_http(
+    servidor_benchmark, cronometro_http, dir_dados
+) -> None:
+    for pais in PAISES:
+        add_na_fila(consulta_pais(pais))
+
+    with main.ClienteTAO() as cliente:
+        cliente.login()
+        cronometro_http.mede("loop_consulta", main.loop_consulta_http, cliente)
+
+    confere_downloads(dir_dados, list(PAISES))
+    assert cronometro_http.resumo()["erros"] == 0
+    return None
+
+
+def test_benchmark_download_consulta_http(
+    servidor_benchmark, cronometro_http, dir_dados
+) -> None:
+    consulta = consulta_pais("Brazil")
+    add_na_fila(consulta)
+
+    with main.ClienteTAO() as cliente:
+        cliente.login()
+        cliente.download_consulta(consulta)
+
+    confere_downloads(dir_dados, ["Brazil"])
+    assert cronometro_http.resumo()["paises"]["Brazil"]["consulta_total"] > 0
+    return None
+
+
+# -----------------------------------------------------------------------------
+# Backend Selenium <- só roda onde houver Firefox e geckodriver
+# -----------------------------------------------------------------------------
+
+
+@sem_firefox
+def test_benchmark_main_selenium(
+    servidor_benchmark, cronometro_selenium, dir_dados
+) -> None:
+    cronometro_selenium.mede("main", main.main, backend="selenium")
+
+    confere_downloads(dir_dados, list(PAISES))
+    assert cronometro_selenium.resumo()["etapas"]["consulta_total"][
+        "n"
+    ] == len(PAISES)
+    return None
+
+
+@sem_firefox
+def test_benchmark_loop_consulta_selenium(
+    servidor_benchmark, cronometro_selenium, dir_dados
+) -> None:
+    consultas = [consulta_pais(pais) for pais in PAISES]
+    for consulta in consultas:
+        add_na_fila(consulta)
+
+    with SessaoNavegador(
+        use_default_firefox_bin=False, headless=True
+    ) as sessao:
+        cronometro_selenium.mede(
+            "loop_consulta", main.loop_consulta, sessao, 1, 1
+        )
+
+    confere_downloads(dir_dados, list(PAISES))
+    return None
+
+
+@sem_firefox
+def test_benchmark_download_consulta_selenium(
+    servidor_benchmark, cronometro_selenium, dir_dados
+) -> None:
+    consulta = consulta_pais("Brazil")
+    add_na_fila(consulta)
+
+    with SessaoNavegador(
+        use_default_firefox_bin=False, headless=True
+    ) as sessao:
+        cronometro_selenium.mede(
+            "consulta_total",
+            website_scraping.download_consulta,
+            navegador=sessao.garante_sessao(),
+            consulta=consulta,
+            sessao_http=sessao.sessao_http,
+        )
+
+    confere_downloads(dir_dados, ["Brazil"])
+    return None
+
+
+@sem_firefox
+@pytest.mark.parametrize("enxuto", [False, True], ids=["completo", "enxuto"])
+def test_benchmark_navegador_enxuto(
+    servidor_benchmark: ServidorTAO, cronometro: Cronometro, enxuto: bool
+) -> None:
+    navegador = navegador_firefox(
+        use_default_firefox_bin=False, headless=True, enxuto=enxuto
+    )
+    try:
+        cronometro.mede("login", website_scraping.navegador_login, navegador)
+        for _ in range(NUMERO_ABERTURAS_PAGINA):
+            cronometro.mede("pagina_pronta", abre_pagina_exportacao, navegador)
+        cronometro.anota("rss_firefox_mb", rss_firefox(navegador) / 2**20)
+    finally:
+        navegador.quit()
+
+    estaticos = servidor_benchmark.estaticos_servidos
+    cronometro.anota("estaticos_servidos", sum(estaticos.values()))
+    if enxuto:
+        assert estaticos["estatico/logo.png"] == 0
+        assert estaticos["estatico/tao.woff"] == 0
+    return None
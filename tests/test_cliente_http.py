@@ -0,0 +1,127 @@
+import pandas as pd
+import pytest
+
+from scraping_wto import cliente_http
+from scraping_wto.cliente_http import ClienteTAO, PaginaWebForms
+from scraping_wto.controle_fluxo import add_na_fila, get_fila
+from scraping_wto.schemas import Consulta
+from tests.servidor_tao import (
+    PAISES,
+    SENHA,
+    USUARIO,
+    ConfigServidor,
+    ServidorTAO,
+)
+
+TEMPO_EXPORTACAO_LONGO = 60.0
+
+
+def consulta_pais(pais: str) -> Consulta:
+    year, imports, nomenclature = PAISES[pais]
+    return Consulta(
+        COUNTRY=pais, YEAR=year, IMPORTS=imports, NOMENCLATURE=nomenclature
+    )
+
+
+@pytest.fixture
+def cliente(servidor_tao) -> ClienteTAO:
+    cliente = ClienteTAO(url_base=servidor_tao.url)
+    cliente.login(usuario=USUARIO, senha=SENHA)
+    return cliente
+
+
+def test_pagina_webforms_le_campos_e_tabelas() -> None:
+    html = """<form action="./ExportReport.aspx" id="aspnetForm">
+<input type="hidden" name="__VIEWSTATE" value="abc" />
+<select name="formato"><option value="xls">x</option><option value="txt" selected="selected">t</option></select>
+<table id="tabela"><tr class="GridItem"><td><input type="radio" name="r" /></td><td> Viet  Nam </td></tr></table>
+</form>"""
+    pagina = PaginaWebForms(html, "http://localhost/default.aspx")
+
+    assert pagina.action == "http://localhost/ExportReport.aspx"
+    assert pagina.campos == {"__VIEWSTATE": "abc", "formato": "txt"}
+    linhas = pagina.linhas("tabela", ("GridItem",))
+    assert linhas[0]["celulas"][1].strip() == "Viet  Nam"
+    assert linhas[0]["inputs"][0]["name"] == "r"
+    return None
+
+
+def test_regex_postback_aceita_aspas_escapadas() -> None:
+    onclick = "javascript:setTimeout('__doPostBack(\\'ctl00$c$drpReport\\',\\'\\')', 0)"
+    assert cliente_http.REGEX_POSTBACK.search(onclick).groups() == (
+        "ctl00$c$drpReport",
+        "",
+    )
+    return None
+
+
+def test_login_invalido(servidor_tao) -> None:
+    cliente = ClienteTAO(url_base=servidor_tao.url)
+    with pytest.raises(Exception, match="Login"):
+        cliente.login(usuario=USUARIO, senha="errada")
+    return None
+
+
+def test_lista_paises(cliente: ClienteTAO) -> None:
+    assert cliente.get_lista_paises() == list(PAISES)
+    return None
+
+
+def test_info_ultima_consulta_pais(cliente: ClienteTAO) -> None:
+    consulta = cliente.get_info_ultima_consulta_pais("Viet Nam")
+    year, imports, nomenclature = PAISES["Viet Nam"]
+    assert consulta == Consulta(
+        COUNTRY="Viet Nam",
+        YEAR=year,
+        IMPORTS=imports,
+        NOMENCLATURE=nomenclature,
+    )
+    return None
+
+
+def test_download_consulta(cliente: ClienteTAO, dir_dados) -> None:
+    year, imports, nomenclature = PAISES["Nigeria"]
+    consulta = Consulta(
+        COUNTRY="Nigeria",
+        YEAR=year,
+        IMPORTS=imports,
+        NOMENCLATURE=nomenclature,
+    )
+    add_na_fila(consulta)
+
+    cliente.download_consulta(consulta)
+
+    assert (dir_dados / "data/bronze/tl/nigeria_DutyDetails_TL.txt").exists()
+    assert get_fila() == []
+    df_log = pd.read_csv(
+        dir_dados / "log/consultas_feitas.csv", sep=";", dtype=str
+    )
+    assert df_log["COUNTRY"].tolist() == ["Nigeria"]
+    return None
+
+
+def test_relatorios_de_paises_com_nomes_parecidos(dir_dados) -> None:
+    # A exportação da Nigeria (outro worker, mesma conta) não fica pronta
+    config = ConfigServidor(
+        relatorios_da_conta=True,
+        tempos_exportacao_pais={"Nigeria": TEMPO_EXPORTACAO_LONGO},
+    )
+    with ServidorTAO(config) as servidor:
+        worker_nigeria, worker_niger = (
+            ClienteTAO(url_base=servidor.url) for _ in range(2)
+        )
+        for worker in (worker_nigeria, worker_niger):
+            worker.login(usuario=USUARIO, senha=SENHA)
+
+        worker_nigeria.get("ExportReport.aspx")
+        worker_nigeria.exporta_relatorio(consulta_pais("Nigeria"))
+        worker_niger.get("ExportReport.aspx")
+        # 'niger' é substring de 'nigeria_TL.zip' <- não é o relatório do Niger
+        assert worker_niger.linha_relatorio("Niger") is None
+        worker_niger.download_consulta(consulta_pais("Niger"), exclusivo=False)
+
+        worker_niger.deleta_relatorios("Niger")
+        assert worker_niger.linha_relatorio("Niger") is None
+        assert worker_niger.linha_relatorio("Nigeria") is not None
+    assert (dir_dados / "data/bronze/tl/niger_DutyDetails_TL.txt").exists()
+    return None
@@ -0,0 +1,54 @@
+import pandas as pd
+
+from scraping_wto.controle_fluxo import (
+    add_na_fila,
+    consulta_ja_feita,
+    get_fila,
+    log_consulta_realizada_sucesso,
+    remove_da_fila,
+)
+from scraping_wto.schemas import Consulta
+
+CONSULTA_BRAZIL = Consulta(
+    COUNTRY="Brazil", YEAR="2022", IMPORTS="2021", NOMENCLATURE="HS17"
+)
+CONSULTA_NIGER = Consulta(
+    COUNTRY="Niger", YEAR="2020", IMPORTS="2019", NOMENCLATURE="HS12"
+)
+
+
+def test_fila_sem_repetidos(dir_dados) -> None:
+    assert get_fila() is None
+
+    add_na_fila(CONSULTA_BRAZIL)
+    add_na_fila(CONSULTA_NIGER)
+    add_na_fila(CONSULTA_BRAZIL)
+    assert get_fila() == [CONSULTA_BRAZIL, CONSULTA_NIGER]
+
+    remove_da_fila(CONSULTA_BRAZIL)
+    assert get_fila() == [CONSULTA_NIGER]
+    return None
+
+
+def test_log_consulta_substitui_linha_do_pais(dir_dados) -> None:
+    log_consulta_realizada_sucesso(CONSULTA_NIGER)
+    log_consulta_realizada_sucesso(CONSULTA_BRAZIL)
+    log_consulta_realizada_sucesso(
+        CONSULTA_BRAZIL.model_copy(update={"YEAR": "2023"})
+    )
+
+    df_log = pd.read_csv(
+        dir_dados / "log/consultas_feitas.csv", sep=";", dtype=str
+    )
+    assert df_log["COUNTRY"].tolist() == ["Brazil", "Niger"]
+    assert df_log["YEAR"].tolist() == ["2023", "2020"]
+    return None
+
+
+def test_consulta_ja_feita(dir_dados) -> None:
+    assert not consulta_ja_feita(CONSULTA_BRAZIL)
+
+    log_consulta_realizada_sucesso(CONSULTA_BRAZIL)
+    assert consulta_ja_feita(CONSULTA_BRAZIL)
+    assert not consulta_ja_feita(CONSULTA_NIGER)
+    return None
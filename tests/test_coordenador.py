@@ -0,0 +1,193 @@
+import multiprocessing
+import os
+import time
+from functools import partial
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from scraping_wto import controle_fluxo, website_scraping
+from scraping_wto.coordenador import (
+    PATH_FILA_COORDENADOR,
+    ClienteCoordenador,
+    Coordenador,
+    publica_fila,
+    worker_remoto,
+)
+from scraping_wto.fila import PATH_FILA_CONSULTAS
+from scraping_wto.schemas import Consulta
+
+NUMERO_CONSULTAS = 12
+NUMERO_PROCESSOS = 3
+DURACAO_LEASE = 0.5
+TEMPO_CONSULTA = 0.05
+TIMEOUT_PROCESSOS = 60
+NUMERO_ROUBOS = 2
+TEMPO_GRANDE = 1000.0
+TEMPO_PEQUENO = 10.0
+
+
+def consulta_pais(pais: str) -> Consulta:
+    return Consulta(
+        COUNTRY=pais, YEAR="2022", IMPORTS="2021", NOMENCLATURE="HS17"
+    )
+
+
+@pytest.fixture
+def coordenador(tmp_path: Path) -> Iterator[Coordenador]:
+    with Coordenador(
+        tmp_path / "fila.sqlite3",
+        tmp_path / "consultas_feitas.csv",
+        duracao_lease=DURACAO_LEASE,
+        host="127.0.0.1",
+        porta=0,
+    ) as coordenador:
+        # Ordem de chegada <- os testes sabem quem sai primeiro
+        coordenador.modo_fila = "fifo"
+        yield coordenador
+
+
+# Roda em outro processo <- grava um marcador por consulta feita
+def grava_marcador(dir_marcadores: Path, consulta: Consulta) -> None:
+    time.sleep(TEMPO_CONSULTA)
+    (dir_marcadores / f"{consulta.COUNTRY}.{os.getpid()}").touch()
+    return None
+
+
+def executa_worker(url: str, nome: str, dir_marcadores: Path) -> None:
+    with ClienteCoordenador(url, worker=nome) as cliente:
+        worker_remoto(cliente, partial(grava_marcador, dir_marcadores))
+    return None
+
+
+def test_workers_em_varios_processos(
+    coordenador: Coordenador, tmp_path: Path
+) -> None:
+    consultas = [
+        consulta_pais(f"Pais {n:02d}") for n in range(NUMERO_CONSULTAS)
+    ]
+    with ClienteCoordenador(coordenador.url) as cliente:
+        assert cliente.adiciona(consultas) == NUMERO_CONSULTAS
+        # Repetidas não entram de novo
+        assert cliente.adiciona(consultas[:2]) == 0
+
+    contexto = multiprocessing.get_context("spawn")
+    processos = [
+        contexto.Process(
+            target=executa_worker,
+            args=(coordenador.url, f"worker-{n}", tmp_path),
+        )
+        for n in range(NUMERO_PROCESSOS)
+    ]
+    for processo in processos:
+        processo.start()
+    for processo in processos:
+        processo.join(TIMEOUT_PROCESSOS)
+        assert processo.exitcode == 0
+
+    # Cada consulta feita uma única vez, e todas no registro do coordenador
+    marcadores = sorted(path.stem for path in tmp_path.glob("Pais *.*"))
+    assert marcadores == sorted(consulta.COUNTRY for consulta in consultas)
+    assert all(
+        coordenador.registro.ja_feita(consulta) for consulta in consultas
+    )
+    with ClienteCoordenador(coordenador.url) as cliente:
+        assert cliente.estado()["pendentes"] == 0
+        # Já feitas <- o coordenador não põe na fila de novo
+        assert cliente.adiciona(consultas) == 0
+    return None
+
+
+def test_roubo_e_lease_vencido(coordenador: Coordenador) -> None:
+    brazil, niger, chile = (
+        consulta_pais(pais) for pais in ("Brazil", "Niger", "Chile")
+    )
+    coordenador.adiciona([brazil, niger, chile])
+
+    # 'a' reserva tudo (prefetch) e começa só a primeira
+    assert coordenador.reserva("a", quantidade=3) == [brazil, niger, chile]
+    assert coordenador.inicia("a", brazil)
+
+    # 'b' está ocioso <- rouba a última reservada que 'a' não começou
+    assert coordenador.reserva("b") == [chile]
+    assert not coordenador.inicia("a", chile)
+    assert coordenador.reserva("b") == [niger]
+    assert coordenador.reserva("b") == []
+
+    # Heartbeat mantém a reserva; sem ele, o lease vence e 'b' pega
+    assert coordenador.heartbeat("a", [brazil, chile]) == [brazil]
+    time.sleep(DURACAO_LEASE * 1.5)
+    assert coordenador.reserva("b") == [brazil]
+    assert coordenador.heartbeat("a", [brazil]) == []
+
+    # 'a' terminou tarde <- quem conclui é o novo dono
+    assert not coordenador.conclui("a", brazil)
+    assert not coordenador.registro.ja_feita(brazil)
+    assert coordenador.conclui("b", brazil)
+    coordenador.falha("b", niger)
+    assert coordenador.estado()["roubos"] == NUMERO_ROUBOS
+    assert coordenador.registro.ja_feita(brazil)
+    assert coordenador.fila.consultas() == [niger, chile]
+    return None
+
+
+def test_worker_mantem_lease_com_heartbeat(coordenador: Coordenador) -> None:
+    brazil = consulta_pais("Brazil")
+    coordenador.adiciona([brazil])
+    feitas = []
+
+    def consulta_demorada(consulta: Consulta) -> None:
+        # Mais longa do que o lease <- só não é perdida por causa dos heartbeats
+        time.sleep(DURACAO_LEASE * 2)
+        assert coordenador.reserva("outro") == []
+        feitas.append(consulta)
+        return None
+
+    with ClienteCoordenador(coordenador.url, worker="lento") as cliente:
+        assert worker_remoto(cliente, consulta_demorada) == 1
+    assert feitas == [brazil]
+    assert coordenador.fila.consultas() == []
+    return None
+
+
+def test_publica_fila_da_mesma_maquina(
+    coordenador: Coordenador, dir_dados: Path
+) -> None:
+    consultas = [consulta_pais(pais) for pais in ("Brazil", "Niger")]
+    for consulta in consultas:
+        controle_fluxo.add_na_fila(consulta)
+
+    with ClienteCoordenador(coordenador.url) as cliente:
+        assert publica_fila(cliente) == len(consultas)
+    # Saem da fila local e ficam na do coordenador
+    assert not controle_fluxo.get_fila()
+    assert coordenador.fila.consultas() == consultas
+    return None
+
+
+def test_padroes_do_coordenador(tmp_path: Path) -> None:
+    # Fila própria e só a própria máquina, a não ser que se peça outra coisa
+    assert PATH_FILA_COORDENADOR != PATH_FILA_CONSULTAS
+    with Coordenador(
+        tmp_path / "fila.sqlite3", tmp_path / "feitas.csv", porta=0
+    ) as coordenador:
+        assert coordenador.url.startswith("http://127.0.0.1:")
+    return None
+
+
+def test_coordenador_ordena_a_fila(
+    coordenador: Coordenador, dir_dados: Path
+) -> None:
+    website_scraping.MODELO_EXPORTACAO.registra("Big", TEMPO_GRANDE)
+    website_scraping.MODELO_EXPORTACAO.registra("Small", TEMPO_PEQUENO)
+
+    coordenador.modo_fila = "sjf"
+    coordenador.adiciona([consulta_pais("Big"), consulta_pais("Small")])
+
+    # sjf <- a mais curta sai primeiro, mesmo tendo entrado depois
+    assert [consulta.COUNTRY for consulta in coordenador.reserva("a", 2)] == [
+        "Small",
+        "Big",
+    ]
+    return None
@@ -0,0 +1,133 @@
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from scraping_wto.diario import DiarioCSV
+
+COLUNAS = ["COUNTRY", "DATA_CONSULTA"]
+NUMERO_REGISTROS = 50
+NUMERO_WORKERS = 4
+NUMERO_PROCESSOS = 3
+TIMEOUT_PROCESSOS = 60
+
+
+def test_ultima_linha_de_cada_pais_vale(tmp_path: Path) -> None:
+    diario = DiarioCSV(tmp_path / "consultas_erros.csv", COLUNAS)
+    diario.anota({"COUNTRY": "Niger", "DATA_CONSULTA": "2024-01-01"})
+    diario.anota({"COUNTRY": "Brazil", "DATA_CONSULTA": "2024-01-01"})
+    diario.anota({"COUNTRY": "Niger", "DATA_CONSULTA": "2024-02-01"})
+    # Crash no meio de uma escrita
+    with open(diario.path_diario, "a", encoding="utf-8") as diario_f:
+        diario_f.write('{"COUNTRY": "Bra')
+
+    assert diario.le()["Niger"]["DATA_CONSULTA"] == "2024-02-01"
+
+    diario.compacta()
+    assert not diario.path_diario.exists()
+    assert diario.path_csv.read_text(encoding="utf-8").splitlines() == [
+        "COUNTRY;DATA_CONSULTA",
+        "Brazil;2024-01-01",
+        "Niger;2024-02-01",
+    ]
+
+    diario.anota({"COUNTRY": "Brazil", "DATA_CONSULTA": "2024-03-01"})
+    assert diario.le()["Brazil"]["DATA_CONSULTA"] == "2024-03-01"
+    return None
+
+
+def test_compactacao_interrompida(tmp_path: Path) -> None:
+    diario = DiarioCSV(tmp_path / "consultas_erros.csv", COLUNAS)
+    diario.anota({"COUNTRY": "Niger", "DATA_CONSULTA": "2024-01-01"})
+    # Crash depois de renomear o diário e antes de reescrever o CSV
+    diario.path_diario.rename(diario.path_compactando)
+    diario.anota({"COUNTRY": "Niger", "DATA_CONSULTA": "2024-02-01"})
+
+    assert diario.le()["Niger"]["DATA_CONSULTA"] == "2024-02-01"
+
+    diario.compacta()
+    diario.compacta()
+    assert not diario.path_compactando.exists()
+    assert not diario.path_diario.exists()
+    assert (
+        DiarioCSV(diario.path_csv, COLUNAS).le()["Niger"]["DATA_CONSULTA"]
+        == "2024-02-01"
+    )
+    return None
+
+
+def test_compacta_sem_diario_nao_cria_arquivos(tmp_path: Path) -> None:
+    diario = DiarioCSV(tmp_path / "consultas_erros.csv", COLUNAS)
+
+    diario.compacta()
+
+    # Nem o CSV nem o arquivo de lock
+    assert list(tmp_path.iterdir()) == []
+    return None
+
+
+def test_workers_escrevem_ao_mesmo_tempo(tmp_path: Path) -> None:
+    diario = DiarioCSV(tmp_path / "consultas_erros.csv", COLUNAS)
+
+    def worker(n_worker: int) -> None:
+        for n in range(NUMERO_REGISTROS):
+            diario.anota({
+                "COUNTRY": f"pais_{n_worker}_{n}",
+                "DATA_CONSULTA": "2024-01-01",
+            })
+            if n % 10 == 0:
+                diario.compacta()
+
+    with ThreadPoolExecutor(NUMERO_WORKERS) as executor:
+        list(executor.map(worker, range(NUMERO_WORKERS)))
+
+    assert len(diario.le()) == NUMERO_REGISTROS * NUMERO_WORKERS
+    return None
+
+
+def test_diario_existente_conta_para_compactar(tmp_path: Path) -> None:
+    diario = DiarioCSV(tmp_path / "consultas_erros.csv", COLUNAS)
+    for pais in ("Niger", "Brazil"):
+        diario.anota({"COUNTRY": pais, "DATA_CONSULTA": "2024-01-01"})
+
+    # Nova execução <- as linhas que já estavam no diário contam
+    assert DiarioCSV(
+        diario.path_csv, COLUNAS, maximo_linhas=2
+    ).precisa_compactar()
+    assert not DiarioCSV(
+        diario.path_csv, COLUNAS, maximo_linhas=3
+    ).precisa_compactar()
+    return None
+
+
+# Roda em outro processo <- registra e compacta o tempo todo
+def anota_e_compacta(path_csv: Path, n_processo: int) -> None:
+    diario = DiarioCSV(path_csv, COLUNAS)
+    for n in range(NUMERO_REGISTROS):
+        diario.anota({
+            "COUNTRY": f"pais_{n_processo}_{n}",
+            "DATA_CONSULTA": "2024-01-01",
+        })
+        if n % 5 == 0:
+            diario.compacta()
+    return None
+
+
+def test_processos_compactam_ao_mesmo_tempo(tmp_path: Path) -> None:
+    path_csv = tmp_path / "consultas_erros.csv"
+    contexto = multiprocessing.get_context("spawn")
+    processos = [
+        contexto.Process(target=anota_e_compacta, args=(path_csv, n))
+        for n in range(NUMERO_PROCESSOS)
+    ]
+    for processo in processos:
+        processo.start()
+    for processo in processos:
+        processo.join(TIMEOUT_PROCESSOS)
+        assert processo.exitcode == 0
+
+    diario = DiarioCSV(path_csv, COLUNAS)
+    assert len(diario.le()) == NUMERO_REGISTROS * NUMERO_PROCESSOS
+    diario.compacta()
+    assert len(diario.le()) == NUMERO_REGISTROS * NUMERO_PROCESSOS
+    assert list(tmp_path.glob("*.tmp")) == []
+    return None
@@ -0,0 +1,185 @@
+import json
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+from scraping_wto import controle_fluxo, website_scraping
+from scraping_wto.assinaturas import RegistroAssinaturas
+from scraping_wto.escalonador import ModeloCusto, distribui, prioriza_fila
+from scraping_wto.modelo_exportacao import ModeloTempoExportacao
+from scraping_wto.registro_consultas import FORMATO_DATA
+from scraping_wto.schemas import Consulta
+
+TEMPO_GRANDE = 1000.0
+TEMPO_PEQUENO = 10.0
+TAMANHO_ZIP = 5000
+VAZAO_ZIP = 1000
+DIAS_COPIA_VELHA = 300
+NUMERO_FALHAS = 2
+NUMERO_FAIXAS = 2
+
+
+def consulta_pais(pais: str) -> Consulta:
+    return Consulta(
+        COUNTRY=pais, YEAR="2022", IMPORTS="2021", NOMENCLATURE="HS17"
+    )
+
+
+def escreve_spans(path_jsonl: Path, spans: list[dict]) -> None:
+    path_jsonl.parent.mkdir(exist_ok=True, parents=True)
+    with open(path_jsonl, "a", encoding="utf-8") as jsonl_f:
+        for span in spans:
+            linha = {
+                "pais": None,
+                "execucao": "",
+                "bytes": 0,
+                "erro": None,
+                **span,
+            }
+            jsonl_f.write(json.dumps(linha) + "\n")
+    return None
+
+
+def test_custos_e_falhas_do_historico(tmp_path: Path) -> None:
+    modelo_exportacao = ModeloTempoExportacao(
+        tmp_path / "tempos_exportacao.json"
+    )
+    modelo_exportacao.registra("Big", TEMPO_GRANDE)
+    modelo_exportacao.registra("Small", TEMPO_PEQUENO)
+    assinaturas = RegistroAssinaturas(tmp_path / "assinaturas.json")
+    assinaturas.registra(consulta_pais("Zip"), TAMANHO_ZIP, {}, "")
+
+    path_jsonl = tmp_path / "metricas.jsonl"
+    escreve_spans(
+        path_jsonl,
+        [
+            {"etapa": "download", "duracao": 1.0, "bytes": VAZAO_ZIP},
+            {
+                "etapa": "download_extracao",
+                "pais": "Big",
+                "duracao": TEMPO_GRANDE,
+            },
+            {
+                "etapa": "download_extracao",
+                "pais": "Small",
+                "duracao": TEMPO_PEQUENO,
+            },
+            # Big falhou e depois validou; Flaky falhou em duas execuções seguidas
+            {
+                "etapa": "exportacao",
+                "pais": "Big",
+                "execucao": "a",
+                "duracao": 1.0,
+                "erro": "x",
+            },
+            {
+                "etapa": "validacao",
+                "pais": "Big",
+                "execucao": "b",
+                "duracao": 1.0,
+            },
+            {
+                "etapa": "exportacao",
+                "pais": "Flaky",
+                "execucao": "a",
+                "duracao": 1.0,
+                "erro": "x",
+            },
+            {
+                "etapa": "link_download",
+                "pais": "Flaky",
+                "execucao": "a",
+                "duracao": 1.0,
+                "erro": "x",
+            },
+            {
+                "etapa": "exportacao",
+                "pais": "Flaky",
+                "execucao": "b",
+                "duracao": 1.0,
+                "erro": "x",
+            },
+        ],
+    )
+
+    modelo = ModeloCusto(path_jsonl, modelo_exportacao, assinaturas)
+    custos = modelo.custos(["Big", "Small", "Zip", "New"])
+
+    assert custos["Big"] == pytest.approx(2 * TEMPO_GRANDE)
+    assert custos["Small"] == pytest.approx(2 * TEMPO_PEQUENO)
+    # Sem span de download <- tamanho do último zip / vazão média
+    assert modelo.tempo_download("Zip") == pytest.approx(
+        TAMANHO_ZIP / VAZAO_ZIP
+    )
+    # Sem histórico nenhum <- mediana dos outros
+    assert custos["Small"] < custos["New"] < custos["Big"]
+    assert modelo.falhas_seguidas["Flaky"] == NUMERO_FALHAS
+    assert modelo.falhas_seguidas["Big"] == 0
+    return None
+
+
+def test_distribui_equilibra_as_faixas() -> None:
+    custos = {
+        "a": 10.0,
+        "b": 10.0,
+        "c": 10.0,
+        "d": 1.0,
+        "e": 1.0,
+        "f": 1.0,
+        "g": 1.0,
+    }
+    faixas = distribui(custos, NUMERO_FAIXAS)
+
+    cargas = [
+        sum(custo for chave, custo in custos.items() if faixas[chave] == faixa)
+        for faixa in range(NUMERO_FAIXAS)
+    ]
+    assert sorted(cargas) == [14.0, 20.0]
+    return None
+
+
+def test_modos_ordenam_a_fila(dir_dados: Path) -> None:
+    for pais in ("Big", "Stale", "Small"):
+        controle_fluxo.add_na_fila(consulta_pais(pais))
+    website_scraping.MODELO_EXPORTACAO.registra("Big", TEMPO_GRANDE)
+    website_scraping.MODELO_EXPORTACAO.registra("Stale", TEMPO_PEQUENO)
+    website_scraping.MODELO_EXPORTACAO.registra("Small", TEMPO_PEQUENO)
+    # Small foi baixado hoje, Stale há 300 dias e Big nunca
+    hoje = datetime.now()
+    controle_fluxo.REGISTRO_CONSULTAS.registra(
+        consulta_pais("Small"), data_consulta=hoje.strftime(FORMATO_DATA)
+    )
+    controle_fluxo.REGISTRO_CONSULTAS.registra(
+        consulta_pais("Stale"),
+        data_consulta=(hoje - timedelta(days=DIAS_COPIA_VELHA)).strftime(
+            FORMATO_DATA
+        ),
+    )
+
+    def ordem(faixa=None) -> list[str]:
+        consultas = controle_fluxo.reserva_da_fila(quantidade=3, faixa=faixa)
+        for consulta in consultas:
+            controle_fluxo.FILA.devolve(consulta, atraso=0)
+        controle_fluxo.FILA.reinicia_tentativas()
+        return [consulta.COUNTRY for consulta in consultas]
+
+    prioriza_fila("fifo")
+    assert ordem() == ["Big", "Stale", "Small"]
+
+    # Curtas primeiro, mas uma cópia velha passa na frente de uma recente
+    prioriza_fila("sjf")
+    assert ordem() == ["Stale", "Small", "Big"]
+
+    # Menor folga até o prazo de atualização primeiro
+    prioriza_fila("prazo")
+    assert ordem() == ["Stale", "Big", "Small"]
+
+    # Dois workers: Big sozinho numa faixa, Stale + Small na outra
+    prioriza_fila("sjf", numero_faixas=NUMERO_FAIXAS)
+    faixas = {tuple(ordem(faixa)) for faixa in range(NUMERO_FAIXAS)}
+    assert faixas == {("Big", "Stale", "Small"), ("Stale", "Small", "Big")}
+
+    with pytest.raises(ValueError, match="desconhecido"):
+        prioriza_fila("aleatorio")
+    return None
@@ -0,0 +1,97 @@
+from pathlib import Path
+
+import pytest
+
+from scraping_wto import website_scraping
+from scraping_wto.cliente_http import ClienteTAO
+from scraping_wto.controle_fluxo import add_na_fila, get_fila
+from scraping_wto.etapas import MAXIMO_TENTATIVAS_RETOMADA, RegistroEtapas
+from scraping_wto.schemas import Consulta, Etapa
+from tests.servidor_tao import PAISES, SENHA, USUARIO
+
+
+def consulta_pais(pais: str) -> Consulta:
+    year, imports, nomenclature = PAISES[pais]
+    return Consulta(
+        COUNTRY=pais, YEAR=year, IMPORTS=imports, NOMENCLATURE=nomenclature
+    )
+
+
+def test_registro_persiste_e_mantem_campos(tmp_path: Path) -> None:
+    path_arquivo = tmp_path / "etapas.json"
+    registro = RegistroEtapas(path_arquivo)
+    consulta = consulta_pais("Brazil")
+
+    registro.marca(consulta, Etapa.EXPORTADO, t_inicio_exportacao=123.0)
+    registro.marca(
+        consulta,
+        Etapa.PRONTO,
+        link_download="https://tao/Download/brazil_TL.zip",
+    )
+
+    etapa = RegistroEtapas(path_arquivo).get(consulta)
+    assert etapa is not None
+    assert etapa.etapa == Etapa.PRONTO
+    assert (etapa.t_inicio_exportacao, etapa.link_download) == (
+        123.0,
+        "https://tao/Download/brazil_TL.zip",
+    )
+    return None
+
+
+def test_descarta_so_o_que_dependia_do_site(tmp_path: Path) -> None:
+    registro = RegistroEtapas(tmp_path / "etapas.json")
+    exportada, validada = consulta_pais("Brazil"), consulta_pais("Niger")
+    registro.marca(exportada, Etapa.EXPORTADO)
+    registro.marca(validada, Etapa.VALIDADO)
+
+    registro.descarta_exportacoes()
+
+    assert registro.get(exportada) is None
+    assert registro.get(validada) is not None
+    return None
+
+
+def test_retomada_desiste_depois_de_falhar(tmp_path: Path) -> None:
+    registro = RegistroEtapas(tmp_path / "etapas.json")
+    consulta = consulta_pais("Brazil")
+    registro.marca(consulta, Etapa.PRONTO)
+
+    for _ in range(MAXIMO_TENTATIVAS_RETOMADA):
+        assert registro.retomada(consulta) is not None
+        registro.falhou(consulta)
+
+    assert registro.retomada(consulta) is None
+    assert registro.get(consulta) is None
+    return None
+
+
+def test_download_retoma_sem_exportar_de_novo(
+    servidor_tao, dir_dados, monkeypatch
+) -> None:
+    consulta = consulta_pais("Viet Nam")
+    add_na_fila(consulta)
+    cliente = ClienteTAO(url_base=servidor_tao.url)
+    cliente.login(usuario=USUARIO, senha=SENHA)
+
+    download_arq = website_scraping.download_arq
+    monkeypatch.setattr(
+        website_scraping, "download_arq", lambda *args, **kwargs: (False, "")
+    )
+    with pytest.raises(Exception, match="DOWNLOAD NÃO FOI BEM-SUCEDIDO"):
+        cliente.download_consulta(consulta)
+
+    etapa = website_scraping.REGISTRO_ETAPAS.get(consulta)
+    assert etapa is not None
+    assert etapa.etapa == Etapa.PRONTO
+
+    exportacoes: list = []
+    monkeypatch.setattr(website_scraping, "download_arq", download_arq)
+    monkeypatch.setattr(cliente, "exporta_relatorio", exportacoes.append)
+    cliente.download_consulta(consulta)
+
+    assert exportacoes == []
+    assert (dir_dados / "data/bronze/tl/viet_nam_DutyDetails_TL.txt").exists()
+    assert get_fila() == []
+    assert website_scraping.REGISTRO_ETAPAS.get(consulta) is None
+    return None
@@ -0,0 +1,107 @@
+import io
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from scraping_wto.extrator_zip import ErroZipStream, ExtratorZipStream
+from scraping_wto.gerenciador_downloads import path_parcial
+
+MEMBROS = {
+    "brazil_DutyDetails_TL.txt": "Reporter\tValue\n" + "Brazil\t1.5\n" * 5000,
+    "brazil_TradeDetails_TL.txt": "Reporter\tValue\n" + "Brazil\t2.5\n" * 300,
+    "leiame.pdf": "não é extraído",
+}
+TAMANHO_BLOCO = 777
+
+
+class SoEscrita(io.RawIOBase):
+    """Arquivo sem seek <- o zipfile passa a usar descritores de dados"""
+
+    def __init__(self) -> None:
+        self.buffer = bytearray()
+
+    def writable(self) -> bool:  # noqa: PLR6301
+        return True
+
+    def write(self, dados) -> int:
+        self.buffer += dados
+        return len(dados)
+
+
+def cria_zip(com_descritor: bool = False) -> bytes:
+    destino = SoEscrita() if com_descritor else io.BytesIO()
+    with zipfile.ZipFile(
+        destino, "w", compression=zipfile.ZIP_DEFLATED
+    ) as zip_f:
+        for nome, conteudo in MEMBROS.items():
+            zip_f.writestr(nome, conteudo)
+    return bytes(destino.buffer) if com_descritor else destino.getvalue()
+
+
+def alimenta(extrator: ExtratorZipStream, conteudo: bytes) -> None:
+    for inicio in range(0, len(conteudo), TAMANHO_BLOCO):
+        extrator.escreve(conteudo[inicio : inicio + TAMANHO_BLOCO])
+    return None
+
+
+@pytest.mark.parametrize("com_descritor", [False, True])
+def test_extrai_txt_durante_o_download(
+    tmp_path: Path, com_descritor: bool
+) -> None:
+    extrator = ExtratorZipStream(tmp_path)
+
+    alimenta(extrator, cria_zip(com_descritor))
+    extrator.conclui()
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "brazil_DutyDetails_TL.txt",
+        "brazil_TradeDetails_TL.txt",
+    ]
+    for membro in extrator.membros:
+        assert (
+            Path(membro.path_arquivo).read_text(encoding="utf-8")
+            == MEMBROS[membro.nome]
+        )
+    return None
+
+
+def test_guarda_zip_de_auditoria(tmp_path: Path) -> None:
+    conteudo = cria_zip()
+    path_zip = tmp_path / "zip/brazil_TL.zip"
+    extrator = ExtratorZipStream(tmp_path / "txt", path_auditoria=path_zip)
+
+    alimenta(extrator, conteudo)
+    extrator.conclui()
+
+    assert path_zip.read_bytes() == conteudo
+    assert len(extrator.membros) == len(MEMBROS) - 1
+    return None
+
+
+def test_zip_corrompido(tmp_path: Path) -> None:
+    conteudo = bytearray(cria_zip())
+    conteudo[200] ^= 0xFF
+    extrator = ExtratorZipStream(tmp_path)
+
+    with pytest.raises(ErroZipStream):
+        alimenta(extrator, bytes(conteudo))
+    extrator.descarta()
+
+    assert list(tmp_path.iterdir()) == []
+    return None
+
+
+def test_zip_truncado(tmp_path: Path) -> None:
+    conteudo = cria_zip()
+    extrator = ExtratorZipStream(tmp_path)
+
+    alimenta(extrator, conteudo[: len(conteudo) // 2])
+    with pytest.raises(ErroZipStream, match="terminou no meio"):
+        extrator.conclui()
+    extrator.descarta()
+
+    path_txt = tmp_path / "brazil_DutyDetails_TL.txt"
+    assert not path_txt.exists()
+    assert not path_parcial(path_txt).exists()
+    return None
@@ -0,0 +1,159 @@
+import pickle
+import sqlite3
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from scraping_wto.etapas import chave_consulta
+from scraping_wto.fila import SUFIXO_PICKLE_IMPORTADO, FilaConsultas, nome_dono
+from scraping_wto.schemas import Consulta
+
+NUMERO_CONSULTAS = 20
+NUMERO_WORKERS = 4
+MAXIMO_TENTATIVAS = 2
+
+
+def consulta_pais(pais: str) -> Consulta:
+    return Consulta(
+        COUNTRY=pais, YEAR="2022", IMPORTS="2021", NOMENCLATURE="HS17"
+    )
+
+
+@pytest.fixture
+def fila(tmp_path: Path) -> FilaConsultas:
+    return FilaConsultas(
+        tmp_path / "fila.sqlite3", maximo_tentativas=MAXIMO_TENTATIVAS
+    )
+
+
+def test_reserva_confirma_devolve(fila: FilaConsultas) -> None:
+    brazil, niger = consulta_pais("Brazil"), consulta_pais("Niger")
+    assert fila.adiciona(brazil)
+    assert fila.adiciona(niger)
+    assert not fila.adiciona(brazil)
+
+    assert fila.reserva() == [brazil]
+    # Reservada <- os outros workers não veem
+    assert fila.reserva(quantidade=2) == [niger]
+    assert fila.reserva() == []
+
+    fila.confirma(brazil)
+    fila.devolve(niger, atraso=0)
+    assert fila.consultas() == [niger]
+    assert fila.reserva() == [niger]
+    return None
+
+
+def test_visibilidade_e_tentativas(fila: FilaConsultas) -> None:
+    fila.timeout_visibilidade = 0
+    fila.adiciona(consulta_pais("Brazil"))
+
+    # Worker "morreu" sem confirmar <- a consulta volta depois do timeout
+    for _ in range(MAXIMO_TENTATIVAS):
+        assert len(fila.reserva()) == 1
+    assert fila.reserva() == []
+    assert fila.numero_pendentes() == 0
+
+    fila.reinicia_tentativas()
+    assert fila.numero_pendentes() == 1
+    return None
+
+
+def test_reinicia_libera_reserva_de_processo_morto(
+    fila: FilaConsultas,
+) -> None:
+    processo = subprocess.run(
+        [sys.executable, "-c", "import os; print(os.getpid())"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    pid_morto = processo.stdout.strip()
+    maquina = nome_dono().split(":")[0]
+    fila.adiciona(consulta_pais("Brazil"))
+    fila.adiciona(consulta_pais("Niger"))
+    fila.reserva(dono=f"{maquina}:{pid_morto}:worker_0")
+    fila.reserva(dono="outra-maquina:1:worker_0")
+
+    fila.reinicia_tentativas()
+
+    assert fila.reserva(quantidade=2) == [consulta_pais("Brazil")]
+    return None
+
+
+def test_workers_nunca_reservam_a_mesma_consulta(fila: FilaConsultas) -> None:
+    for n in range(NUMERO_CONSULTAS):
+        fila.adiciona(consulta_pais(f"pais_{n}"))
+
+    def worker() -> list[str]:
+        reservadas = []
+        while consultas := fila.reserva():
+            reservadas.append(consultas[0].COUNTRY)
+            fila.confirma(consultas[0])
+        fila.fecha()
+        return reservadas
+
+    with ThreadPoolExecutor(NUMERO_WORKERS) as executor:
+        futuros = [executor.submit(worker) for _ in range(NUMERO_WORKERS)]
+    reservadas = [pais for futuro in futuros for pais in futuro.result()]
+
+    assert sorted(reservadas) == sorted(
+        f"pais_{n}" for n in range(NUMERO_CONSULTAS)
+    )
+    assert fila.consultas() == []
+    return None
+
+
+def test_importa_pickle_uma_vez(fila: FilaConsultas, tmp_path: Path) -> None:
+    path_pickle = tmp_path / "consultas_a_fazer.pkl"
+    consultas = [
+        consulta_pais("Brazil"),
+        consulta_pais("Niger"),
+        consulta_pais("Brazil"),
+    ]
+    with open(path_pickle, "wb") as pkl_f:
+        pickle.dump(consultas, pkl_f)
+
+    assert fila.importa_pickle(path_pickle) == len(
+        set(c.COUNTRY for c in consultas)
+    )
+    assert fila.importa_pickle(path_pickle) == 0
+    assert not path_pickle.exists()
+    assert path_pickle.with_name(
+        path_pickle.name + SUFIXO_PICKLE_IMPORTADO
+    ).exists()
+    assert fila.consultas() == consultas[:2]
+    return None
+
+
+def test_migra_fila_antiga_e_prioriza(tmp_path: Path) -> None:
+    path_fila = tmp_path / "fila.sqlite3"
+    # Tabela de antes do escalonador (sem 'prioridade' e 'faixa')
+    with sqlite3.connect(path_fila) as conexao:
+        conexao.execute(
+            "CREATE TABLE consultas (id INTEGER PRIMARY KEY AUTOINCREMENT, chave TEXT NOT NULL UNIQUE, "
+            "consulta TEXT NOT NULL, tentativas INTEGER NOT NULL DEFAULT 0, "
+            "visivel_em REAL NOT NULL DEFAULT 0, dono TEXT)"
+        )
+    conexao.close()
+
+    fila = FilaConsultas(path_fila)
+    brazil, niger, chile = (
+        consulta_pais(pais) for pais in ("Brazil", "Niger", "Chile")
+    )
+    for consulta in (brazil, niger, chile):
+        fila.adiciona(consulta)
+    fila.prioriza({
+        chave_consulta(brazil): (3.0, 0),
+        chave_consulta(niger): (1.0, 1),
+        chave_consulta(chile): (2.0, 0),
+    })
+
+    # A faixa do worker vem antes; dentro dela, a menor prioridade
+    assert fila.reserva(faixa=0) == [chile]
+    assert fila.reserva() == [niger]
+    assert fila.reserva(faixa=1) == [brazil]
+    return None
@@ -0,0 +1,106 @@
+import zipfile
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from scraping_wto.cliente_http import ClienteTAO
+from scraping_wto.gerenciador_downloads import (
+    GerenciadorDownloads,
+    baixa_arquivo,
+    path_parcial,
+)
+from scraping_wto.schemas import Consulta
+from tests.servidor_tao import (
+    PAISES,
+    SENHA,
+    USUARIO,
+    ConfigServidor,
+    ServidorTAO,
+)
+
+NUMERO_LINHAS_ARQUIVO = 20000
+# Blocos pequenos <- o que chegou antes do corte já está no '.part'
+TAMANHO_BLOCO = 16 * 1024
+
+
+def exporta(cliente: ClienteTAO, pais: str) -> str:
+    year, imports, nomenclature = PAISES[pais]
+    consulta = Consulta(
+        COUNTRY=pais, YEAR=year, IMPORTS=imports, NOMENCLATURE=nomenclature
+    )
+    cliente.get("ExportReport.aspx")
+    t_inicio = cliente.exporta_relatorio(consulta)
+    return cliente.espera_link_download(pais, t_inicio)
+
+
+@pytest.fixture
+def servidor_cortando() -> Iterator[ServidorTAO]:
+    config = ConfigServidor(
+        tempo_exportacao=0.0,
+        numero_linhas_arquivo=NUMERO_LINHAS_ARQUIVO,
+        downloads_cortados=1,
+    )
+    with ServidorTAO(config) as servidor:
+        yield servidor
+
+
+@pytest.fixture
+def cliente(servidor_cortando: ServidorTAO, dir_dados) -> Iterator[ClienteTAO]:
+    with ClienteTAO(url_base=servidor_cortando.url) as cliente:
+        cliente.login(usuario=USUARIO, senha=SENHA)
+        yield cliente
+
+
+def test_download_retoma_conexao_cortada(
+    servidor_cortando: ServidorTAO, cliente: ClienteTAO, tmp_path: Path
+) -> None:
+    link = exporta(cliente, "Brazil")
+    path_zip = tmp_path / "brazil_TL.zip"
+
+    resultado = baixa_arquivo(
+        link, path_zip, sessao=cliente.sessao, tamanho_bloco=TAMANHO_BLOCO
+    )
+
+    assert resultado.sucesso
+    assert resultado.bytes_retomados > 0
+    assert resultado.bytes_baixados == path_zip.stat().st_size
+    assert servidor_cortando.numero_downloads_retomados == 1
+    assert not path_parcial(path_zip).exists()
+    with zipfile.ZipFile(path_zip) as zip_f:
+        assert zip_f.testzip() is None
+    return None
+
+
+def test_download_inexistente(cliente: ClienteTAO, tmp_path: Path) -> None:
+    path_zip = tmp_path / "nada_TL.zip"
+
+    resultado = baixa_arquivo(
+        f"{cliente.url_base}/Download/nada_TL.zip", path_zip, cliente.sessao
+    )
+
+    assert not resultado.sucesso
+    assert not path_zip.exists()
+    assert not path_parcial(path_zip).exists()
+    return None
+
+
+def test_gerenciador_baixa_varios(cliente: ClienteTAO, tmp_path: Path) -> None:
+    downloads = [
+        (exporta(cliente, pais), tmp_path / f"{n}_TL.zip")
+        for n, pais in enumerate(PAISES)
+    ]
+
+    gerenciador = GerenciadorDownloads(numero_simultaneos=2)
+    try:
+        resultados = gerenciador.baixa_varios(downloads, sessao=cliente.sessao)
+    finally:
+        gerenciador.fecha()
+
+    assert [resultado.sucesso for resultado in resultados] == [True] * len(
+        PAISES
+    )
+    for _, path_zip in downloads:
+        with zipfile.ZipFile(path_zip) as zip_f:
+            assert zip_f.testzip() is None
+    return None
@@ -0,0 +1,95 @@
+import threading
+from time import perf_counter
+
+import pytest
+
+from scraping_wto.limitador import LimitadorTaxa
+from scraping_wto.metricas import METRICAS
+
+TAXA = 50.0
+NUMERO_ACOES = 10
+NUMERO_THREADS = 4
+
+
+def test_balde_segura_a_taxa() -> None:
+    limitador = LimitadorTaxa(
+        taxa_inicial=TAXA, taxa_maxima=TAXA, capacidade=1
+    )
+
+    t_inicio = perf_counter()
+    for _ in range(NUMERO_ACOES):
+        limitador.espera()
+
+    # A 1ª ficha já estava no balde
+    assert perf_counter() - t_inicio >= (NUMERO_ACOES - 1) / TAXA * 0.9
+    return None
+
+
+def test_balde_compartilhado_entre_threads() -> None:
+    limitador = LimitadorTaxa(
+        taxa_inicial=TAXA, taxa_maxima=TAXA, capacidade=1
+    )
+
+    def worker() -> None:
+        for _ in range(NUMERO_ACOES):
+            limitador.espera()
+
+    threads = [threading.Thread(target=worker) for _ in range(NUMERO_THREADS)]
+    t_inicio = perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    total = NUMERO_ACOES * NUMERO_THREADS
+    assert perf_counter() - t_inicio >= (total - 1) / TAXA * 0.9
+    assert limitador.resumo()["numero_esperas"] == total
+    return None
+
+
+def test_aimd() -> None:
+    limitador = LimitadorTaxa(
+        taxa_inicial=2.0, taxa_minima=0.5, latencia_alvo=1.0
+    )
+
+    limitador.registra(0.1)
+    assert limitador.taxa == pytest.approx(2.1)
+
+    limitador.registra(5.0)
+    assert limitador.taxa == pytest.approx(1.05)
+
+    # Logo depois de uma redução, outra lentidão não derruba a taxa de novo
+    limitador.registra(0.0, erro=True)
+    assert limitador.taxa == pytest.approx(1.05)
+
+    resumo = limitador.resumo()
+    assert (resumo["numero_reducoes"], resumo["numero_erros"]) == (1, 1)
+    return None
+
+
+def test_acao_registra_erro() -> None:
+    limitador = LimitadorTaxa(taxa_inicial=2.0)
+
+    with pytest.raises(ValueError, match="fora do ar"), limitador.acao():
+        raise ValueError("site fora do ar")
+
+    assert limitador.resumo()["numero_erros"] == 1
+    assert limitador.taxa < 2.0  # noqa: PLR2004
+    return None
+
+
+def test_taxa_publicada_quando_muda() -> None:
+    limitador = LimitadorTaxa(
+        taxa_inicial=2.0, taxa_maxima=2.0, latencia_alvo=1.0
+    )
+
+    # Já está na taxa máxima <- nada muda, nada é publicado
+    limitador.registra(0.1)
+    assert not METRICAS.path_prometheus.exists()
+
+    limitador.registra(5.0)
+    assert (
+        "scraping_wto_limitador_taxa 1.0\n"
+        in METRICAS.path_prometheus.read_text(encoding="utf-8")
+    )
+    return None
@@ -0,0 +1,152 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from scraping_wto.metricas import (
+    ETAPA_ESPERA_EXPORTACAO,
+    RegistroMetricas,
+    Span,
+    razao_regressao,
+    verifica_regressao,
+)
+from scraping_wto.schemas import Consulta
+
+BYTES_DOWNLOAD = 1024
+TENTATIVAS_DOWNLOAD = 2
+DURACAO_ANTERIOR = 10.0
+DURACAO_REGRESSAO = 30.0
+RAZAO_REGRESSAO = 3.0
+NUMERO_EXECUCOES_ANTERIORES = 3
+NUMERO_SPANS = 3
+
+
+@pytest.fixture
+def metricas(tmp_path: Path) -> RegistroMetricas:
+    return RegistroMetricas(
+        tmp_path / "metricas.jsonl", tmp_path / "metricas.prom"
+    )
+
+
+def le_spans(path_jsonl: Path) -> list[dict]:
+    return [
+        json.loads(linha)
+        for linha in path_jsonl.read_text(encoding="utf-8").splitlines()
+    ]
+
+
+def test_span_vai_para_jsonl_e_prometheus(metricas: RegistroMetricas) -> None:
+    with metricas.span("download", "Brazil") as span:
+        span.bytes = BYTES_DOWNLOAD
+        span.tentativas = TENTATIVAS_DOWNLOAD
+    with (
+        pytest.raises(ValueError, match="falhou"),
+        metricas.span("download", "Niger"),
+    ):
+        raise ValueError("falhou")
+
+    spans = le_spans(metricas.path_jsonl)
+    assert [span["pais"] for span in spans] == ["Brazil", "Niger"]
+    assert spans[0]["bytes"] == BYTES_DOWNLOAD
+    assert spans[1]["erro"] == "ValueError: falhou"
+
+    metricas.salva_prometheus()
+    prometheus = metricas.path_prometheus.read_text(encoding="utf-8")
+    assert (
+        'scraping_wto_etapa_execucoes_total{etapa="download"} 2' in prometheus
+    )
+    assert 'scraping_wto_etapa_erros_total{etapa="download"} 1' in prometheus
+    assert (
+        f'scraping_wto_etapa_bytes_total{{etapa="download"}} {BYTES_DOWNLOAD}'
+        in prometheus
+    )
+    assert 'etapa="download",pais="Niger"' in prometheus
+    return None
+
+
+def test_cronometra_pega_o_pais_dos_argumentos(
+    metricas: RegistroMetricas,
+) -> None:
+    @metricas.cronometra("consulta")
+    def por_consulta(navegador: object, consulta: Consulta) -> None:
+        return None
+
+    @metricas.cronometra("pais")
+    def por_pais(navegador: object, pais: str) -> None:
+        return None
+
+    por_consulta(
+        None,
+        Consulta(
+            COUNTRY="Brazil", YEAR="2022", IMPORTS="2022", NOMENCLATURE="HS"
+        ),
+    )
+    por_pais(None, pais="Niger")
+
+    assert [span["pais"] for span in le_spans(metricas.path_jsonl)] == [
+        "Brazil",
+        "Niger",
+    ]
+    return None
+
+
+def test_regressao_da_espera_exportacao(metricas: RegistroMetricas) -> None:
+    for execucao in range(NUMERO_EXECUCOES_ANTERIORES):
+        metricas.registra(
+            Span(
+                ETAPA_ESPERA_EXPORTACAO,
+                "Brazil",
+                f"anterior-{execucao}",
+                duracao=DURACAO_ANTERIOR,
+            )
+        )
+    # Poucas amostras de 'Niger' <- fica fora da comparação
+    metricas.registra(
+        Span(ETAPA_ESPERA_EXPORTACAO, "Niger", "anterior-0", duracao=1.0)
+    )
+
+    assert razao_regressao(metricas.path_jsonl, metricas.execucao) is None
+    assert not verifica_regressao(metricas)
+
+    with metricas.span(ETAPA_ESPERA_EXPORTACAO, "Niger"):
+        pass
+    metricas.registra(
+        Span(
+            ETAPA_ESPERA_EXPORTACAO,
+            "Brazil",
+            metricas.execucao,
+            duracao=DURACAO_REGRESSAO,
+        )
+    )
+
+    assert razao_regressao(
+        metricas.path_jsonl, metricas.execucao
+    ) == pytest.approx(RAZAO_REGRESSAO)
+    assert verifica_regressao(metricas)
+    metricas.salva_prometheus()
+    assert (
+        "regressao_espera_exportacao_razao"
+        in metricas.path_prometheus.read_text(encoding="utf-8")
+    )
+    return None
+
+
+def test_prometheus_no_maximo_uma_vez_por_intervalo(
+    metricas: RegistroMetricas,
+) -> None:
+    for pais in ("Brazil", "Niger", "Chile"):
+        with metricas.span("download", pais):
+            pass
+
+    # Só o primeiro span foi escrito; o resto fica para 'salva_prometheus'
+    prometheus = metricas.path_prometheus.read_text(encoding="utf-8")
+    assert (
+        'scraping_wto_etapa_execucoes_total{etapa="download"} 1' in prometheus
+    )
+    metricas.salva_prometheus()
+    prometheus = metricas.path_prometheus.read_text(encoding="utf-8")
+    assert (
+        f'scraping_wto_etapa_execucoes_total{{etapa="download"}} {NUMERO_SPANS}'
+        in prometheus
+    )
+    return None
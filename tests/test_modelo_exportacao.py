@@ -0,0 +1,55 @@
+from itertools import islice
+from pathlib import Path
+
+from scraping_wto.modelo_exportacao import (
+    INTERVALO_INICIAL,
+    INTERVALO_MAXIMO,
+    PRAZO_MINIMO,
+    ModeloTempoExportacao,
+    intervalos_backoff,
+    prazo_exportacao,
+)
+
+TEMPO_EXPORTACAO_GRANDE = 600.0
+TEMPO_RAPIDO = 100.0
+TEMPO_LENTO = 200.0
+
+
+def test_intervalos_backoff_sem_historico() -> None:
+    intervalos = list(islice(intervalos_backoff(), 8))
+    assert intervalos[0] == INTERVALO_INICIAL
+    assert intervalos == sorted(intervalos)
+    assert max(intervalos) == INTERVALO_MAXIMO
+    return None
+
+
+def test_intervalos_backoff_exportacao_grande() -> None:
+    intervalos = list(islice(intervalos_backoff(TEMPO_EXPORTACAO_GRANDE), 3))
+    # Não fica martelando o reload logo no começo
+    assert intervalos[0] > INTERVALO_MAXIMO
+    assert intervalos[1] == INTERVALO_INICIAL
+    return None
+
+
+def test_prazo_exportacao() -> None:
+    assert prazo_exportacao() == PRAZO_MINIMO
+    assert prazo_exportacao(10 * PRAZO_MINIMO) > PRAZO_MINIMO
+    return None
+
+
+def test_modelo_aprende_e_persiste(tmp_path: Path) -> None:
+    path_arquivo = tmp_path / "tempos.json"
+    modelo = ModeloTempoExportacao(path_arquivo)
+    assert modelo.tempo_esperado("Brazil") is None
+
+    modelo.registra("Brazil", TEMPO_RAPIDO)
+    modelo.registra("Brazil", TEMPO_LENTO)
+    tempo_esperado = modelo.tempo_esperado("Brazil")
+    assert tempo_esperado is not None
+    assert TEMPO_RAPIDO < tempo_esperado < TEMPO_LENTO
+
+    assert (
+        ModeloTempoExportacao(path_arquivo).tempo_esperado("Brazil")
+        == tempo_esperado
+    )
+    return None
@@ -0,0 +1,135 @@
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from scraping_wto import pool_navegadores, website_scraping
+from scraping_wto.cliente_http import ClienteTAO
+from scraping_wto.controle_fluxo import add_na_fila
+from tests.auxiliares import confere_downloads, consulta_pais, sem_firefox
+from tests.navegador_falso import NavegadorFalso
+from tests.servidor_tao import SENHA, USUARIO, ConfigServidor, ServidorTAO
+
+# Nigeria fica 'Processing' o teste todo; Niger fica pronto logo
+CONFIG_CONTA = ConfigServidor(
+    relatorios_da_conta=True,
+    tempo_exportacao=0.1,
+    tempos_exportacao_pais={"Nigeria": 60.0},
+)
+CONFIG_POOL = ConfigServidor(relatorios_da_conta=True, tempo_exportacao=0.2)
+NUMERO_WORKERS = 2
+
+
+@pytest.fixture
+def workers_na_conta() -> Iterator[tuple[ClienteTAO, ClienteTAO]]:
+    with ServidorTAO(CONFIG_CONTA) as servidor:
+        workers = (
+            ClienteTAO(url_base=servidor.url),
+            ClienteTAO(url_base=servidor.url),
+        )
+        for worker in workers:
+            worker.login(usuario=USUARIO, senha=SENHA)
+            worker.get("ExportReport.aspx")
+        yield workers
+
+
+# -----------------------------------------------------------------------------
+# Testes
+# -----------------------------------------------------------------------------
+
+
+def test_selenium_mexe_so_no_relatorio_do_pais(
+    workers_na_conta, selenium_sem_espera, dir_dados
+) -> None:
+    worker_nigeria, worker_niger = workers_na_conta
+    worker_nigeria.exporta_relatorio(consulta_pais("Nigeria"))
+    worker_niger.get("ExportReport.aspx")
+    navegador = NavegadorFalso(worker_niger)
+
+    # 'niger' é substring de 'nigeria_TL.zip' <- não é o relatório do Niger
+    assert website_scraping.linha_relatorio_pais(navegador, "Niger") is None
+    assert website_scraping.deleta_relatorio_pais(navegador, "Niger") is None
+    assert worker_niger.linha_relatorio("Nigeria") is not None
+
+    worker_niger.exporta_relatorio(consulta_pais("Niger"))
+    website_scraping.clica_botao_refresh(navegador, "Niger")
+    link = website_scraping.get_link_download_pais(navegador, "Niger")
+    assert link.endswith("/niger_TL.zip")
+
+    website_scraping.deleta_relatorio_pais(navegador, "Niger")
+    assert worker_niger.linha_relatorio("Niger") is None
+    # O relatório do outro worker continua lá, ainda sendo processado
+    linha_nigeria = worker_niger.linha_relatorio("Nigeria")
+    assert linha_nigeria is not None
+    assert worker_niger._botao_linha(linha_nigeria, "bReload") is not None
+    return None
+
+
+def test_pool_com_paises_de_nomes_parecidos(
+    monkeypatch: pytest.MonkeyPatch, dir_dados: Path
+) -> None:
+    """Dois workers na mesma conta: um não apaga nem baixa o do outro"""
+
+    class SessaoHTTP:
+        """Faz o papel da 'SessaoNavegador' com um cliente HTTP logado"""
+
+        def __init__(self, **kwargs) -> None:
+            self.cliente = ClienteTAO(url_base=servidor.url)
+            self.sessao_http = None
+            return None
+
+        def garante_sessao(self) -> ClienteTAO:
+            if self.cliente.sessao_expirada():
+                self.cliente.login(usuario=USUARIO, senha=SENHA)
+            return self.cliente
+
+        @staticmethod
+        def marca_falha() -> None:
+            return None
+
+        def fecha(self) -> None:
+            self.cliente.sessao.close()
+            return None
+
+    def download_consulta(
+        navegador: ClienteTAO, consulta, exclusivo, sessao_http
+    ) -> None:
+        assert not exclusivo
+        navegador.download_consulta(consulta, exclusivo=exclusivo)
+        return None
+
+    monkeypatch.setattr(pool_navegadores, "SessaoNavegador", SessaoHTTP)
+    monkeypatch.setattr(
+        pool_navegadores, "download_consulta", download_consulta
+    )
+
+    for pais in ("Niger", "Nigeria"):
+        add_na_fila(consulta_pais(pais))
+    with ServidorTAO(CONFIG_POOL) as servidor:
+        assert (
+            pool_navegadores.loop_consulta_paralelo(NUMERO_WORKERS)
+            == NUMERO_WORKERS
+        )
+
+    confere_downloads(dir_dados, ["Niger", "Nigeria"])
+    return None
+
+
+@sem_firefox
+def test_pool_firefox_com_paises_de_nomes_parecidos(
+    monkeypatch: pytest.MonkeyPatch, dir_dados: Path
+) -> None:
+    monkeypatch.setenv("USUARIO_WTO", USUARIO)
+    monkeypatch.setenv("SENHA_WTO", SENHA)
+    for pais in ("Niger", "Nigeria"):
+        add_na_fila(consulta_pais(pais))
+
+    with ServidorTAO(CONFIG_POOL) as servidor:
+        monkeypatch.setattr(website_scraping, "URL_BASE_TAO", servidor.url)
+        feitas = pool_navegadores.loop_consulta_paralelo(
+            NUMERO_WORKERS, use_default_firefox_bin=False, headless=True
+        )
+
+    assert feitas == NUMERO_WORKERS
+    confere_downloads(dir_dados, ["Niger", "Nigeria"])
+    return None
@@ -0,0 +1,50 @@
+from pathlib import Path
+
+from scraping_wto.registro_consultas import RegistroConsultasFeitas
+from scraping_wto.schemas import Consulta
+
+CONSULTA_BRAZIL = Consulta(
+    COUNTRY="Brazil", YEAR="2022", IMPORTS="2021", NOMENCLATURE="HS17"
+)
+ATRASO_ESCRITA = 60.0
+
+
+def test_anos_comparados_como_numeros(tmp_path: Path) -> None:
+    registro = RegistroConsultasFeitas(
+        tmp_path / "consultas_feitas.csv", atraso_escrita=0
+    )
+    ano_antigo = CONSULTA_BRAZIL.model_copy(update={"YEAR": "999"})
+    registro.registra(ano_antigo)
+
+    # Como texto, '999' > '2022'
+    assert not registro.ja_feita(CONSULTA_BRAZIL)
+
+    registro.registra(CONSULTA_BRAZIL)
+    assert registro.ja_feita(CONSULTA_BRAZIL)
+    assert registro.ja_feita(ano_antigo)
+    assert not registro.ja_feita(
+        CONSULTA_BRAZIL.model_copy(update={"YEAR": "2023"})
+    )
+    return None
+
+
+def test_write_behind(tmp_path: Path) -> None:
+    path_log = tmp_path / "consultas_feitas.csv"
+    registro = RegistroConsultasFeitas(path_log, atraso_escrita=ATRASO_ESCRITA)
+
+    registro.registra(CONSULTA_BRAZIL, data_consulta="2024-01-01")
+    assert not path_log.exists()
+    assert registro.ja_feita(CONSULTA_BRAZIL)
+    # Ainda não compactado <- mas já está no diário (um crash não perde)
+    assert RegistroConsultasFeitas(path_log).ja_feita(CONSULTA_BRAZIL)
+
+    registro.salva()
+    assert path_log.read_text(encoding="utf-8").splitlines() == [
+        "COUNTRY;YEAR;IMPORTS;NOMENCLATURE;DATA_CONSULTA",
+        "Brazil;2022;2021;HS17;2024-01-01",
+    ]
+    # Outro processo lê o log uma única vez
+    assert (
+        RegistroConsultasFeitas(path_log).ultima("Brazil") == CONSULTA_BRAZIL
+    )
+    return None
@@ -0,0 +1,98 @@
+from requests.adapters import HTTPAdapter
+
+from scraping_wto.selenium_utils import (
+    atualiza_cookies,
+    cria_sessao_http,
+    sessao_requests,
+)
+
+TAMANHO_POOL = 4
+USER_AGENT = (
+    "Mozilla/5.0 (X11; Linux x86_64; rv:128.0) Gecko/20100101 Firefox/128.0"
+)
+
+
+class NavegadorCookies:
+    """Devolve os cookies no formato do 'WebDriver.get_cookies'"""
+
+    def __init__(self) -> None:
+        self.cookies = [
+            {
+                "name": ".ASPXAUTH",
+                "value": "login",
+                "domain": "tao.wto.org",
+                "path": "/",
+                "httpOnly": True,
+                "secure": True,
+            },
+            {
+                "name": "ASP.NET_SessionId",
+                "value": "sessao",
+                "domain": ".wto.org",
+                "path": "/Download",
+                "httpOnly": False,
+                "secure": False,
+            },
+        ]
+
+    def get_cookies(self) -> list[dict]:
+        return self.cookies
+
+    @staticmethod
+    def execute_script(script: str, *args) -> str:
+        assert script == "return navigator.userAgent;"
+        return USER_AGENT
+
+
+def test_cria_sessao_http_com_pool() -> None:
+    sessao = cria_sessao_http(TAMANHO_POOL)
+
+    for url in ("https://tao.wto.org", "http://tao.wto.org"):
+        adaptador = sessao.get_adapter(url)
+        assert isinstance(adaptador, HTTPAdapter)
+        assert adaptador._pool_connections == TAMANHO_POOL
+        assert adaptador._pool_maxsize == TAMANHO_POOL
+    return None
+
+
+def test_sessao_requests_leva_cookies_e_user_agent() -> None:
+    navegador = NavegadorCookies()
+
+    sessao = sessao_requests(navegador, tamanho_pool=TAMANHO_POOL)
+
+    assert sessao.headers["User-Agent"] == USER_AGENT
+    assert (
+        sessao.get_adapter("https://tao.wto.org")._pool_maxsize == TAMANHO_POOL
+    )
+    # Cada cookie no domínio e no caminho em que o navegador o guardou
+    assert (
+        sessao.cookies.get(".ASPXAUTH", domain="tao.wto.org", path="/")
+        == "login"
+    )
+    assert (
+        sessao.cookies.get(
+            "ASP.NET_SessionId", domain=".wto.org", path="/Download"
+        )
+        == "sessao"
+    )
+    assert (
+        sessao.cookies.get("ASP.NET_SessionId", domain=".wto.org", path="/")
+        is None
+    )
+    return None
+
+
+def test_atualiza_cookies_troca_o_valor() -> None:
+    navegador = NavegadorCookies()
+    sessao = sessao_requests(navegador)
+
+    # Novo login no navegador <- a mesma sessão passa a usar o cookie novo
+    navegador.cookies[0]["value"] = "novo_login"
+    atualiza_cookies(sessao, navegador)
+
+    assert (
+        sessao.cookies.get(".ASPXAUTH", domain="tao.wto.org", path="/")
+        == "novo_login"
+    )
+    assert len(sessao.cookies) == len(navegador.cookies)
+    return None
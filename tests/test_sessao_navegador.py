@@ -0,0 +1,171 @@
+import pytest
+
+from scraping_wto import sessao_navegador, website_scraping
+from scraping_wto.sessao_navegador import SessaoNavegador
+
+LOGINS_DEPOIS_DE_EXPIRAR = 2
+
+
+class NavegadorFalso:
+    def __init__(self) -> None:
+        self.current_url = "https://tao.wto.org/default.aspx"
+        self.fechado = False
+
+    def quit(self) -> None:
+        self.fechado = True
+
+
+@pytest.fixture
+def sessao(monkeypatch) -> SessaoNavegador:
+    def login_falso(navegador: NavegadorFalso) -> None:
+        navegador.current_url = "https://tao.wto.org/default.aspx"
+
+    def reinicia_falso(navegador: NavegadorFalso, **kwargs) -> NavegadorFalso:
+        novo_navegador = NavegadorFalso()
+        login_falso(novo_navegador)
+        return novo_navegador
+
+    monkeypatch.setattr(sessao_navegador, "navegador_firefox", NavegadorFalso)
+    monkeypatch.setattr(sessao_navegador, "navegador_login", login_falso)
+    monkeypatch.setattr(sessao_navegador, "reinicia_navegador", reinicia_falso)
+
+    return SessaoNavegador()
+
+
+def test_sessao_faz_login_uma_unica_vez(sessao: SessaoNavegador) -> None:
+    navegador = sessao.garante_sessao()
+    for _ in range(3):
+        assert sessao.garante_sessao() is navegador
+    assert sessao.numero_logins == 1
+    return None
+
+
+def test_sessao_refaz_login_quando_expira(sessao: SessaoNavegador) -> None:
+    navegador = sessao.garante_sessao()
+    navegador.current_url = (
+        "https://tao.wto.org/welcome.aspx?ReturnUrl=%2fExportReport.aspx"
+    )
+
+    assert sessao.garante_sessao() is navegador
+    assert sessao.numero_logins == LOGINS_DEPOIS_DE_EXPIRAR
+    assert sessao.numero_reinicios == 0
+    return None
+
+
+def test_sessao_fecha_navegador(sessao: SessaoNavegador) -> None:
+    with sessao:
+        navegador = sessao.garante_sessao()
+    assert navegador.fechado
+    return None
+
+
+class NavegadorSessaoVencida(NavegadorFalso):
+    """A sessão venceu no servidor, mas a URL ficou parada: só ao abrir uma
+    página aparece o formulário de login"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.vencida = False
+        self.paginas: list[str] = []
+
+    def get(self, url: str) -> None:
+        self.paginas.append(url)
+        self.current_url = url
+
+    def find_elements(self, *localizador) -> list:
+        return ["ctl00_c_ctrLogin_UserName"] if self.vencida else []
+
+
+def test_sessao_confere_o_servidor_depois_de_uma_falha(
+    sessao: SessaoNavegador, monkeypatch
+) -> None:
+    monkeypatch.setattr(
+        sessao_navegador, "navegador_firefox", NavegadorSessaoVencida
+    )
+    navegador = sessao.garante_sessao()
+    navegador.vencida = True
+
+    # Sem falha, só a URL é conferida <- nenhuma página a mais
+    assert sessao.garante_sessao() is navegador
+    assert navegador.paginas == []
+
+    sessao.marca_falha()
+    assert sessao.garante_sessao() is navegador
+    assert navegador.paginas[-1].endswith("/default.aspx")
+    assert sessao.numero_logins == LOGINS_DEPOIS_DE_EXPIRAR
+    return None
+
+
+def test_sessao_valida_depois_de_uma_falha(
+    sessao: SessaoNavegador, monkeypatch
+) -> None:
+    monkeypatch.setattr(
+        sessao_navegador, "navegador_firefox", NavegadorSessaoVencida
+    )
+    navegador = sessao.garante_sessao()
+
+    sessao.marca_falha()
+    sessao.garante_sessao()
+    sessao.garante_sessao()
+
+    # Conferiu uma única vez e não refez o login
+    assert len(navegador.paginas) == 1
+    assert sessao.numero_logins == 1
+    return None
+
+
+class NavegadorRedirecionando(NavegadorFalso):
+    """Sem login válido, qualquer página redireciona para a de login"""
+
+    def __init__(self, logado: bool) -> None:
+        super().__init__()
+        self.logado = logado
+        self.paginas: list[str] = []
+
+    def get(self, url: str) -> None:
+        self.paginas.append(url)
+        if self.logado:
+            self.current_url = url
+        else:
+            self.current_url = (
+                "https://tao.wto.org/welcome.aspx?ReturnUrl=%2fdefault.aspx"
+            )
+
+
+@pytest.fixture
+def formulario_login(monkeypatch) -> list:
+    campos: list = []
+    monkeypatch.setenv("USUARIO_WTO", "usuario")
+    monkeypatch.setenv("SENHA_WTO", "senha")
+    monkeypatch.setattr(
+        website_scraping, "insere_texto", lambda *args: campos.append(args[-1])
+    )
+    monkeypatch.setattr(website_scraping, "clica_botao", lambda *args: None)
+    return campos
+
+
+def test_login_reaproveita_perfil(formulario_login: list) -> None:
+    navegador = NavegadorRedirecionando(logado=True)
+
+    assert website_scraping.navegador_login(navegador) is False
+    assert formulario_login == []
+    assert len(navegador.paginas) == 1
+    return None
+
+
+def test_sessao_ativa_redireciona_para_o_login() -> None:
+    assert (
+        website_scraping.sessao_ativa(NavegadorRedirecionando(logado=False))
+        is False
+    )
+    return None
+
+
+def test_login_preenche_formulario_sem_cookie(formulario_login: list) -> None:
+    navegador = NavegadorRedirecionando(logado=False)
+
+    assert website_scraping.navegador_login(navegador) is True
+    assert formulario_login == ["usuario", "senha"]
+    # O redirecionamento já abriu o formulário <- nenhuma página a mais
+    assert len(navegador.paginas) == 1
+    return None
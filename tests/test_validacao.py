@@ -0,0 +1,76 @@
+import io
+from pathlib import Path
+
+import pytest
+
+from scraping_wto.extrator_zip import ExtratorZipStream
+from scraping_wto.validacao import (
+    ErroValidacao,
+    amostra_tabela,
+    reporter_da_amostra,
+    valida_download,
+)
+from tests.servidor_tao import conteudo_zip
+
+NUMERO_LINHAS_ARQUIVO = 1000
+NUMERO_LINHAS_AMOSTRA = 3
+
+
+def extrator_com_zip(
+    dir_destino: Path, pais: str, nome_arquivo: str
+) -> ExtratorZipStream:
+    extrator = ExtratorZipStream(dir_destino)
+    extrator.escreve(
+        conteudo_zip(pais, f"{nome_arquivo}_TL.zip", NUMERO_LINHAS_ARQUIVO)
+    )
+    extrator.conclui()
+    return extrator
+
+
+def test_amostra_le_so_o_comeco() -> None:
+    arquivo_f = io.BytesIO(
+        b"Reporter\tYear\nViet Nam\t2022\n" * NUMERO_LINHAS_ARQUIVO
+    )
+
+    cabecalho, linhas = amostra_tabela(arquivo_f, NUMERO_LINHAS_AMOSTRA)
+
+    assert cabecalho == ["Reporter", "Year"]
+    assert len(linhas) == NUMERO_LINHAS_AMOSTRA
+    assert (
+        reporter_da_amostra(["Reporter", "Year"], [["Viet Nam", "2022"]])
+        == "viet_nam"
+    )
+    return None
+
+
+def test_reporter_da_amostra_invalida() -> None:
+    with pytest.raises(ErroValidacao, match="coluna"):
+        reporter_da_amostra(["Year"], [["2022"]])
+    with pytest.raises(ErroValidacao, match="sem linhas"):
+        reporter_da_amostra(["Reporter"], [])
+    with pytest.raises(ErroValidacao, match="diferentes"):
+        reporter_da_amostra(["Reporter"], [["Niger"], ["Nigeria"]])
+    return None
+
+
+def test_valida_download(tmp_path: Path) -> None:
+    extrator = extrator_com_zip(tmp_path, "Brazil", "brazil")
+
+    valida_download(extrator, "brazil")
+
+    membro = extrator.membros[0]
+    assert membro.numero_linhas == NUMERO_LINHAS_ARQUIVO + 1
+    with pytest.raises(ErroValidacao, match="não de 'niger'"):
+        valida_download(extrator, "niger")
+    return None
+
+
+def test_valida_download_confere_diretorio_central(tmp_path: Path) -> None:
+    extrator = extrator_com_zip(tmp_path, "Niger", "niger")
+    nome = extrator.membros[0].nome
+    crc, tamanho = extrator.diretorio_central[nome]
+    extrator.diretorio_central[nome] = (crc ^ 1, tamanho)
+
+    with pytest.raises(ErroValidacao, match="diretório central"):
+        valida_download(extrator, "niger")
+    return None
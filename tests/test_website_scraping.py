@@ -0,0 +1,535 @@
+import json
+import shutil
+import subprocess
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+from selenium.common import TimeoutException
+
+from scraping_wto import website_scraping
+from scraping_wto.cliente_http import ClienteTAO
+from scraping_wto.sessao_navegador import SessaoNavegador
+from tests.auxiliares import confere_downloads, consulta_pais, sem_firefox
+from tests.navegador_falso import NavegadorFalso
+from tests.servidor_tao import SENHA, USUARIO, ConfigServidor, ServidorTAO
+
+NUMERO_DELETADOS = 3
+
+# Niger não tem o relatório TL <- a exportação dele falha no meio do lote
+CONFIG_PIPELINE = ConfigServidor(
+    tempo_exportacao=0.2,
+    tempos_exportacao_pais={"Brazil": 0.4},
+    paises_sem_tl={"Niger"},
+)
+PAISES_PIPELINE = ["Brazil", "Niger", "Viet Nam"]
+PAISES_BAIXADOS = ["Brazil", "Viet Nam"]
+
+sem_node = pytest.mark.skipif(
+    shutil.which("node") is None, reason="node não disponível"
+)
+
+# Tabela de relatórios mínima para rodar o script de deleção no node: o
+# Nigeria pronto (link) e o Niger ainda sendo processado (só a célula)
+DOM_RELATORIOS = """
+const SELETOR = ["table2", "table3"].map(classe => `#ctl00_c_viewFile_dgExportFile .${classe}`).join(", ");
+const elemento = (filhos = {}, atributos = {}) => ({
+    querySelectorAll: seletor => filhos[seletor] || [],
+    querySelector: seletor => (filhos[seletor] || [])[0] || null,
+    ...atributos,
+});
+const botao = nome => elemento({}, { name: nome, value: "Delete", form: { getAttribute: () => "ExportReport.aspx" } });
+const celula = texto => elemento({}, { textContent: texto });
+const linhas = [
+    elemento({
+        "a[href]": [elemento({}, { href: "http://tao/Download/nigeria_TL.zip" })],
+        "td": [celula("nigeria_TL.zip"), celula("Ready")],
+        "input[id*='bDelete']": [botao("bDelete_nigeria")],
+    }, { textContent: "nigeria_TL.zip Ready" }),
+    elemento({
+        "td": [celula(" niger_TL.zip "), celula("Processing")],
+        "input[id*='bDelete']": [botao("bDelete_niger")],
+    }, { textContent: " niger_TL.zip Processing" }),
+];
+globalThis.postados = [];
+globalThis.document = elemento({ [SELETOR]: linhas });
+globalThis.location = { href: "http://tao/ExportReport.aspx" };
+globalThis.FormData = class {};
+globalThis.DOMParser = class { parseFromString() { return elemento(); } };
+globalThis.fetch = async (url, opcoes) => {
+    postados.push([...opcoes.body.keys()].pop());
+    return { ok: true, text: async () => "" };
+};
+"""
+
+# Pop-up "Processing" na tela até LIVRE_EM_MS (null = não sai mais). Só o
+# MutationObserver avisa a mudança do atributo.
+DOM_POPUP = """
+let ocupado = true;
+let avisa = () => {};
+globalThis.window = {};
+globalThis.document = {
+    querySelector: () => ({ getAttribute: () => (ocupado ? "false" : "true") }),
+};
+globalThis.MutationObserver = class {
+    constructor(callback) { avisa = callback; }
+    observe() {}
+    disconnect() {}
+};
+if (LIVRE_EM_MS !== null) {
+    setTimeout(() => { ocupado = false; avisa(); }, LIVRE_EM_MS);
+}
+"""
+LIVRE_EM_MS = 50
+# O script também confere a cada 250 ms <- antes disso, quem avisou foi o observer
+INTERVALO_CONFERENCIA = 0.25
+TIMEOUT_POPUP = 0.3
+
+
+class NavegadorNode:
+    """Roda os 'execute_async_script' no node, depois do 'preambulo' (o DOM
+    falso). O que foi postado via fetch volta em 'postados'."""
+
+    def __init__(self, preambulo: str) -> None:
+        self.preambulo = preambulo
+        self.paginas: list[str] = []
+        self.postados: list[str] = []
+
+    def execute_async_script(self, script: str, *args) -> dict:
+        programa = (
+            self.preambulo
+            + "(function () {\n"
+            + script
+            + "\n}).apply(null, ["
+            + "".join(f"{json.dumps(arg)}, " for arg in args)
+            + "resposta => console.log(JSON.stringify({ resposta: resposta, postados: globalThis.postados }))]);"
+        )
+        saida = json.loads(
+            subprocess.run(
+                ["node"],
+                input=programa,
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout
+        )
+        self.postados = saida.get("postados") or []
+        return saida["resposta"]
+
+    def get(self, url: str) -> None:
+        self.paginas.append(url)
+
+
+class NavegadorScripts:
+    """Responde aos 'execute_script' com os valores da fila 'respostas'"""
+
+    def __init__(self, *respostas) -> None:
+        self.respostas = list(respostas)
+        self.scripts: list[tuple] = []
+
+    def execute_script(self, script: str, *args):
+        self.scripts.append((script, args))
+        return self.respostas.pop(0)
+
+
+@pytest.fixture
+def ids_paises(monkeypatch) -> dict:
+    ids_paises = {
+        "Viet Nam": "ctl00_qsl_qs_pop_ctl00_dgCountry_ctl05_rbSelect"
+    }
+    monkeypatch.setattr(website_scraping, "IDS_PAISES", ids_paises)
+    return ids_paises
+
+
+def test_clica_consulta_pais_pelo_id(ids_paises: dict, monkeypatch) -> None:
+    def xpath_lento(*args, **kwargs):
+        raise AssertionError("não deveria procurar pelo XPath")
+
+    monkeypatch.setattr(
+        website_scraping, "espera_elemento_clicavel", xpath_lento
+    )
+    navegador = NavegadorScripts(True)
+
+    website_scraping.clica_consulta_pais(navegador, "Viet Nam")
+
+    assert navegador.scripts[0][1] == (ids_paises["Viet Nam"], "Viet Nam")
+    return None
+
+
+def test_clica_consulta_pais_volta_para_o_xpath(
+    ids_paises: dict, monkeypatch
+) -> None:
+    localizadores: list = []
+    monkeypatch.setattr(
+        website_scraping,
+        "espera_elemento_clicavel",
+        lambda navegador, *localizador: (
+            localizadores.append(localizador) or "botao"
+        ),
+    )
+    # A linha do id mudou de país <- o script não clica
+    navegador = NavegadorScripts(False, None)
+
+    website_scraping.clica_consulta_pais(navegador, "Viet Nam")
+
+    assert 'normalize-space()="Viet Nam"' in localizadores[0][1]
+    assert navegador.scripts[-1][1] == ("botao",)
+    return None
+
+
+# Infos mais recentes de cada país na janela de consulta (year, imports, nomenclature)
+INFOS_PAISES = {
+    "Brazil": ["2023", "2022", "HS22"],
+    "Niger": ["2021", "2020", "HS17"],
+    "Viet Nam": ["2022", "2021", "HS17"],
+}
+
+
+class NavegadorConsulta:
+    """Janela de consulta falsa: o script em lote e os scripts país a país
+    leem o mesmo 'INFOS_PAISES'. Os 'ilegiveis' voltam sem infos no lote."""
+
+    def __init__(self, ilegiveis: tuple = ()) -> None:
+        self.ilegiveis = ilegiveis
+        self.selecionado = ""
+        self.timeouts: list[float] = []
+
+    @staticmethod
+    def find_element(*localizador) -> None:
+        return None
+
+    def set_script_timeout(self, timeout: float) -> None:
+        self.timeouts.append(timeout)
+
+    def execute_async_script(
+        self, script: str, paises, timeout_ms: int
+    ) -> dict:
+        assert (
+            script == website_scraping.JS_SCRIPTS.coleta_infos_todos_paises()
+        )
+        return {
+            "resultados": [
+                {
+                    "pais": pais,
+                    "infos": None
+                    if pais in self.ilegiveis
+                    else INFOS_PAISES[pais],
+                }
+                for pais in paises or INFOS_PAISES
+            ]
+        }
+
+    def execute_script(self, script: str, *args):
+        scripts = website_scraping.JS_SCRIPTS
+        if script == scripts.get_lista_paises():
+            return [
+                {"pais": pais, "id": f"input_{pais}"} for pais in INFOS_PAISES
+            ]
+        if script == scripts.clica_pais_por_id():
+            self.selecionado = args[1]
+            return True
+        assert script == scripts.get_info_paises()
+        return list(INFOS_PAISES[self.selecionado])
+
+
+def por_pais(consultas: list) -> list:
+    return sorted(consultas, key=lambda consulta: consulta.COUNTRY)
+
+
+@pytest.fixture
+def janela_consulta(ids_paises: dict, sem_espera, monkeypatch) -> None:
+    monkeypatch.setattr(
+        website_scraping, "espera_elemento_visivel", lambda *args: None
+    )
+    return None
+
+
+def test_coleta_em_lote_igual_a_pais_a_pais(janela_consulta) -> None:
+    paises = list(INFOS_PAISES)
+    navegador = NavegadorConsulta()
+
+    em_lote = website_scraping.coleta_infos_paises(navegador, paises=paises)
+    pais_a_pais = [
+        website_scraping.get_info_ultima_consulta_pais(navegador, pais)
+        for pais in paises
+    ]
+
+    assert por_pais(em_lote) == por_pais(pais_a_pais)
+    assert len(em_lote) == len(paises)
+    # O timeout dos scripts volta ao normal depois do lote
+    assert navegador.timeouts[-1] == website_scraping.TIMEOUT_SCRIPTS
+    return None
+
+
+def test_coleta_em_lote_deixa_de_fora_os_ilegiveis(janela_consulta) -> None:
+    paises = list(INFOS_PAISES)
+    navegador = NavegadorConsulta(ilegiveis=("Niger",))
+
+    em_lote = website_scraping.coleta_infos_paises(navegador, paises=paises)
+    # Os que ficaram de fora são lidos um a um (como no 'main')
+    conferidos = {consulta.COUNTRY for consulta in em_lote}
+    restantes = [
+        website_scraping.get_info_ultima_consulta_pais(navegador, pais)
+        for pais in paises
+        if pais not in conferidos
+    ]
+
+    assert conferidos == {"Brazil", "Viet Nam"}
+    assert por_pais(em_lote + restantes) == [
+        website_scraping.get_info_ultima_consulta_pais(navegador, pais)
+        for pais in sorted(paises)
+    ]
+    return None
+
+
+# Janela de consulta com UpdatePanel para rodar o script em lote no node.
+# Como no TAO, o clique no rádio só agenda o __doPostBack (setTimeout 0); o
+# postback troca a tabela de anos depois de POSTBACK_MS. SEM_POSTBACK: o
+# clique não faz nada; LINHA_VAZIA: a tabela de anos volta em branco.
+SEM_POSTBACK = ["Chile"]
+LINHA_VAZIA = ["Peru"]
+POSTBACK_MS = 20
+TIMEOUT_POSTBACK = 0.2
+DOM_CONSULTA = (
+    f"""
+const INFOS = {json.dumps(INFOS_PAISES)};
+const SEM_POSTBACK = {json.dumps(SEM_POSTBACK)};
+const LINHA_VAZIA = {json.dumps(LINHA_VAZIA)};
+const POSTBACK_MS = {POSTBACK_MS};
+"""
+    + """
+const elemento = (filhos = {}, atributos = {}) => ({
+    querySelectorAll: seletor => filhos[seletor] || [],
+    querySelector: seletor => (filhos[seletor] || [])[0] || null,
+    ...atributos,
+});
+const celula = texto => elemento({}, { textContent: texto });
+const handlers = { begin: [], end: [] };
+let emPostback = false;
+const prm = {
+    get_isInAsyncPostBack: () => emPostback,
+    add_beginRequest: f => handlers.begin.push(f),
+    remove_beginRequest: f => { handlers.begin = handlers.begin.filter(h => h !== f); },
+    add_endRequest: f => handlers.end.push(f),
+    remove_endRequest: f => { handlers.end = handlers.end.filter(h => h !== f); },
+};
+globalThis.window = globalThis;
+globalThis.Sys = { WebForms: { PageRequestManager: { getInstance: () => prm } } };
+let linhaAnos = null;
+const tabelaAnos = { querySelector: () => linhaAnos };
+const doPostBack = pais => {
+    emPostback = true;
+    handlers.begin.forEach(h => h());
+    setTimeout(() => {
+        const infos = LINHA_VAZIA.includes(pais) ? ["", "", ""] : INFOS[pais];
+        linhaAnos = elemento({ td: [celula(""), ...infos.map(celula)] });
+        emPostback = false;
+        handlers.end.forEach(h => h());
+    }, POSTBACK_MS);
+};
+const radio = pais => elemento({}, {
+    click: () => { if (!SEM_POSTBACK.includes(pais)) setTimeout(() => doPostBack(pais), 0); },
+});
+const linhas = [...Object.keys(INFOS), ...SEM_POSTBACK, ...LINHA_VAZIA]
+    .map(pais => elemento({ input: [radio(pais)] }, { textContent: ` ${pais} ` }));
+globalThis.document = {
+    querySelectorAll: seletor => (seletor.includes("dgCountry") ? linhas : []),
+    querySelector: seletor => (seletor === "#ctl00_qsl_qs_pop_ctl00_dgYear" ? tabelaAnos : null),
+};
+"""
+)
+
+
+class NavegadorConsultaNode(NavegadorConsulta):
+    """O script em lote roda de verdade no node, sobre o 'DOM_CONSULTA'"""
+
+    @staticmethod
+    def execute_async_script(script: str, *args) -> dict:
+        return NavegadorNode(DOM_CONSULTA).execute_async_script(script, *args)
+
+
+@sem_node
+def test_coleta_em_lote_espera_o_postback(janela_consulta) -> None:
+    navegador = NavegadorConsultaNode()
+
+    em_lote = website_scraping.coleta_infos_paises(
+        navegador,
+        paises=[*INFOS_PAISES, *SEM_POSTBACK, *LINHA_VAZIA],
+        timeout_por_pais=TIMEOUT_POSTBACK,
+    )
+
+    # Cada país com as infos dele (não as do anterior nem em branco); sem
+    # postback ou com a linha vazia fica de fora <- vai para o país a país
+    assert por_pais(em_lote) == [
+        website_scraping.get_info_ultima_consulta_pais(navegador, pais)
+        for pais in sorted(INFOS_PAISES)
+    ]
+    return None
+
+
+class NavegadorLote:
+    def __init__(self, resposta: dict) -> None:
+        self.resposta = resposta
+        self.argumentos: tuple = ()
+        self.paginas: list[str] = []
+
+    def execute_async_script(self, script: str, *args) -> dict:
+        self.argumentos = args
+        return self.resposta
+
+    def get(self, url: str) -> None:
+        self.paginas.append(url)
+
+
+@pytest.fixture
+def sem_espera(monkeypatch) -> None:
+    monkeypatch.setattr(website_scraping, "em_espera", lambda navegador: 0.0)
+    return None
+
+
+def test_deleta_relatorios_em_lote(sem_espera) -> None:
+    navegador = NavegadorLote({"deletados": NUMERO_DELETADOS})
+
+    deletados = website_scraping.deleta_relatorios_em_lote(
+        navegador, ["Viet Nam", "Brazil"]
+    )
+
+    assert deletados == NUMERO_DELETADOS
+    assert navegador.argumentos[0] == ["viet_nam", "brazil"]
+    # Uma única recarga da página, no final
+    assert len(navegador.paginas) == 1
+    return None
+
+
+def test_limpa_tabela_volta_para_um_a_um(sem_espera, monkeypatch) -> None:
+    deletados_um_a_um: list = []
+    monkeypatch.setattr(
+        website_scraping,
+        "deleta_relatorio_pais",
+        lambda navegador, pais: deletados_um_a_um.append(pais),
+    )
+    navegador = NavegadorLote({
+        "deletados": 0,
+        "erro": "TypeError: form is null",
+    })
+
+    website_scraping.limpa_tabela_relatorios(navegador, ["Niger"])
+
+    assert deletados_um_a_um == ["Niger"]
+    assert navegador.paginas == []
+    return None
+
+
+@sem_node
+def test_deleta_em_lote_so_o_relatorio_do_pais(sem_espera) -> None:
+    navegador = NavegadorNode(DOM_RELATORIOS)
+
+    assert (
+        website_scraping.deleta_relatorios_em_lote(navegador, ["Niger"]) == 1
+    )
+    # 'niger' é substring de 'nigeria_TL.zip' <- só o botão da linha do Niger
+    assert navegador.postados == ["bDelete_niger"]
+    return None
+
+
+@sem_node
+def test_em_espera_acorda_com_o_mutation_observer(monkeypatch) -> None:
+    metricas_espera = website_scraping.MetricasEspera()
+    monkeypatch.setattr(website_scraping, "METRICAS_ESPERA", metricas_espera)
+    navegador = NavegadorNode(
+        DOM_POPUP.replace("LIVRE_EM_MS", str(LIVRE_EM_MS))
+    )
+
+    duracao = website_scraping.em_espera(navegador)
+
+    assert 0 < duracao < INTERVALO_CONFERENCIA
+    assert metricas_espera.resumo()["numero_esperas"] == 1
+    return None
+
+
+@sem_node
+def test_em_espera_timeout(monkeypatch) -> None:
+    metricas_espera = website_scraping.MetricasEspera()
+    monkeypatch.setattr(website_scraping, "METRICAS_ESPERA", metricas_espera)
+    navegador = NavegadorNode(DOM_POPUP.replace("LIVRE_EM_MS", "null"))
+
+    with pytest.raises(TimeoutException, match="Processing"):
+        website_scraping.em_espera(navegador, timeout=TIMEOUT_POPUP)
+
+    assert metricas_espera.resumo()["numero_timeouts"] == 1
+    return None
+
+
+# -----------------------------------------------------------------------------
+# Pipeline de ponta a ponta contra o servidor local
+# -----------------------------------------------------------------------------
+
+
+@pytest.fixture
+def navegador_relatorios(
+    dir_dados, selenium_sem_espera, monkeypatch
+) -> Iterator[NavegadorFalso]:
+    """WebDriver falso sobre o cliente HTTP: a exportação e a limpeza da
+    tabela (formulários do Selenium) vão pelo cliente"""
+
+    monkeypatch.setattr(
+        website_scraping,
+        "exporta_relatorio",
+        lambda navegador, consulta: navegador.cliente.exporta_relatorio(
+            consulta
+        ),
+    )
+    monkeypatch.setattr(
+        website_scraping,
+        "limpa_tabela_relatorios",
+        lambda navegador, paises=None: navegador.cliente.deleta_relatorios(),
+    )
+    monkeypatch.setattr(
+        website_scraping,
+        "recarrega_tabela_relatorios",
+        lambda navegador: navegador.cliente.get("ExportReport.aspx"),
+    )
+    with ServidorTAO(CONFIG_PIPELINE) as servidor:
+        cliente = ClienteTAO(url_base=servidor.url)
+        cliente.login(usuario=USUARIO, senha=SENHA)
+        yield NavegadorFalso(cliente)
+
+
+def test_download_consultas_pipeline(
+    navegador_relatorios, dir_dados: Path
+) -> None:
+    consultas = [consulta_pais(pais) for pais in PAISES_PIPELINE]
+
+    # Sem 'sessao_http' <- o download usa os cookies copiados do navegador
+    feitas = website_scraping.download_consultas_pipeline(
+        navegador_relatorios, consultas
+    )
+
+    assert sorted(consulta.COUNTRY for consulta in feitas) == PAISES_BAIXADOS
+    confere_downloads(dir_dados, PAISES_BAIXADOS)
+    assert not (dir_dados / "data/bronze/tl/niger_DutyDetails_TL.txt").exists()
+    return None
+
+
+@sem_firefox
+def test_download_consultas_pipeline_firefox(
+    monkeypatch, dir_dados: Path
+) -> None:
+    monkeypatch.setenv("USUARIO_WTO", USUARIO)
+    monkeypatch.setenv("SENHA_WTO", SENHA)
+    consultas = [consulta_pais(pais) for pais in PAISES_PIPELINE]
+
+    with ServidorTAO(CONFIG_PIPELINE) as servidor:
+        monkeypatch.setattr(website_scraping, "URL_BASE_TAO", servidor.url)
+        with SessaoNavegador(
+            use_default_firefox_bin=False, headless=True
+        ) as sessao:
+            feitas = website_scraping.download_consultas_pipeline(
+                sessao.garante_sessao(),
+                consultas,
+                sessao_http=sessao.sessao_http,
+            )
+
+    assert sorted(consulta.COUNTRY for consulta in feitas) == PAISES_BAIXADOS
+    confere_downloads(dir_dados, PAISES_BAIXADOS)
+    return None